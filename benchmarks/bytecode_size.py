@@ -0,0 +1,129 @@
+"""
+Compares the textual `.qud` format with the binary bytecode (`.qbc`, see QuadBytecode):
+file sizes, and the time to load a program for execution, for the samples and generated
+programs of growing size (see cpl_generator.py).
+
+Loading text parses every line and resolves the labels, loading bytecode memory-maps the
+file and only decodes its operand and label tables. "map" is the time to open the bytecode,
+"load" also builds an interpreter from it.
+
+Usage: python benchmarks/bytecode_size.py [--shapes straight,nested] [--sizes 1000,10000]
+                                          [-O LEVEL] [--repeat N] [--json FILE]
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stderr, redirect_stdout
+from typing import Callable, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cpl_generator import SHAPES, generate  # noqa: E402
+from CPLCompiler import CPLCompiler  # noqa: E402
+from PassManager import OPTIMIZATION_LEVELS, compiler_options  # noqa: E402
+from QuadBytecode import Bytecode  # noqa: E402
+from QuadInterpreter import QuadInterpreter  # noqa: E402
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+
+def compile_program(source: str, level: int) -> Optional[CPLCompiler]:
+    compiler = CPLCompiler(source, "bench.qud", **compiler_options(level))
+    with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+        compiler.run()
+    return compiler if compiler.quads else None
+
+
+def best_time(function: Callable[[], object], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def measure(name: str, source: str, level: int, repeat: int, directory: str) -> Optional[dict]:
+    compiler = compile_program(source, level)
+    if compiler is None:
+        return None
+    text = compiler.program
+    path = os.path.join(directory, "program.qbc")
+    with open(path, "wb") as f:
+        f.write(compiler.bytecode())
+
+    return {
+        "program": name,
+        "instructions": len(compiler.quads),
+        "text_bytes": len(text.encode()),
+        "bytecode_bytes": os.path.getsize(path),
+        "text_load": best_time(lambda: QuadInterpreter.from_text(text), repeat),
+        "bytecode_map": best_time(lambda: Bytecode.from_file(path), repeat),
+        "bytecode_load": best_time(lambda: Bytecode.from_file(path).interpreter(), repeat),
+    }
+
+
+def programs(shapes: List[str], sizes: List[int]) -> List[Tuple[str, str]]:
+    result = []
+    for filename in sorted(glob.glob(os.path.join(ROOT, "samples", "*.ou"))):
+        with open(filename) as f:
+            result.append((os.path.basename(filename), f.read()))
+    for shape in shapes:
+        for lines in sizes:
+            result.append((f"{shape} {lines}", generate(shape, lines)))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shapes", default="straight,nested")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)))
+    parser.add_argument(
+        "-O", dest="level", type=int, choices=sorted(OPTIMIZATION_LEVELS), default=0
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="loads per program, the fastest counts"
+    )
+    parser.add_argument("--json", default=None, help="write all measurements to this file")
+    args = parser.parse_args()
+
+    shapes = [shape for shape in args.shapes.split(",") if shape]
+    for shape in shapes:
+        if shape not in SHAPES:
+            parser.error(f"unknown shape {shape}, choose from {', '.join(SHAPES)}")
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+
+    print(
+        f"{'program':<24}{'instrs':>8}{'text B':>10}{'qbc B':>10}{'ratio':>7}"
+        f"{'text ms':>10}{'map ms':>9}{'load ms':>9}{'speedup':>9}"
+    )
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name, source in programs(shapes, sizes):
+            result = measure(name, source, args.level, args.repeat, directory)
+            if result is None:
+                continue
+            results.append(result)
+            print(
+                f"{name:<24}{result['instructions']:>8}{result['text_bytes']:>10}"
+                f"{result['bytecode_bytes']:>10}"
+                f"{result['bytecode_bytes'] / result['text_bytes']:>7.2f}"
+                f"{result['text_load'] * 1000:>10.2f}{result['bytecode_map'] * 1000:>9.2f}"
+                f"{result['bytecode_load'] * 1000:>9.2f}"
+                f"{result['text_load'] / max(result['bytecode_load'], 1e-9):>8.1f}x"
+            )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"level": args.level, "measurements": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Measures the quality of the generated code at every optimization level: the static
+instruction count, the number of temporaries and the number of instructions executed by
+QuadInterpreter, for the programs in samples/ and benchmarks/programs/. Every level must
+print the same output as -O0.
+
+A program's inputs are read from a `/* inputs: ... */` comment in it, other programs get
+the same fixed inputs as opt_report.py.
+
+With `--json FILE` the measurements are saved, and `--baseline FILE` compares them with
+saved ones: a level executing or emitting more instructions than before is reported as
+a regression. The exit code is 1 if an output differs or something regressed.
+
+Usage: python benchmarks/code_quality.py [--json FILE] [--baseline FILE] [programs.ou ...]
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import re
+import sys
+from contextlib import redirect_stderr, redirect_stdout
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from CPLCompiler import CPLCompiler  # noqa: E402
+from PassManager import OPTIMIZATION_LEVELS, compiler_options  # noqa: E402
+from Quad import Quad, count_instructions  # noqa: E402
+from QuadInterpreter import QuadError, QuadInterpreter  # noqa: E402
+from TempAllocator import count_temporaries  # noqa: E402
+
+# Enough values for every `input` in the samples, all integers so they suit IINP and RINP
+DEFAULT_INPUTS = " ".join(["7", "3", "5", "2", "9", "4", "12", "1"] * 4)
+INPUTS_COMMENT = re.compile(r"/\*\s*inputs:([^*]*)\*/")
+MAX_STEPS = 10_000_000
+LEVELS = sorted(OPTIMIZATION_LEVELS)
+
+
+def default_programs() -> List[str]:
+    return sorted(glob.glob(os.path.join(ROOT, "samples", "*.ou"))) + sorted(
+        glob.glob(os.path.join(ROOT, "benchmarks", "programs", "*.ou"))
+    )
+
+
+def compile_program(source: str, level: int) -> List[Quad]:
+    compiler = CPLCompiler(source, "quality.qud", **compiler_options(level))
+    with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+        compiler.run()
+    return compiler.quads
+
+
+def execute(quads: List[Quad], inputs: str) -> Tuple[str, int]:
+    """
+    The output of a program, ending with a marker if it stopped with an error,
+    and the number of instructions it executed.
+    """
+    output = io.StringIO()
+    interpreter = QuadInterpreter(quads)
+    try:
+        interpreter.run(io.StringIO(inputs), output, MAX_STEPS)
+    except QuadError:
+        return output.getvalue() + "<runtime error>", interpreter.steps
+    return output.getvalue(), interpreter.steps
+
+
+def measure(filename: str) -> Optional[dict]:
+    """
+    The measurements of a program at every level, None if it doesn't compile.
+    """
+    with open(filename) as f:
+        source = f.read()
+    match = INPUTS_COMMENT.search(source)
+    inputs = match.group(1) if match else DEFAULT_INPUTS
+
+    levels: Dict[str, dict] = {}
+    expected = None
+    for level in LEVELS:
+        quads = compile_program(source, level)
+        if not quads:
+            return None
+        output, steps = execute(quads, inputs)
+        if expected is None:
+            expected = output
+        levels[f"O{level}"] = {
+            "static": count_instructions(quads),
+            "temps": count_temporaries(quads),
+            "dynamic": steps,
+            "same_output": output == expected,
+        }
+    return {"program": os.path.relpath(filename, ROOT), "levels": levels}
+
+
+def regressions(results: List[dict], baseline: List[dict]) -> List[str]:
+    """
+    The counts which grew since the baseline, programs and levels it lacks are skipped.
+    """
+    previous = {result["program"]: result["levels"] for result in baseline}
+    found = []
+    for result in results:
+        for level, counts in result["levels"].items():
+            before = previous.get(result["program"], {}).get(level)
+            if before is None:
+                continue
+            for key in ("static", "dynamic"):
+                if counts[key] > before[key]:
+                    found.append(
+                        f"{result['program']} O{level[1:]} {key}: {before[key]} -> {counts[key]}"
+                    )
+    return found
+
+
+def report(results: List[dict]) -> None:
+    columns = "".join(f"{f'-O{level} static/temps/dynamic':>32}" for level in LEVELS)
+    print(f"{'program':<36}{columns}{'output':>10}")
+
+    totals = {f"O{level}": [0, 0, 0] for level in LEVELS}
+    for result in results:
+        row = f"{result['program']:<36}"
+        for level, counts in result["levels"].items():
+            row += f"{counts['static']:>14}{counts['temps']:>6}{counts['dynamic']:>12}"
+            total = totals[level]
+            total[0] += counts["static"]
+            total[1] += counts["temps"]
+            total[2] += counts["dynamic"]
+        same = all(counts["same_output"] for counts in result["levels"].values())
+        print(f"{row}{'same' if same else 'DIFFERS':>10}")
+
+    row = f"{'total':<36}"
+    for static, temps, dynamic in totals.values():
+        row += f"{static:>14}{temps:>6}{dynamic:>12}"
+    print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("programs", nargs="*", help="default: samples/ and benchmarks/programs/")
+    parser.add_argument("--json", default=None, help="save the measurements to this file")
+    parser.add_argument("--baseline", default=None, help="compare with saved measurements")
+    args = parser.parse_args()
+
+    results = [result for result in map(measure, args.programs or default_programs()) if result]
+    report(results)
+
+    failed = [
+        result["program"]
+        for result in results
+        if not all(counts["same_output"] for counts in result["levels"].values())
+    ]
+    for program in failed:
+        print(f"OUTPUT DIFFERS: {program}")
+
+    found = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f))
+        for regression in found:
+            print(f"REGRESSION: {regression}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    sys.exit(1 if failed or found else 0)
+
+
+if __name__ == "__main__":
+    main()
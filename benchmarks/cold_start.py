@@ -0,0 +1,60 @@
+"""
+Measures the cold-start cost of the compiler, with and without the cached LALR tables.
+
+Every measurement runs in a fresh interpreter, exactly like a `cpq.py` invocation.
+
+Usage: python benchmarks/cold_start.py [-n RUNS]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+SAMPLE = os.path.join(os.path.dirname(SRC), "samples", "sample.ou")
+
+sys.path.insert(0, SRC)
+from ParseTableCache import DISABLE_ENV  # noqa: E402
+
+
+def time_command(cmd, env, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=SRC, env=env, check=True, capture_output=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times), statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--runs", type=int, default=20)
+    runs = parser.parse_args().runs
+
+    uncached = dict(os.environ, **{DISABLE_ENV: "1"})
+    cached = {k: v for k, v in os.environ.items() if k != DISABLE_ENV}
+
+    # Warm up the table cache (and the bytecode cache) once
+    subprocess.run([sys.executable, "-c", "import CPLParser"], cwd=SRC, env=cached)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        sample = shutil.copy(SAMPLE, tmpdir)
+        commands = {
+            "import CPLParser": [sys.executable, "-c", "import CPLParser"],
+            "cpq.py sample.ou": [sys.executable, "cpq.py", sample],
+            "python -c pass (baseline)": [sys.executable, "-c", "pass"],
+        }
+
+        print(f"{'command':<28}{'tables':<10}{'min ms':>10}{'median ms':>12}")
+        for name, cmd in commands.items():
+            for label, env in (("rebuilt", uncached), ("cached", cached)):
+                best, median = time_command(cmd, env, runs)
+                print(f"{name:<28}{label:<10}{best:>10.1f}{median:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
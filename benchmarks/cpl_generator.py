@@ -0,0 +1,178 @@
+"""
+Generates valid CPL programs of a given size and shape, for benchmarking the compiler.
+
+Shapes:
+    straight  long straight-line code: assignments, input and output
+    nested    `while` and `if` statements nested inside each other, `depth` levels deep
+    wide      a few statements with very long expressions, spanning many lines
+    decls     many declarations, the first variable of each is read by `input`
+
+Usage: python benchmarks/cpl_generator.py SHAPE LINES [--depth N] [--seed N] > program.ou
+"""
+import argparse
+import random
+from typing import Callable, Dict, List, Optional
+
+INT_VARS = [f"i{n}" for n in range(16)]
+FLOAT_VARS = [f"f{n}" for n in range(8)]
+RELOPS = ["==", "!=", "<", ">", "<=", ">="]
+
+
+def declarations(ints: List[str], floats: List[str]) -> List[str]:
+    return [f"{', '.join(ints)}: int;", f"{', '.join(floats)}: float;"]
+
+
+# Lines of the declarations, braces and inputs every program but "decls" starts with
+PROLOGUE = len(INT_VARS) + len(FLOAT_VARS) + 4
+# Deeper levels are not indented further, so the program's size stays linear in its depth
+MAX_INDENT = 16
+
+
+def inputs() -> List[str]:
+    return [f"    input({name});" for name in INT_VARS + FLOAT_VARS]
+
+
+def int_expression(rng: random.Random, terms: int) -> str:
+    parts = [rng.choice(INT_VARS + [str(rng.randint(0, 99))])]
+    for _ in range(terms - 1):
+        operand = rng.choice(INT_VARS + [str(rng.randint(1, 99))])
+        if rng.random() < 0.2:
+            operand = f"({operand} + {rng.randint(1, 9)})"
+        parts.append(f"{rng.choice('+-*')} {operand}")
+    return " ".join(parts)
+
+
+def float_expression(rng: random.Random, terms: int) -> str:
+    # Mixes int and float operands, so the parser inserts casts
+    parts = [rng.choice(FLOAT_VARS)]
+    for _ in range(terms - 1):
+        operand = rng.choice(FLOAT_VARS + INT_VARS + [f"{rng.randint(1, 99)}.5"])
+        parts.append(f"{rng.choice('+-*')} {operand}")
+    return " ".join(parts)
+
+
+def condition(rng: random.Random) -> str:
+    comparison = f"{rng.choice(INT_VARS)} {rng.choice(RELOPS)} {rng.randint(0, 50)}"
+    if rng.random() < 0.3:
+        other = f"{rng.choice(INT_VARS)} {rng.choice(RELOPS)} {rng.choice(INT_VARS)}"
+        comparison = f"{comparison} {rng.choice(['&&', '||'])} {other}"
+    return comparison
+
+
+def statement(rng: random.Random) -> str:
+    choice = rng.random()
+    if choice < 0.6:
+        return f"{rng.choice(INT_VARS)} = {int_expression(rng, rng.randint(1, 5))};"
+    if choice < 0.8:
+        return f"{rng.choice(FLOAT_VARS)} = {float_expression(rng, rng.randint(1, 4))};"
+    if choice < 0.9:
+        return f"output({int_expression(rng, 2)});"
+    return f"input({rng.choice(INT_VARS)});"
+
+
+def straight(lines: int, rng: random.Random) -> List[str]:
+    body = [f"    {statement(rng)}" for _ in range(max(0, lines - PROLOGUE))]
+    return declarations(INT_VARS, FLOAT_VARS) + ["{"] + inputs() + body + ["}"]
+
+
+def nest(depth: int, rng: random.Random) -> List[str]:
+    """
+    Every level is a `while` or an `if` (whose else branch is a single statement)
+    around a statement and the next level.
+    """
+    opening, closing = [], []
+    for level in range(depth):
+        indent = "    " * min(level + 1, MAX_INDENT)
+        keyword = "while" if rng.random() < 0.5 else "if"
+        opening.append(f"{indent}{keyword} ({condition(rng)}) {{")
+        opening.append(f"{indent}    {statement(rng)}")
+        if keyword == "while":
+            closing.append(f"{indent}}}")
+        else:
+            closing.append(f"{indent}}} else {statement(rng)}")
+    return opening + closing[::-1]
+
+
+def nested(lines: int, rng: random.Random, depth: int = 32) -> List[str]:
+    """
+    Nests of `depth` levels one after the other, three lines per level.
+    """
+    levels = max(1, (lines - PROLOGUE) // 3)
+    body: List[str] = []
+    while levels > 0:
+        body.extend(nest(min(depth, levels), rng))
+        levels -= depth
+    return declarations(INT_VARS, FLOAT_VARS) + ["{"] + inputs() + body + ["}"]
+
+
+def wide(lines: int, rng: random.Random) -> List[str]:
+    """
+    Expressions of 200 lines each, 8 terms per line.
+    """
+    body: List[str] = []
+    remaining = max(1, lines - PROLOGUE)
+    while remaining > 0:
+        rows = min(200, remaining)
+        target = rng.choice(INT_VARS)
+        rows_text = [int_expression(rng, 8) for _ in range(rows)]
+        body.append(f"    {target} = {rows_text[0]}")
+        body.extend(f"        + {row}" for row in rows_text[1:])
+        body[-1] += ";"
+        remaining -= rows
+    return declarations(INT_VARS, FLOAT_VARS) + ["{"] + inputs() + body + ["}"]
+
+
+def decls(lines: int, rng: random.Random) -> List[str]:
+    """
+    Half of the lines declare variables, ten per declaration, the other half use them.
+    """
+    count = max(1, (lines - 4) // 2)
+    program: List[str] = []
+    names: List[str] = []
+    for n in range(count):
+        group = [f"v{n}x{k}" for k in range(10)]
+        program.append(f"{', '.join(group)}: {rng.choice(['int', 'float'])};")
+        names.append(group[0])
+    program.append("{")
+    program.extend(f"    input({name});" for name in names)
+    program.append("}")
+    return program
+
+
+SHAPES: Dict[str, Callable[..., List[str]]] = {
+    "straight": straight,
+    "nested": nested,
+    "wide": wide,
+    "decls": decls,
+}
+
+
+def generate(shape: str, lines: int, seed: int = 0, depth: Optional[int] = None) -> str:
+    """
+    A valid CPL program of about `lines` lines.
+
+    Args:
+        shape (str): one of SHAPES
+        lines (int)
+        seed (int): the same seed always generates the same program
+        depth (Optional[int]): nesting depth of the "nested" shape, default 32
+
+    Returns:
+        str
+    """
+    options = {} if depth is None else {"depth": depth}
+    return "\n".join(SHAPES[shape](lines, random.Random(seed), **options)) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("shape", choices=list(SHAPES))
+    parser.add_argument("lines", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--depth", type=int, default=None, help="nesting depth of `nested`")
+    args = parser.parse_args()
+    print(generate(args.shape, args.lines, args.seed, args.depth), end="")
+
+
+if __name__ == "__main__":
+    main()
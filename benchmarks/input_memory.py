@@ -0,0 +1,93 @@
+"""
+Compares the peak memory of compiling generated CPL programs (see cpl_generator.py) read
+into a string with compiling them memory-mapped (`cpq --mmap`).
+
+Every compilation runs in its own process, whose peak RSS is taken from `cpq --stats`.
+Besides the total, the peak above a tiny program's is divided by the source size, a ratio
+which stays flat as the programs grow if the memory scales with the compiled code only.
+
+Usage: python benchmarks/input_memory.py [--shape decls] [--sizes 10000,100000] [--json FILE]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cpl_generator import SHAPES, generate  # noqa: E402
+
+CPQ = os.path.join(ROOT, "src", "cpq.py")
+MODES = {"read": [], "mmap": ["--mmap"]}
+DEFAULT_SIZES = [10_000, 100_000]
+
+
+def compile_stats(filename: str, mode: str) -> dict:
+    """
+    The statistics of compiling `filename` in a fresh process.
+    """
+    stats_file = f"{filename}.stats.jsonl"
+    if os.path.exists(stats_file):
+        os.remove(stats_file)
+    subprocess.run(
+        [sys.executable, CPQ, filename, "-q", "--stats", stats_file, *MODES[mode]],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    with open(stats_file) as f:
+        return json.loads(f.readline())
+
+
+def measure(directory: str, shape: str, lines: int) -> Dict[str, dict]:
+    filename = os.path.join(directory, f"{shape}{lines}.ou")
+    with open(filename, "w") as f:
+        f.write(generate(shape, lines))
+    size_mb = os.path.getsize(filename) / 2**20
+    results = {}
+    for mode in MODES:
+        stats = compile_stats(filename, mode)
+        results[mode] = {
+            "lines": lines,
+            "source_mb": size_mb,
+            "peak_mb": stats["peak_memory_kb"] / 1024,
+            "seconds": stats["total_seconds"],
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shape", choices=list(SHAPES), default="decls")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)))
+    parser.add_argument("--json", default=None, help="write all measurements to this file")
+    args = parser.parse_args()
+
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+    results: List[Dict[str, dict]] = []
+    with tempfile.TemporaryDirectory() as directory:
+        baseline = measure(directory, args.shape, 10)
+        print(f"{'lines':>10}{'source MB':>11}" + "".join(
+            f"{f'{mode} peak MB':>15}{'MB/source MB':>14}{'seconds':>9}" for mode in MODES
+        ))
+        for lines in sizes:
+            result = measure(directory, args.shape, lines)
+            results.append(result)
+            row = f"{lines:>10}{result['read']['source_mb']:>11.1f}"
+            for mode, measured in result.items():
+                growth = measured["peak_mb"] - baseline[mode]["peak_mb"]
+                ratio = growth / max(measured["source_mb"], 1e-9)
+                row += f"{measured['peak_mb']:>15.1f}{ratio:>14.2f}{measured['seconds']:>9.2f}"
+            print(row)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"shape": args.shape, "measurements": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Reports the instruction count of every program in samples/ before and after each
+optimization pass (passes are applied cumulatively, in the listed order), the peak number
+of temporaries live at the same time before and after, and checks that the optimized
+programs still print the same output.
+
+Usage: python benchmarks/opt_report.py [samples/*.ou ...]
+"""
+import glob
+import io
+import os
+import sys
+from contextlib import redirect_stderr, redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from CPLCompiler import CPLCompiler  # noqa: E402
+from PassManager import PIPELINE  # noqa: E402
+from Quad import count_instructions  # noqa: E402
+from QuadInterpreter import QuadError, QuadInterpreter  # noqa: E402
+from TempAllocator import peak_temporaries  # noqa: E402
+
+PASSES = list(PIPELINE.items())
+
+# Enough values for every `input` in the samples, all integers so they suit IINP and RINP
+INPUTS = " ".join(["7", "3", "5", "2", "9", "4", "12", "1"] * 4)
+MAX_STEPS = 1_000_000
+
+
+def execute(quads):
+    """
+    The observable behavior of a program: its output, and whether it stopped with an error.
+    """
+    output = io.StringIO()
+    try:
+        QuadInterpreter(quads).run(io.StringIO(INPUTS), output, MAX_STEPS)
+    except QuadError:
+        return output.getvalue() + "<runtime error>"
+    return output.getvalue()
+
+
+def compile_file(filename):
+    with open(filename) as f:
+        compiler = CPLCompiler(f.read(), "report.qud")
+    with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+        compiler.run()
+    return compiler
+
+
+def main(filenames):
+    header = f"{'program':<24}{'-O0':>6}" + "".join(f"{name:>8}" for name, _ in PASSES)
+    print(f"{header}{'live temps':>12}{'output':>10}")
+
+    for filename in filenames:
+        compiler = compile_file(filename)
+        if not compiler.quads:
+            continue
+
+        quads = compiler.quads
+        expected = execute(quads)
+        counts = [count_instructions(quads)]
+        for _, optimization in PASSES:
+            quads = optimization(quads, compiler.symtab)
+            counts.append(count_instructions(quads))
+
+        same = "same" if execute(quads) == expected else "DIFFERS"
+        temps = f"{peak_temporaries(compiler.quads)}->{peak_temporaries(quads)}"
+        row = f"{os.path.basename(filename):<24}{counts[0]:>6}"
+        print(row + "".join(f"{c:>8}" for c in counts[1:]) + f"{temps:>12}{same:>10}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or sorted(glob.glob(os.path.join(ROOT, "samples", "*.ou"))))
@@ -0,0 +1,197 @@
+"""
+Compiles generated CPL programs of growing size (see cpl_generator.py) and reports
+throughput, peak memory and how the compile time of every phase scales with the size.
+
+Every phase's time is fitted to `time ~ lines ** exponent` over the measured sizes, an
+exponent above the threshold (default 1.25) flags non-linear scaling, e.g. quadratic
+string building, and makes the script exit with code 1.
+
+Usage: python benchmarks/scaling.py [--shapes straight,nested] [--sizes 1000,10000,100000]
+                                    [-O LEVEL] [--depth N] [--repeat N] [--no-memory]
+                                    [--json FILE]
+"""
+import argparse
+import io
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stderr
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cpl_generator import SHAPES, generate  # noqa: E402
+from CompileStats import CompileStats  # noqa: E402
+from CPLCompiler import CPLCompiler  # noqa: E402
+from PassManager import OPTIMIZATION_LEVELS, compiler_options  # noqa: E402
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+
+def compile_once(program: str, level: int) -> CompileStats:
+    compiler = CPLCompiler(program, "bench.qud", collect_stats=True, **compiler_options(level))
+    errors = io.StringIO()
+    with redirect_stderr(errors):
+        compiler.run()
+    if not compiler.program:
+        raise RuntimeError(f"The generated program does not compile:\n{errors.getvalue()[:500]}")
+    return compiler.stats
+
+
+def peak_allocated_mb(program: str, level: int) -> float:
+    """
+    The peak memory Python allocated while compiling, measured in a separate run
+    since tracing allocations slows the compiler down.
+    """
+    tracemalloc.start()
+    try:
+        compile_once(program, level)
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def measure(
+    shape: str, lines: int, level: int, repeat: int, memory: bool, depth: Optional[int] = None
+) -> dict:
+    program = generate(shape, lines, depth=depth)
+    runs = [compile_once(program, level) for _ in range(repeat)]
+    best = min(runs, key=lambda stats: stats.total_seconds)
+    seconds = max(best.total_seconds, 1e-9)
+    lines = program.count("\n")
+    phases = dict(best.phases)
+    phases.update({f"optimize/{p['name']}": p["seconds"] for p in best.passes})
+    return {
+        "shape": shape,
+        "lines": lines,
+        "tokens": best.tokens,
+        "seconds": seconds,
+        "phases": phases,
+        "lines_per_second": lines / seconds,
+        "tokens_per_second": best.tokens / seconds,
+        "peak_mb": peak_allocated_mb(program, level) if memory else None,
+    }
+
+
+def scaling_exponent(sizes: List[float], times: List[float]) -> Optional[float]:
+    """
+    The least squares slope of log(time) over log(size), None for fewer than two sizes.
+    """
+    points = [(math.log(n), math.log(max(t, 1e-9))) for n, t in zip(sizes, times)]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if variance == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+def exponents(results: List[dict]) -> Dict[str, Optional[float]]:
+    """
+    The scaling exponent of the total time, of every phase and of every optimization pass.
+    """
+    sizes = [result["lines"] for result in results]
+    fitted = {"total": scaling_exponent(sizes, [result["seconds"] for result in results])}
+    for phase in results[0]["phases"]:
+        times = [result["phases"].get(phase, 0.0) for result in results]
+        # Phases taking a few milliseconds are dominated by noise
+        if max(times) >= 0.01:
+            fitted[phase] = scaling_exponent(sizes, times)
+    return fitted
+
+
+def report(shape: str, results: List[dict], threshold: float) -> List[str]:
+    """
+    Prints the measurements of a shape, returns the phases scaling worse than `threshold`.
+    """
+    print(f"\n{shape}")
+    print(
+        f"{'lines':>10}{'tokens':>10}{'seconds':>10}{'lines/s':>12}{'tokens/s':>12}{'peak MB':>10}"
+    )
+    for result in results:
+        peak = "-" if result["peak_mb"] is None else f"{result['peak_mb']:.1f}"
+        print(
+            f"{result['lines']:>10}{result['tokens']:>10}{result['seconds']:>10.3f}"
+            f"{result['lines_per_second']:>12.0f}{result['tokens_per_second']:>12.0f}{peak:>10}"
+        )
+
+    flagged = []
+    fitted = exponents(results)
+    for phase, exponent in fitted.items():
+        if exponent is None:
+            continue
+        nonlinear = exponent > threshold
+        if nonlinear:
+            flagged.append(f"{shape}/{phase}")
+        mark = "  NON-LINEAR" if nonlinear else ""
+        print(f"  {phase:<16} time ~ lines^{exponent:.2f}{mark}")
+    return flagged
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shapes", default=",".join(SHAPES))
+    parser.add_argument(
+        "--sizes",
+        default=",".join(map(str, DEFAULT_SIZES)),
+        help="program sizes in lines, e.g. 1000,10000,100000,1000000",
+    )
+    parser.add_argument(
+        "-O", dest="level", type=int, choices=sorted(OPTIMIZATION_LEVELS), default=0
+    )
+    parser.add_argument(
+        "--depth",
+        type=int,
+        default=None,
+        help="nesting depth of the nested shape (default 32), e.g. a third of the size to "
+        "measure how the compiler scales with the depth",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="runs per size, the fastest counts")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    parser.add_argument("--json", default=None, help="write all measurements to this file")
+    args = parser.parse_args()
+
+    shapes = args.shapes.split(",")
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+
+    start = time.perf_counter()
+    measurements: Dict[str, List[dict]] = {}
+    flagged: List[str] = []
+    for shape in shapes:
+        measurements[shape] = [
+            measure(shape, size, args.level, args.repeat, not args.no_memory, args.depth)
+            for size in sizes
+        ]
+        flagged.extend(report(shape, measurements[shape], args.threshold))
+
+    print(f"\nFinished in {time.perf_counter() - start:.1f}s")
+    if flagged:
+        print(f"Non-linear scaling: {', '.join(flagged)}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "level": args.level,
+                    "measurements": measurements,
+                    "exponents": {
+                        shape: exponents(results) for shape, results in measurements.items()
+                    },
+                    "nonlinear": flagged,
+                },
+                f,
+                indent=2,
+            )
+    sys.exit(1 if flagged else 0)
+
+
+if __name__ == "__main__":
+    main()
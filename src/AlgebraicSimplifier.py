@@ -0,0 +1,198 @@
+import math
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from ConstantFolding import eliminate_dead_code, format_constant
+from ControlFlowGraph import split_blocks
+from Quad import Quad, is_constant
+from QuadInterpreter import parse_constant
+
+# A linear form `base + constant` ("ADD") or `base * constant` ("MLT") of an integer
+Form = Tuple[str, str, int]
+
+
+def simplify_integer(quad: Quad) -> Quad:
+    """
+    Identities of integer instructions on a repeated operand, and division by one.
+    """
+    kind, (dest, *sources) = quad.op[1:], quad.args
+    if len(sources) != 2:
+        return quad
+    a, b = sources
+    if a == b and not is_constant(a):
+        if kind == "SUB":
+            return Quad("IASN", dest, "0")
+        if kind == "EQL":
+            return Quad("IASN", dest, "1")
+        if kind in ("NQL", "LSS", "GRT"):
+            return Quad("IASN", dest, "0")
+    if kind == "DIV" and b == "1":
+        return Quad("IASN", dest, a)
+    return quad
+
+
+def simplify_real(quad: Quad) -> Quad:
+    """
+    Identities which hold exactly in floating point, for every value including -0.0,
+    infinities and NaN. Adding 0.0 (-0.0 + 0.0 is 0.0) and multiplying by 0.0 (NaN) don't.
+    """
+    kind, (dest, *sources) = quad.op[1:], quad.args
+    if len(sources) != 2:
+        return quad
+    a, b = sources
+    a_value = parse_constant(a) if is_constant(a) else None
+    b_value = parse_constant(b) if is_constant(b) else None
+
+    if kind == "MLT" and 1 in (a_value, b_value):
+        return Quad("RASN", dest, a if b_value == 1 else b)
+    if kind in ("DIV", "SUB") and b_value == (1 if kind == "DIV" else 0):
+        return Quad("RASN", dest, a)
+    if kind == "MLT" and 2 in (a_value, b_value):
+        other = a if b_value == 2 else b
+        return Quad("RADD", dest, other, other)
+    if kind == "DIV" and b_value is not None and b_value != 0 and math.isfinite(b_value):
+        # Dividing by a power of two is multiplying by its (exact) reciprocal
+        if math.frexp(b_value)[0] in (0.5, -0.5):
+            reciprocal = format_constant(1 / float(b_value))
+            if reciprocal is not None:
+                return Quad("RMLT", dest, a, reciprocal)
+    return quad
+
+
+def linear_form(quad: Quad) -> Optional[Form]:
+    """
+    The form of an integer addition, subtraction or multiplication of a variable and a literal.
+    """
+    if quad.op not in ("IADD", "ISUB", "IMLT"):
+        return None
+    a, b = quad.args[1:]
+    if is_constant(a) == is_constant(b):
+        return None
+    if is_constant(a):
+        if quad.op == "ISUB":
+            return None
+        a, b = b, a
+    constant = parse_constant(b)
+    if not isinstance(constant, int):
+        return None
+    if quad.op == "ISUB":
+        return "ADD", a, -constant
+    return quad.op[1:], a, constant
+
+
+def emit_form(dest: str, form: Form) -> Quad:
+    """
+    The cheapest instruction computing a linear form.
+    """
+    kind, base, constant = form
+    if kind == "ADD":
+        if constant == 0:
+            return Quad("IASN", dest, base)
+        if constant < 0:
+            return Quad("ISUB", dest, base, str(-constant))
+        return Quad("IADD", dest, base, str(constant))
+    if constant == 0:
+        return Quad("IASN", dest, "0")
+    if constant == 1:
+        return Quad("IASN", dest, base)
+    if constant == 2:
+        return Quad("IADD", dest, base, base)
+    return Quad("IMLT", dest, base, str(constant))
+
+
+def rewrite(quad: Quad, forms: Dict[str, Form]) -> Tuple[Quad, Optional[Form]]:
+    """
+    Applies the identities to an instruction, and reassociates it with the linear form
+    of its operand. Returns the rewritten instruction and its linear form, if it has one.
+    """
+    if quad.op[0] == "R":
+        quad = simplify_real(quad)
+    elif quad.op[0] == "I":
+        quad = simplify_integer(quad)
+
+    form = linear_form(quad)
+    if form is not None:
+        kind, base, constant = form
+        inner = forms.get(base)
+        if inner is not None and inner[0] == kind:
+            combined = inner[2] + constant if kind == "ADD" else inner[2] * constant
+            form = (kind, inner[1], combined)
+        quad = emit_form(quad.args[0], form)
+    return quad, form
+
+
+def simplify_block(block: List[Quad]) -> List[Quad]:
+    """
+    Applies the identities and reassociates chains of literal additions or multiplications
+    of integers, while the variable they start from is not reassigned. Copies are looked
+    through, so identities like x - x also apply to a copy of x.
+    """
+    forms: Dict[str, Form] = {}
+    copies: Dict[str, str] = {}
+    # The names whose form starts from / which copy a variable, killed when it's reassigned
+    based_on: Dict[str, Set[str]] = defaultdict(set)
+    copied_from: Dict[str, Set[str]] = defaultdict(set)
+    result = []
+    for original in block:
+        quad, form = rewrite(original, forms)
+        # Reading through copies is left to copy propagation, unless it enables a rewrite
+        resolved = original.replace_sources(copies)
+        if quad == original and resolved is not original:
+            rewritten, rewritten_form = rewrite(resolved, forms)
+            if rewritten != resolved:
+                quad, form = rewritten, rewritten_form
+
+        dest = quad.dest
+        if dest is not None:
+            if dest in forms:
+                based_on[forms.pop(dest)[1]].discard(dest)
+            if dest in copies:
+                copied_from[copies.pop(dest)].discard(dest)
+            for name in based_on.pop(dest, ()):
+                del forms[name]
+            for name in copied_from.pop(dest, ()):
+                del copies[name]
+            if form is not None and form[1] != dest:
+                forms[dest] = form
+                based_on[form[1]].add(dest)
+            source = quad.args[1] if quad.op.endswith("ASN") else None
+            if source is not None and not is_constant(source):
+                source = copies.get(source, source)
+                if source != dest:
+                    copies[dest] = source
+                    copied_from[source].add(dest)
+        result.append(quad)
+    return result
+
+
+def simplify_algebra(
+    quads: List[Quad], symtab: Optional[Dict[str, str]] = None
+) -> List[Quad]:
+    """
+    Algebraic simplification and strength reduction pass.
+
+    Integer identities are removed (x + 0, x * 1, x - x, x / 1, ...), chains of literal
+    additions or multiplications are combined into one instruction and x * 2 becomes
+    x + x. Real instructions are only rewritten where the result is bit for bit the same:
+    x * 1.0, x / 1.0, x - 0.0, x * 2.0 as x + x and division by a power of two.
+
+    Strength reduction stops at x * 2. Every QUAD instruction costs the same, so
+    multiplying by any other constant with a chain of additions (x * 4 as two of them)
+    would run more instructions than the single multiplication it replaces.
+
+    examples:
+    IMLT t1 a 3 / IMLT t2 t1 2 -> IMLT t2 a 6 (t1 is removed if it's not read elsewhere)
+    IADD t1 a 0 -> IASN t1 a
+    RDIV t1 x 4.0 -> RMLT t1 x 0.25
+
+    Args:
+        quads (List[Quad])
+        symtab (Optional[Dict[str, str]]): unused, types are known from the instructions
+
+    Returns:
+        List[Quad]
+    """
+    result = []
+    for block in split_blocks(quads):
+        result.extend(simplify_block(block))
+    return eliminate_dead_code(result)
@@ -0,0 +1,247 @@
+import io
+import mmap
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from dataclasses import dataclass
+from typing import List, Optional, Union
+
+import FileHelper
+from CompileCache import CompileCache, format_stats
+from CompileStats import write_stats
+from CPLCompiler import LEXER_BACKENDS, CPLCompiler
+from CPLLexer import CPLLexer
+from CPLParser import CPLParser
+from PassManager import compiler_options
+
+# Per-process compiler state, built once by `init_worker` and reused for every file
+_lexer: Optional[CPLLexer] = None
+_parser: Optional[CPLParser] = None
+_cache: Optional[CompileCache] = None
+_optimization: dict = {}
+_collect_stats: bool = False
+_bytecode: bool = False
+_memory_map: bool = False
+
+# Mapped files are counted in slices of this many bytes, rather than copied whole
+COUNT_CHUNK = 1 << 20
+
+
+@dataclass
+class FileResult:
+    filename: str
+    success: bool
+    diagnostics: str
+    lines: int
+    seconds: float
+    cache_hit: Optional[bool] = None
+    stats: Optional[dict] = None
+
+
+def init_worker(
+    lexer_backend: str = "sly",
+    cache: Optional[CompileCache] = None,
+    optimization: Optional[dict] = None,
+    collect_stats: bool = False,
+    bytecode: bool = False,
+    memory_map: bool = False,
+) -> None:
+    global _lexer, _parser, _cache, _optimization, _collect_stats, _bytecode, _memory_map
+    _lexer = LEXER_BACKENDS[lexer_backend]()
+    _parser = CPLParser()
+    _cache = cache
+    _optimization = dict(optimization or {})
+    _collect_stats = collect_stats
+    _bytecode = bytecode
+    _memory_map = memory_map
+
+
+def count_lines(data: Union[str, bytes, mmap.mmap]) -> int:
+    if isinstance(data, mmap.mmap):
+        chunks = (data[i : i + COUNT_CHUNK] for i in range(0, len(data), COUNT_CHUNK))
+        return sum(chunk.count(b"\n") for chunk in chunks) + 1
+    return data.count(b"\n" if isinstance(data, bytes) else "\n") + 1
+
+
+def compile_file(filename: str) -> FileResult:
+    """
+    Compiles a single file into its `.qud` file.
+    Everything the compiler prints is captured, so diagnostics of different files never mix.
+
+    Args:
+        filename (str)
+
+    Returns:
+        FileResult
+    """
+    if _parser is None:
+        init_worker()
+
+    start = time.perf_counter()
+    output = io.StringIO()
+    success = False
+    lines = 0
+    cache_hit = None
+    stats = None
+
+    with redirect_stdout(output), redirect_stderr(output):
+        try:
+            if not filename.endswith(".ou"):
+                raise ValueError(
+                    'ERROR (Invalid Filename): Filenames must end with ".ou" extension.'
+                )
+            try:
+                if _memory_map:
+                    data = FileHelper.map_file(filename)
+                else:
+                    with open(filename, "r") as f:
+                        data = f.read()
+            except IOError:
+                raise ValueError(
+                    f"ERROR (Input File Does Not Exist): {filename} is not a valid path."
+                )
+
+            lines = count_lines(data)
+            outfile = FileHelper.output_filename(filename)
+            options = dict(_optimization)
+            time_passes = options.pop("time_passes", False)
+            with CPLCompiler(
+                data,
+                outfile,
+                lexer=_lexer,
+                parser=_parser,
+                cache=_cache,
+                collect_stats=_collect_stats,
+                stream=True,
+                bytecode_filename=FileHelper.bytecode_filename(outfile) if _bytecode else None,
+                **compiler_options(**options),
+            ) as compiler:
+                success = compiler.success
+                cache_hit = compiler.cache_hit
+            if compiler.stats is not None:
+                stats = {"output": outfile, **compiler.stats.to_dict()}
+            if time_passes and compiler.pass_manager and not cache_hit:
+                sys.stderr.write(compiler.pass_manager.format_stats())
+        except Exception as e:
+            sys.stderr.write(f"{e}")
+
+    return FileResult(
+        filename,
+        success,
+        output.getvalue(),
+        lines,
+        time.perf_counter() - start,
+        cache_hit,
+        stats,
+    )
+
+
+def compile_files(
+    filenames: List[str],
+    jobs: Optional[int] = None,
+    lexer_backend: str = "sly",
+    cache: Optional[CompileCache] = None,
+    optimization: Optional[dict] = None,
+    collect_stats: bool = False,
+    bytecode: bool = False,
+    memory_map: bool = False,
+) -> List[FileResult]:
+    """
+    Compiles files in parallel, results are returned in the order of `filenames`.
+
+    Args:
+        filenames (List[str])
+        jobs (Optional[int]): worker processes, defaults to the number of cores
+        lexer_backend (str): one of LEXER_BACKENDS
+        cache (Optional[CompileCache]): shared by all workers through its directory
+        optimization (Optional[dict]): level, enabled and disabled passes and `time_passes`
+        collect_stats (bool): measure every compilation into `FileResult.stats`
+        bytecode (bool): also write every program's bytecode, see QuadBytecode
+        memory_map (bool): map the files instead of reading them, see FileHelper.map_input.
+            Needs the fast lexer, which lexes the mapped bytes
+
+    Returns:
+        List[FileResult]
+    """
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(filenames)))
+    # Hand out several small files per task to amortize the inter-process overhead
+    chunksize = max(1, len(filenames) // (jobs * 4))
+
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=init_worker,
+        initargs=(lexer_backend, cache, optimization, collect_stats, bytecode, memory_map),
+    ) as executor:
+        return list(executor.map(compile_file, filenames, chunksize=chunksize))
+
+
+def report(
+    results: List[FileResult], seconds: float, jobs: int, cache_stats: bool = False
+) -> None:
+    """
+    Prints the diagnostics of every file followed by a throughput and failure summary.
+    """
+    for result in results:
+        if result.diagnostics:
+            sys.stderr.write(f"==> {result.filename} <==\n{result.diagnostics}")
+            if not result.diagnostics.endswith("\n"):
+                sys.stderr.write("\n")
+
+    failed = [result.filename for result in results if not result.success]
+    lines = sum(result.lines for result in results)
+    seconds = max(seconds, 1e-9)
+
+    print(
+        f"Compiled {len(results)} files ({len(results) - len(failed)} succeeded, "
+        f"{len(failed)} failed) in {seconds:.2f}s using {jobs} workers: "
+        f"{len(results) / seconds:.1f} files/s, {lines / seconds:.0f} lines/s"
+    )
+    for filename in failed:
+        print(f"FAILED: {filename}")
+
+    if cache_stats:
+        lookups = [result.cache_hit for result in results if result.cache_hit is not None]
+        stats = {"hits": lookups.count(True), "misses": lookups.count(False)}
+        sys.stderr.write(f"{format_stats(stats)}\n")
+
+
+def run(
+    inputs: List[str],
+    jobs: Optional[int] = None,
+    cache: Optional[CompileCache] = None,
+    cache_stats: bool = False,
+    optimization: Optional[dict] = None,
+    stats: Optional[str] = None,
+    bytecode: bool = False,
+    memory_map: bool = False,
+) -> int:
+    """
+    Batch mode entry point.
+
+    Returns:
+        int: exit code, 1 if any file failed to compile
+    """
+    filenames = FileHelper.collect_input_files(inputs)
+    if not filenames:
+        sys.stderr.write("ERROR (No Input File): No `.ou` files were found.\n")
+        return 0
+
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(filenames)))
+    start = time.perf_counter()
+    results = compile_files(
+        filenames,
+        jobs,
+        lexer_backend="fast" if memory_map else "sly",
+        cache=cache,
+        optimization=optimization,
+        collect_stats=stats is not None,
+        bytecode=bytecode,
+        memory_map=memory_map,
+    )
+    report(results, time.perf_counter() - start, jobs, cache_stats)
+    if stats is not None:
+        write_stats([result.stats for result in results if result.stats], stats)
+
+    return 0 if all(result.success for result in results) else 1
@@ -1,17 +1,186 @@
+import os
 import sys
-from typing import List
+import time
+import uuid
+from contextlib import contextmanager, suppress
+from dataclasses import asdict, dataclass, field
+from mmap import mmap
+from typing import Dict, Iterable, List, Optional, Sequence, TextIO, Union
 
-from CPLLexer import CPLLexer
+from CompileCache import CompileCache
+from CompileStats import CompileStats, Hook, peak_memory_kb, timed_tokens
+from CPLFastLexer import CPLFastLexer
+from CPLLexer import CPLLexer, PrintedDiagnostics, report
 from CPLParser import CPLParser
+from PassManager import Pass, PassManager
+from Quad import Quad, count_instructions, render, render_chunks
+from QuadBytecode import encode
+from QuadInterpreter import parse_program
+
+# Interchangeable lexer implementations, both produce the same token stream
+LEXER_BACKENDS = {
+    "sly": CPLLexer,
+    "fast": CPLFastLexer,
+}
+
+
+def write_output(
+    filename: str,
+    chunks: Iterable[Union[str, bytes]],
+    echo: Optional[TextIO] = None,
+    trailer: str = "",
+    binary: bool = False,
+) -> None:
+    """
+    Writes the chunks into a temporary file next to `filename`, which replaces it once
+    complete, so a failure never leaves a partial file behind.
+
+    Args:
+        filename (str)
+        chunks (Iterable[str])
+        echo (Optional[TextIO]): every chunk is written to it as well
+        trailer (str): written to the file only, after the chunks
+        binary (bool): the chunks are bytes
+    """
+    directory, name = os.path.split(os.path.abspath(filename))
+    tmp_path = os.path.join(directory, f".{name}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        with open(tmp_path, "xb" if binary else "x") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                if echo is not None:
+                    echo.write(chunk)
+            if trailer:
+                f.write(trailer)
+        os.replace(tmp_path, filename)
+    except BaseException:
+        with suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+
+@dataclass
+class CompileResult:
+    """
+    The outcome of `compile_source`.
+
+    Attributes:
+        program (str): the rendered QUAD program, empty if compilation failed
+        quads (List[Quad]): its instructions, empty on a cache hit
+        symtab (Dict[str, str]): the declared type of every variable, see CPLCompiler.symtab
+        diagnostics (List[str]): lexical, syntax and semantic errors, in the order found
+        stats (Optional[CompileStats]): if requested with `collect_stats`
+        cache_hit (Optional[bool]): None when no cache is used
+    """
+
+    program: str
+    quads: List[Quad] = field(default_factory=list)
+    symtab: Dict[str, str] = field(default_factory=dict)
+    diagnostics: List[str] = field(default_factory=list)
+    stats: Optional[CompileStats] = None
+    cache_hit: Optional[bool] = None
+
+    @property
+    def success(self) -> bool:
+        return bool(self.program)
+
+
+def compile_source(source: str, **options) -> CompileResult:
+    """
+    Compiles a CPL program without reading or writing files or printing anything.
+
+    To compile many programs, pass the same `lexer` and `parser` to every call, which are
+    reset for each program. A lexer and a parser compile a single program at a time,
+    see CompilerPool for sharing them between threads.
+
+    example:
+    result = compile_source(source, parser=parser, collect_stats=True, **compiler_options(2))
+
+    Args:
+        source (str): the CPL program
+        options: CPLCompiler's arguments, besides the output file and `diagnostics`
+
+    Returns:
+        CompileResult
+    """
+    diagnostics: List[str] = []
+    compiler = CPLCompiler(source, "", diagnostics=diagnostics, **options)
+    compiler.run()
+    return CompileResult(
+        compiler.program,
+        compiler.quads,
+        compiler.symtab,
+        diagnostics,
+        compiler.stats,
+        compiler.cache_hit,
+    )
 
 
 class CPLCompiler:
-    def __init__(self, input_cpl_program: str, output_filename: str):
-        self._lexer: CPLLexer = CPLLexer()
-        self._parser: CPLParser = CPLParser()
-        self._cpl_program: str = input_cpl_program
+    def __init__(
+        self,
+        input_cpl_program: Union[str, bytes, mmap],
+        output_filename: str,
+        lexer_backend: str = "sly",
+        lexer: Optional[CPLLexer] = None,
+        parser: Optional[CPLParser] = None,
+        cache: Optional[CompileCache] = None,
+        passes: Sequence[Pass] = (),
+        pass_manager: Optional[PassManager] = None,
+        short_circuit: bool = False,
+        compact_conditions: bool = False,
+        collect_stats: bool = False,
+        hooks: Sequence[Hook] = (),
+        diagnostics: Optional[List[str]] = None,
+        stream: bool = False,
+        echo: Optional[TextIO] = None,
+        bytecode_filename: Optional[str] = None,
+    ):
+        """
+        Args:
+            input_cpl_program (Union[str, bytes, mmap]): the source, or its UTF-8 bytes, which
+                the fast lexer scans without decoding all of them (see FileHelper.map_input)
+            output_filename (str)
+            lexer_backend (str): one of LEXER_BACKENDS, ignored if a lexer is given
+            lexer, parser: existing instances to reuse instead of building new ones
+            cache (Optional[CompileCache]): serves unchanged programs without compiling them
+            passes (Sequence[Pass]): optimization passes, applied in order
+            pass_manager (Optional[PassManager]): optimization pipeline, run after `passes`
+            short_circuit (bool): compile boolean expressions to jumping code (see CPLParser)
+            compact_conditions (bool): single instruction comparisons (see CPLParser)
+            collect_stats (bool): measure the compilation into `stats`, implied by `hooks`
+            hooks (Sequence[Hook]): called as every phase ends, see CompileStats.Hook
+            diagnostics (Optional[List[str]]): collects the lexical, syntax and semantic
+                errors instead of printing them
+            stream (bool): render the program in chunks while `__exit__` writes it, instead
+                of holding all of it in memory. `program` is then rendered on demand
+            echo (Optional[TextIO]): `__exit__` writes the program to it too, e.g. stdout
+            bytecode_filename (Optional[str]): `__exit__` also writes the program as binary
+                bytecode (see QuadBytecode) to this file
+        """
+        self._lexer: CPLLexer = lexer or LEXER_BACKENDS[lexer_backend]()
+        self._parser: CPLParser = parser or CPLParser()
+        self._parser.short_circuit = short_circuit
+        self._parser.compact_conditions = compact_conditions
+        self._diagnostics: Optional[List[str]] = diagnostics
+        if not isinstance(input_cpl_program, str) and not isinstance(self._lexer, CPLFastLexer):
+            input_cpl_program = str(input_cpl_program, "utf-8")
+        self._cpl_program: Union[str, bytes, mmap] = input_cpl_program
         self._output_filename: str = output_filename
+        self._quads: List[Quad] = []
         self._output_program: str = ""
+        self._stream: bool = stream
+        self._rendered: bool = False  # Whether `_output_program` holds the program
+        self._echo: Optional[TextIO] = echo
+        self._bytecode_filename: Optional[str] = bytecode_filename
+        self._cached_types: Optional[Dict[str, str]] = None  # Declared types on a cache hit
+        self._cache: Optional[CompileCache] = cache
+        self._passes: Sequence[Pass] = passes
+        self._pass_manager: Optional[PassManager] = pass_manager
+        self._hooks: Sequence[Hook] = hooks
+        self._collect_stats: bool = collect_stats or bool(hooks)
+        self.cache_hit: Optional[bool] = None  # None when no cache is used
+        self.stats: Optional[CompileStats] = None
 
     def __enter__(self):
         self.run()
@@ -25,25 +194,176 @@ class CPLCompiler:
             )
             return
 
-        if not self.program:
+        if not self.success:
             sys.stderr.write(
                 "An error occured in any of the compilation phases \
 so a '.qud' file will not be outputted.\nSee stderr for more info."
             )
             return
 
-        with open(self.outfile, "w") as f:
-            f.write(self.program)
-            f.write("Signature Line - Liam Aslan, 215191347")
+        with self._phase("write"):
+            chunks = [self._output_program] if self._rendered else render_chunks(self._quads)
+            write_output(
+                self.outfile, chunks, self._echo, trailer="Signature Line - Liam Aslan, 215191347"
+            )
+            if self._bytecode_filename:
+                write_output(self._bytecode_filename, [self.bytecode()], binary=True)
+
+    def _notify(self, event: str) -> None:
+        for hook in self._hooks:
+            hook(event, self.stats)
+
+    @contextmanager
+    def _phase(self, name: str):
+        """
+        Times the phase into `stats` and notifies the hooks when it ends.
+        """
+        if self.stats is None:
+            yield
+            return
+        start = time.perf_counter()
+        yield
+        self.stats.add_time(name, time.perf_counter() - start)
+        self._notify(name)
 
     def run(self):
+        """
+        Compiles the program. On a cache hit only the rendered program is available,
+        the instructions (`quads`) are left empty.
+        """
+        self.stats = CompileStats() if self._collect_stats else None
+        # Set on every run, since the lexer and parser may be shared with other compilers
+        self._lexer.diagnostics = self._parser.diagnostics = self._diagnostics
+        if self._cache and self._diagnostics is None:
+            # Lexical errors don't stop the compilation, so they are kept to be cached
+            # with the program and reported again on a hit
+            self._lexer.diagnostics = PrintedDiagnostics()
+        try:
+            self._compile()
+        finally:
+            if self.stats is not None:
+                self._finish_stats()
+
+    def _compile(self):
+        if self._cache:
+            with self._phase("cache"):
+                key = self._cache.key(self._cpl_program, self.options)
+                # Bytecode needs the declared types, which a cached program may lack
+                required = ("types",) if self._bytecode_filename else ()
+                cached = self._cache.get_entry(key, required)
+            self.cache_hit = cached is not None
+            if self.cache_hit:
+                self._output_program, metadata = cached
+                self._cached_types = metadata.get("types")
+                self._rendered = True
+                for message in metadata.get("diagnostics", ()):
+                    report(self._diagnostics, message)
+                return
+            reported = len(self._lexer.diagnostics)
+
+        self._parser.reset()
         tokens = self._lexer.tokenize(self._cpl_program)
-        self._output_program = self._parser.parse(tokens)
+        if self.stats is None:
+            code = self._parser.parse(tokens)
+        else:
+            start = time.perf_counter()
+            code = self._parser.parse(timed_tokens(tokens, self.stats))
+            lexing = self.stats.phases.get("lex", 0.0)
+            self.stats.add_time("parse", time.perf_counter() - start - lexing)
+            self._notify("lex")
+            self._notify("parse")
+        if code is None:
+            return
+
+        with self._phase("optimize"):
+            self._quads = code.flatten()
+            for optimization in self._passes:
+                self._quads = optimization(self._quads, self._parser.symtab)
+            if self._pass_manager:
+                self._quads = self._pass_manager.run(self._quads, self._parser.symtab)
+        # Streamed programs are rendered as they are written, unless the cache stores them
+        if self._stream and not self._cache:
+            return
+        with self._phase("render"):
+            self._output_program = render(self._quads)
+            self._rendered = True
+
+        if self._cache:
+            with self._phase("cache"):
+                metadata = {}
+                diagnostics = self._lexer.diagnostics[reported:]
+                if diagnostics:
+                    metadata["diagnostics"] = diagnostics
+                if self._bytecode_filename:
+                    metadata["types"] = self._parser.symtab
+                self._cache.put(key, self._output_program, metadata)
+
+    def _finish_stats(self):
+        stats = self.stats
+        stats.cache_hit = self.cache_hit
+        if not self.cache_hit:
+            stats.reductions = self._parser.reductions
+            stats.symbols = len(self._parser.symtab)
+            stats.temporaries = self._parser.var_counter
+            stats.labels = self._parser.label_counter
+            stats.instructions = count_instructions(self._quads)
+            if self._pass_manager:
+                stats.passes = [asdict(s) for s in self._pass_manager.stats.values()]
+        stats.peak_memory_kb = peak_memory_kb()
+        self._notify("finished")
+
+    @property
+    def options(self) -> dict:
+        """
+        Everything besides the source program which affects the generated code.
+        """
+        return {
+            "lexer": type(self._lexer).__name__,
+            "passes": [optimization.__name__ for optimization in self._passes],
+            "pipeline": self._pass_manager.passes if self._pass_manager else [],
+            "short_circuit": self._parser.short_circuit,
+            "compact_conditions": self._parser.compact_conditions,
+        }
 
     @property
-    def program(self):
+    def pass_manager(self) -> Optional[PassManager]:
+        return self._pass_manager
+
+    @property
+    def quads(self) -> List[Quad]:
+        return self._quads
+
+    @property
+    def symtab(self) -> Dict[str, str]:
+        """
+        The declared type ("I" or "R") of every variable. On a cache hit, only the types
+        cached with the program are known, see `bytecode`.
+        """
+        if self.cache_hit:
+            return self._cached_types or {}
+        return self._parser.symtab
+
+    @property
+    def program(self) -> str:
+        if not self._rendered and self._quads:
+            self._output_program = render(self._quads)
+            self._rendered = True
         return self._output_program
 
+    def bytecode(self) -> bytes:
+        """
+        The program as binary bytecode, see QuadBytecode. On a cache hit, the instructions
+        are parsed from the cached program, and the declared types are those cached with it
+        when compiling with a `bytecode_filename`.
+        """
+        if self.cache_hit:
+            return encode(parse_program(self.program), self.symtab)
+        return encode(self._quads, self.symtab)
+
+    @property
+    def success(self) -> bool:
+        return bool(self._quads or self._output_program)
+
     @property
     def outfile(self):
         return self._output_filename
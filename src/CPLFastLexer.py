@@ -0,0 +1,142 @@
+import re
+
+from sly.lex import Token
+
+from CPLLexer import CPLLexer
+
+# Whitespace \s matches in a str but not in bytes
+UNICODE_SPACES = (
+    "\x1c\x1d\x1e\x1f\x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008"
+    "\u2009\u200a\u2028\u2029\u202f\u205f\u3000"
+)
+
+
+def utf8_alternatives(chars: str) -> str:
+    """
+    A bytes pattern alternation matching the UTF-8 encoding of any of the characters.
+    """
+    return "|".join("".join(f"\\x{byte:02x}" for byte in char.encode()) for char in chars)
+
+
+class CPLFastLexer:
+    """
+    Drop-in alternative to CPLLexer with the same token stream contract.
+
+    The whole buffer is scanned once by a single master pattern, identifiers are
+    recognized once and keywords are looked up in a dict, and line numbers are
+    counted inside the skipped whitespace and comments.
+
+    The source may also be bytes, a memory-mapped file for instance, which is scanned in
+    place: only the lexemes of tokens are decoded.
+    """
+
+    tokens = CPLLexer.tokens
+
+    keywords = {
+        "else": "ELSE",
+        "float": "FLOAT",
+        "if": "IF",
+        "input": "INPUT",
+        "int": "INT",
+        "output": "OUTPUT",
+        "while": "WHILE",
+    }
+
+    punctuation = {
+        "{": "LCBRACE",
+        "}": "RCBRACE",
+        "(": "LBRACE",
+        ")": "RBRACE",
+        ",": "COMMA",
+        ":": "COLON",
+        ";": "SEMICOLON",
+        "=": "ASSIGN",
+        "+": "ADDOP",
+        "-": "ADDOP",
+        "*": "MULOP",
+        "/": "MULOP",
+        "!": "NOT",
+    }
+
+    # Spaces and tabs before a token are consumed with it, only whitespace runs
+    # containing newlines and comments are matched on their own (SKIP).
+    # Alternatives are tried in order, so comments come before "/" and RELOP before "=" and "!"
+    _comment = r"/\*[^*]*\*+(?:[^/*][^*]*\*+)*/"
+    _tokens = (
+        r"|(?P<CAST>static_cast<int>|static_cast<float>)"
+        r"|(?P<ID>[a-zA-Z][a-zA-Z0-9]*)"
+        r"|(?P<NUM>[0-9]+\.[0-9]*|[0-9]+)"
+        r"|(?P<RELOP>>=|<=|==|!=|<|>)"
+        r"|(?P<OR>\|\|)"
+        r"|(?P<AND>&&)"
+        r"|(?P<PUNCT>[{}(),:;=+\-*/!])"
+    )
+    _master_re = re.compile(
+        rf"[ \t]*(?:(?P<SKIP>\s+|{_comment})" + _tokens + r"|(?P<ERROR>.))", re.DOTALL
+    )
+    # Matches bytes-like sources, e.g. a memory-mapped file, without decoding all of it.
+    # Whitespace and bad characters are the same as in the decoded text: \s only matches
+    # ASCII whitespace in bytes, and a bad character is a whole UTF-8 sequence
+    _master_re_bytes = re.compile(
+        (
+            rf"[ \t]*(?:(?P<SKIP>(?:\s|{utf8_alternatives(UNICODE_SPACES)})+|{_comment})"
+            + _tokens
+            + r"|(?P<ERROR>[\xc0-\xff][\x80-\xbf]*|.))"
+        ).encode(),
+        re.DOTALL,
+    )
+
+    def __init__(self):
+        self.text = ""
+        self.index = 0
+        self.lineno = 1
+        self.diagnostics = None
+
+    def tokenize(self, text, lineno=1, index=0):
+        keywords = self.keywords
+        punctuation = self.punctuation
+        binary = not isinstance(text, str)
+        master_re = self._master_re_bytes if binary else self._master_re
+        newline = b"\n" if binary else "\n"
+
+        self.text = text
+        self.lineno = lineno
+        for m in master_re.finditer(text, index):
+            group = m.lastgroup
+            value = m.group(group)
+            kind = group
+
+            if kind == "SKIP":
+                if newline in value:
+                    lineno += value.count(newline)
+                    self.lineno = lineno
+                continue
+            if binary:
+                value = value.decode("utf-8", "replace")
+
+            if kind == "ID":
+                kind = keywords.get(value, "ID")
+            elif kind == "PUNCT":
+                kind = punctuation[value]
+            elif kind == "ERROR":
+                self.index = m.start(group)
+                tok = Token()
+                tok.type = kind
+                tok.value = value
+                tok.lineno = lineno
+                tok.index = self.index
+                self.error(tok)
+                continue
+
+            tok = Token()
+            tok.type = kind
+            tok.value = value
+            tok.lineno = lineno
+            tok.index, tok.end = m.span(group)
+            self.index = tok.end
+            yield tok
+
+        self.index = len(text)
+
+    # Same diagnostics as the sly backend
+    error = CPLLexer.error
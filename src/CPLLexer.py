@@ -1,8 +1,32 @@
 # type: ignore
 
+import sys
+from typing import List, Optional, TextIO
+
 from sly import Lexer
 
 
+def report(diagnostics: Optional[List[str]], message: str, stream: Optional[TextIO] = None):
+    """
+    Collects a diagnostic into `diagnostics`, or prints it to `stream` (default stdout)
+    when it is None.
+    """
+    if diagnostics is not None:
+        diagnostics.append(message)
+    else:
+        print(message, file=stream or sys.stdout)
+
+
+class PrintedDiagnostics(list):
+    """
+    Diagnostics which are printed as they are reported, as with no list at all, and kept.
+    """
+
+    def append(self, message: str) -> None:
+        super().append(message)
+        report(None, message)
+
+
 class CPLLexer(Lexer):
     tokens = {
         ELSE,
@@ -32,17 +56,17 @@ class CPLLexer(Lexer):
     }
 
     # String containing ignored characters
-    ignore = r" \t"
-    ignore_comment = r"\/\*[^*]*\*+([^\/*][^*]*\*+)*\/"
+    ignore = " \t"
+
+    # Diagnostics are printed, unless this is a list to collect them into
+    diagnostics = None
+
+    # Comments may span several lines
+    @_(r"\/\*[^*]*\*+([^\/*][^*]*\*+)*\/")
+    def ignore_comment(self, t):
+        self.lineno += t.value.count("\n")
 
     # Regular expression rules for tokens
-    ELSE = r"else"
-    FLOAT = r"float"
-    IF = r"if"
-    INPUT = r"input"
-    INT = r"int"
-    OUTPUT = r"output"
-    WHILE = r"while"
     LCBRACE = r"\{"
     RCBRACE = r"\}"
     LBRACE = r"\("
@@ -55,6 +79,16 @@ class CPLLexer(Lexer):
     NUM = r"[0-9]+\.[0-9]*|[0-9]+"
     CAST = r"(static_cast<int>)|(static_cast<float>)"
     ID = r"[a-zA-Z]([a-zA-Z]|[0-9])*"
+
+    # Keywords are identifiers with a special meaning, so "ifx" or "integer" is a single ID
+    ID["else"] = ELSE
+    ID["float"] = FLOAT
+    ID["if"] = IF
+    ID["input"] = INPUT
+    ID["int"] = INT
+    ID["output"] = OUTPUT
+    ID["while"] = WHILE
+
     ADDOP = r"[+-]"
     MULOP = r"[*/]"
     OR = r"\|\|"
@@ -67,5 +101,5 @@ class CPLLexer(Lexer):
         self.lineno += t.value.count("\n")
 
     def error(self, t):
-        print(rf"Line {self.lineno}: Bad character {t.value[0]}")
+        report(self.diagnostics, rf"Line {self.lineno}: Bad character {t.value[0]}")
         self.index += 1
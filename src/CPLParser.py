@@ -2,12 +2,14 @@
 
 import sys
 from collections import Counter
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from typing import Dict, List, Optional, Tuple
 
 from sly import Parser
 
-from CPLLexer import CPLLexer
+from CPLLexer import CPLLexer, report
+from ParseTableCache import CachedParserMeta
+from Quad import LABEL, Quad, QuadCode
 
 ERR = -1
 
@@ -16,6 +18,32 @@ def is_number(s: str):
     return s.replace(".", "", 1).isdigit()
 
 
+def negate_comparison(quad: Quad) -> Optional[Quad]:
+    """
+    The single instruction computing the negation of a comparison, if there is one.
+    Integer comparisons against a literal shift the literal by one.
+
+    examples:
+    IEQL t1 a b -> INQL t1 a b
+    ILSS t1 a 5 -> IGRT t1 a 4 (a >= 5)
+    RLSS t1 a b -> None
+    """
+    kind = quad.op[1:]
+    dest, a, b = quad.args
+    if kind in ("EQL", "NQL"):
+        return Quad(quad.op[0] + ("NQL" if kind == "EQL" else "EQL"), dest, a, b)
+    if quad.op not in ("ILSS", "IGRT"):
+        return None
+
+    # !(a < b) is a > b - 1 or a + 1 > b, !(a > b) is a < b + 1 or a - 1 < b
+    inverse, step = ("IGRT", -1) if kind == "LSS" else ("ILSS", 1)
+    if b.isdigit() and int(b) + step >= 0:
+        return Quad(inverse, dest, a, str(int(b) + step))
+    if a.isdigit() and int(a) - step >= 0:
+        return Quad(inverse, dest, str(int(a) - step), b)
+    return None
+
+
 @dataclass
 class IDList:
     l: List[str]
@@ -23,10 +51,40 @@ class IDList:
 
 @dataclass
 class QuadResult:
-    code: str
+    code: QuadCode
     value: str
 
 
+@dataclass
+class Condition(QuadResult):
+    """
+    A boolean value compiled with compact conditions: the condition holds when `value`
+    is nonzero, or when it is zero if `negated` is set, so negations cost nothing until
+    a consumer needs the plain value. `comparison` is the instruction computing `value`,
+    when it can still be rewritten to compute the negation instead.
+    """
+
+    negated: bool = False
+    comparison: Optional[Quad] = None
+
+
+@dataclass
+class JumpResult:
+    """
+    A boolean expression compiled to jumping code: `true_jumps` and `false_jumps` are
+    the jumps taken for either outcome, their targets are filled in by `backpatch` once
+    known. Running off the end of `code` means the expression is `fallthrough`.
+    """
+
+    code: QuadCode
+    true_jumps: List[Quad]
+    false_jumps: List[Quad]
+    fallthrough: bool
+    # The comparison tested by the jump ending `code`, when it can be inverted (see `flip`)
+    comparison: Optional[Quad] = None
+    test: Optional[Quad] = None
+
+
 @dataclass
 class Queue:
     _data: list[str]
@@ -40,53 +98,256 @@ class Queue:
     def empty(self):
         return len(self._data) == 0
 
-    def print(self):
+    def print(self, write=print):
         while not self.empty():
-            print(self.pop())
+            write(self.pop())
 
 
-class CPLParser(Parser):
+class CPLParser(Parser, metaclass=CachedParserMeta):
     start = "program"
     tokens = CPLLexer.tokens
 
-    def __init__(self):
+    # Grammar actions only read line numbers of tokens, while sly's position maps
+    # of nonterminals would keep growing with every program a reused parser parses.
+    track_positions = False
+
+    def __init__(self, short_circuit: bool = False, compact_conditions: bool = False):
+        """
+        Args:
+            short_circuit (bool): compile boolean expressions to jumping code, which stops
+                evaluating `&&` and `||` as soon as the result is known, instead of
+                computing every operand and combining them arithmetically
+            compact_conditions (bool): compile every relational operator to a single
+                comparison and fold negations (`!`, ">=", "<=" and loop conditions)
+                into the comparison or the direction of the jump testing it
+        """
+        self.short_circuit = short_circuit
+        self.compact_conditions = compact_conditions
+        # Diagnostics are printed, unless this is a list to collect them into
+        self.diagnostics: Optional[List[str]] = None
+        self.reset()
+
+    def reset(self):
+        """
+        Clears all per-program state, so a single parser can compile many programs.
+        """
         self._symtab: Dict[str, str] = {}
         self.label_counter = 0  # Increment after using
         self.var_counter = 0
+        self.reductions = 0
         self.error_queue = Queue([])
 
     def generate_while_stmt(self, boolexpr, boolexpr_res, stmt) -> QuadResult:
         start_label = self.generate_label()
         end_label = self.generate_label()
-        code_to_add = f"JUMP {end_label}\n"
-        code_to_add += f"{start_label}:\n"
-        code_to_add += stmt
-        code_to_add += f"{end_label}:\n"
-        code_to_add += boolexpr
-        code_to_add += f"ISUB {boolexpr_res} {1} {boolexpr_res}\n"
-        code_to_add += f"JMPZ {start_label} {boolexpr_res}\n"
+        code_to_add = QuadCode(
+            Quad("JUMP", end_label),
+            Quad(LABEL, start_label),
+            stmt,
+            Quad(LABEL, end_label),
+            boolexpr,
+            Quad("ISUB", boolexpr_res, "1", boolexpr_res),
+            Quad("JMPZ", start_label, boolexpr_res),
+        )
+        return QuadResult(code_to_add, "")
+
+    def generate_compact_while(self, condition: QuadResult, stmt) -> QuadResult:
+        # JMPZ repeats the loop, so it tests the negation of the condition
+        test = self.materialize(self.negate(condition))
+        start_label = self.generate_label()
+        end_label = self.generate_label()
+        code_to_add = QuadCode(
+            Quad("JUMP", end_label),
+            Quad(LABEL, start_label),
+            stmt,
+            Quad(LABEL, end_label),
+            test.code,
+            Quad("JMPZ", start_label, test.value),
+        )
+        return QuadResult(code_to_add, "")
+
+    def generate_while_jumps(self, condition: JumpResult, stmt) -> QuadResult:
+        if condition.fallthrough:
+            condition = self.flip(condition)
+        start_label = self.generate_label()
+        end_label = self.generate_label()
+        code_to_add = QuadCode(
+            Quad("JUMP", end_label),
+            Quad(LABEL, start_label),
+            stmt,
+            Quad(LABEL, end_label),
+            condition.code,
+        )
+        self.backpatch(condition.true_jumps, start_label)
+        if condition.fallthrough:
+            code_to_add.append(Quad("JUMP", start_label))
+        if condition.false_jumps:
+            exit_label = self.generate_label()
+            self.backpatch(condition.false_jumps, exit_label)
+            code_to_add.append(Quad(LABEL, exit_label))
         return QuadResult(code_to_add, "")
 
     def generate_if_stmt(self, boolexpr, boolexpr_res, stmt1, stmt2) -> QuadResult:
         else_label = self.generate_label()
         both_label = self.generate_label()
 
-        code_to_add = boolexpr
-        code_to_add += f"JMPZ {else_label} {boolexpr_res}\n"
-        code_to_add += stmt1
-        code_to_add += f"JUMP {both_label}\n"
-        code_to_add += f"{else_label}:\n"
-        code_to_add += stmt2
-        code_to_add += f"{both_label}:\n"
+        code_to_add = QuadCode(
+            boolexpr,
+            Quad("JMPZ", else_label, boolexpr_res),
+            stmt1,
+            Quad("JUMP", both_label),
+            Quad(LABEL, else_label),
+            stmt2,
+            Quad(LABEL, both_label),
+        )
         return QuadResult(code_to_add, "")
 
+    def generate_if_jumps(self, condition: JumpResult, stmt1, stmt2) -> QuadResult:
+        if not condition.fallthrough:
+            condition = self.flip(condition)
+        code_to_add = QuadCode(condition.code)
+        false_jumps = list(condition.false_jumps)
+        if not condition.fallthrough:
+            jump = Quad("JUMP", "")
+            code_to_add.append(jump)
+            false_jumps.append(jump)
+        if condition.true_jumps:
+            then_label = self.generate_label()
+            self.backpatch(condition.true_jumps, then_label)
+            code_to_add.append(Quad(LABEL, then_label))
+
+        else_label = self.generate_label()
+        both_label = self.generate_label()
+        self.backpatch(false_jumps, else_label)
+        code_to_add.append(
+            QuadCode(
+                stmt1,
+                Quad("JUMP", both_label),
+                Quad(LABEL, else_label),
+                stmt2,
+                Quad(LABEL, both_label),
+            )
+        )
+        return QuadResult(code_to_add, "")
+
+    def backpatch(self, jumps: List[Quad], label: str) -> None:
+        """
+        Sets the target of jumps which were generated before their target label was known.
+        """
+        for jump in jumps:
+            jump.args = (label, *jump.args[1:])
+
+    def condition_jumps(self, condition: QuadResult) -> JumpResult:
+        """
+        Tests a computed boolean value, falling through when it is true
+        (or false, for a negated Condition).
+        """
+        jump = Quad("JMPZ", "", condition.value)
+        code = condition.code.append(jump)
+        if not isinstance(condition, Condition):
+            return JumpResult(code, [], [jump], True)
+        if condition.negated:
+            return JumpResult(code, [jump], [], False, condition.comparison, jump)
+        return JumpResult(code, [], [jump], True, condition.comparison, jump)
+
+    def invert_comparison(self, comparison: Optional[Quad]) -> bool:
+        """
+        Rewrites a comparison in place to compute its negation, if one instruction can.
+        """
+        negated = comparison and negate_comparison(comparison)
+        if not negated:
+            return False
+        comparison.op, comparison.args = negated.op, negated.args
+        return True
+
+    def flip(self, condition: JumpResult) -> JumpResult:
+        """
+        The same condition falling through on the opposite outcome, when its comparison
+        can be inverted, which saves the JUMP a consumer would otherwise add.
+        """
+        if not self.invert_comparison(condition.comparison):
+            return condition
+
+        # The last jump now tests the opposite outcome, every other jump is unchanged
+        test = condition.test
+        true_jumps = [jump for jump in condition.true_jumps if jump is not test]
+        false_jumps = [jump for jump in condition.false_jumps if jump is not test]
+        if len(true_jumps) < len(condition.true_jumps):
+            false_jumps.append(test)
+        else:
+            true_jumps.append(test)
+        return JumpResult(
+            condition.code,
+            true_jumps,
+            false_jumps,
+            not condition.fallthrough,
+            condition.comparison,
+            test,
+        )
+
+    def negate(self, condition: QuadResult) -> Condition:
+        if isinstance(condition, Condition):
+            return replace(condition, negated=not condition.negated)
+        return Condition(condition.code, condition.value, True)
+
+    def materialize(self, condition: QuadResult) -> QuadResult:
+        """
+        The plain 0/1 value of a condition, inverting a negated comparison where possible.
+        """
+        if not isinstance(condition, Condition) or not condition.negated:
+            return condition
+        if self.invert_comparison(condition.comparison):
+            return replace(condition, negated=False)
+        code = Quad("ISUB", condition.value, "1", condition.value)
+        return QuadResult(QuadCode(condition.code, code), condition.value)
+
+    def generate_jumps_sequence(
+        self, first: JumpResult, second: JumpResult, proceed_on: bool
+    ) -> JumpResult:
+        """
+        Jumping code for `first && second` (proceed_on=True) and `first || second`
+        (proceed_on=False): `second` is only evaluated if `first` is `proceed_on`,
+        otherwise `first` already decided the result.
+        """
+        if first.fallthrough != proceed_on:
+            first = self.flip(first)
+        if proceed_on:
+            proceeds, exits = first.true_jumps, list(first.false_jumps)
+        else:
+            proceeds, exits = first.false_jumps, list(first.true_jumps)
+
+        code = QuadCode(first.code)
+        if first.fallthrough != proceed_on:
+            jump = Quad("JUMP", "")
+            code.append(jump)
+            exits.append(jump)
+        if proceeds:
+            label = self.generate_label()
+            self.backpatch(proceeds, label)
+            code.append(Quad(LABEL, label))
+        code.append(second.code)
+
+        if proceed_on:
+            true_jumps, false_jumps = second.true_jumps, exits + second.false_jumps
+        else:
+            true_jumps, false_jumps = exits + second.true_jumps, second.false_jumps
+        return JumpResult(
+            code,
+            true_jumps,
+            false_jumps,
+            second.fallthrough,
+            second.comparison,
+            second.test,
+        )
+
     def relop_to_instruction(self, expr1, expr2, relop) -> QuadResult:
         """
         Translates RELOP tokens into QUAD instructions.
         For operators which are not ">=" and "<=" the translation is trivial.
-        For ">=" and "<=" we check both conditions and perform an OR between them.
+        For ">=" and "<=" we check both conditions and perform an OR between them,
+        unless compact conditions are enabled, then they are the negation of "<" and ">".
         """
-        code = ""
+        code = QuadCode()
         prefix, index, cast_var = self.determine_prefix_noerror(expr1, expr2)
         if cast_var.value:
             if index == 1:
@@ -94,33 +355,53 @@ class CPLParser(Parser):
             else:
                 expr2 = cast_var.value
         condition_result = self.generate_tmp_id()
+        if self.compact_conditions:
+            op, negated = {
+                "==": ("EQL", False),
+                "!=": ("NQL", False),
+                "<": ("LSS", False),
+                ">": ("GRT", False),
+                ">=": ("LSS", True),
+                "<=": ("GRT", True),
+            }[relop]
+            comparison = Quad(f"{prefix}{op}", condition_result, expr1, expr2)
+            condition = Condition(
+                QuadCode(cast_var.code, comparison), condition_result, negated, comparison
+            )
+            # A single instruction may compute ">=" and "<=" directly, e.g. a >= 5 as a > 4
+            if negated and self.invert_comparison(comparison):
+                condition.negated = False
+            return condition
+
         translator = lambda var, type: {
-            "==": f"{prefix}EQL {var} {expr1} {expr2}\n",
-            "!=": f"{prefix}NQL {var} {expr1} {expr2}\n",
-            "<": f"{prefix}LSS {var} {expr1} {expr2}\n",
-            ">": f"{prefix}GRT {var} {expr1} {expr2}\n",
+            "==": Quad(f"{prefix}EQL", var, expr1, expr2),
+            "!=": Quad(f"{prefix}NQL", var, expr1, expr2),
+            "<": Quad(f"{prefix}LSS", var, expr1, expr2),
+            ">": Quad(f"{prefix}GRT", var, expr1, expr2),
         }[type]
 
         if relop in [">=", "<="]:
             second_condition_result = self.generate_tmp_id()
-            code += translator(condition_result, "==")
-            code += translator(second_condition_result, relop[0])
+            code.append(translator(condition_result, "=="))
+            code.append(translator(second_condition_result, relop[0]))
             condition_result = self.generate_or(
                 condition_result,
                 second_condition_result,
             )
             return QuadResult(
-                cast_var.code + code + condition_result.code,
+                QuadCode(cast_var.code, code, condition_result.code),
                 condition_result.value,
             )
         else:
-            code += translator(condition_result, relop)
-            return QuadResult(cast_var.code + code, condition_result)
+            code.append(translator(condition_result, relop))
+            return QuadResult(QuadCode(cast_var.code, code), condition_result)
 
     def generate_or(self, boolexpr, boolterm) -> QuadResult:
         tmp = self.generate_tmp_id()
-        code = f"IADD {tmp} {boolexpr} {boolterm}\n"
-        code += f"IGRT {tmp} {tmp} {0}\n"
+        code = QuadCode(
+            Quad("IADD", tmp, boolexpr, boolterm),
+            Quad("IGRT", tmp, tmp, "0"),
+        )
         return QuadResult(code, tmp)
 
     def determine_prefix(self, expr: str) -> str:
@@ -189,7 +470,7 @@ class CPLParser(Parser):
         expr2_prefix = self.determine_prefix(expr2)
 
         if expr1_prefix == expr2_prefix:
-            return expr1_prefix, 0, QuadResult("", "")
+            return expr1_prefix, 0, QuadResult(QuadCode(), "")
 
         if expr1_prefix == "I":
             return "R", 1, self.cast("R", expr1)
@@ -209,8 +490,8 @@ class CPLParser(Parser):
 
         tmp = self.generate_tmp_id(prefix)
         instruction = "MLT" if mulop == "*" else "DIV"
-        code = f"{prefix}{instruction} {tmp} {term} {factor}\n"
-        return QuadResult(cast_var.code + code, tmp)
+        code = Quad(f"{prefix}{instruction}", tmp, term, factor)
+        return QuadResult(cast_var.code.append(code), tmp)
 
     def generate_addop(self, addop, expr, term):
         prefix, which_cast, cast_var = self.determine_prefix_noerror(
@@ -225,8 +506,8 @@ class CPLParser(Parser):
 
         tmp = self.generate_tmp_id(prefix)
         instruction = "ADD" if addop == "+" else "SUB"
-        code = f"{prefix}{instruction} {tmp} {expr} {term}\n"
-        return QuadResult(cast_var.code + code, tmp)
+        code = Quad(f"{prefix}{instruction}", tmp, expr, term)
+        return QuadResult(cast_var.code.append(code), tmp)
 
     def __gen(self):
         self.var_counter += 1
@@ -240,7 +521,7 @@ class CPLParser(Parser):
         res = self.__gen()
 
         while res in self.symtab:
-            res = CPLParser.__gen()
+            res = self.__gen()
 
         self.symtab[res] = type
         return res
@@ -251,22 +532,22 @@ class CPLParser(Parser):
     def cast(self, to, expr) -> QuadResult:
         tmp = self.generate_tmp_id(to)
         _from = "R" if to == "I" else "I"
-        return QuadResult(f"{_from}TO{to} {tmp} {expr}\n", tmp)
+        return QuadResult(QuadCode(Quad(f"{_from}TO{to}", tmp, expr)), tmp)
 
     @_("declarations stmt_block")
-    def program(self, p) -> Optional[str]:
+    def program(self, p) -> Optional[QuadCode]:
         """
         Main grammer rule, will return the full quad program unless an error occured.
+        The program is returned as a QuadCode, rendering is left to the caller.
 
         Returns:
-            Optional[str]
+            Optional[QuadCode]
         """
         if not self.error_queue.empty():
-            self.error_queue.print()
+            self.error_queue.print(lambda message: report(self.diagnostics, message))
             return None
 
-        code = p.stmt_block.code or ""
-        return f"{code}HALT\n"
+        return p.stmt_block.code.append(Quad("HALT"))
 
     # PART A - Declarations, DOES NOT GENERATE CODE
 
@@ -326,15 +607,15 @@ class CPLParser(Parser):
 
     @_("stmt_block")
     def stmt(self, p):
-        return QuadResult(p.stmt_block.code or "", "")
+        return QuadResult(p.stmt_block.code, "")
 
     @_("ID ASSIGN expression SEMICOLON")
     def assignment_stmt(self, p) -> QuadResult:
         prefix = self.determine_expressions_prefix(p.lineno, p.ID, p.expression.value)
         if prefix == ERR:
-            return QuadResult("", "")
-        code = f"{prefix}ASN {p.ID} {p.expression.value}\n"
-        return QuadResult(p.expression.code + code, "")
+            return QuadResult(QuadCode(), "")
+        code = Quad(f"{prefix}ASN", p.ID, p.expression.value)
+        return QuadResult(p.expression.code.append(code), "")
 
     @_("INPUT LBRACE ID RBRACE SEMICOLON")
     def input_stmt(self, p) -> QuadResult:
@@ -343,8 +624,8 @@ class CPLParser(Parser):
             self.error_queue.push(
                 f"ERROR in line {p.lineno}: could not determine prefix of {p.ID}."
             )
-            return QuadResult("", "")
-        code = f"{prefix}INP {p.ID}\n"
+            return QuadResult(QuadCode(), "")
+        code = QuadCode(Quad(f"{prefix}INP", p.ID))
         return QuadResult(code, "")
 
     @_("OUTPUT LBRACE expression RBRACE SEMICOLON")
@@ -354,36 +635,50 @@ class CPLParser(Parser):
             self.error_queue.push(
                 f"ERROR in line {p.lineno}: could not determine prefix of {p.expression.value}."
             )
-            return QuadResult("", "")
-        code = f"{prefix}PRT {p.expression.value}\n"
-        return QuadResult(p.expression.code + code, "")
+            return QuadResult(QuadCode(), "")
+        code = Quad(f"{prefix}PRT", p.expression.value)
+        return QuadResult(p.expression.code.append(code), "")
 
     @_("IF LBRACE boolexpr RBRACE stmt ELSE stmt")
     def if_stmt(self, p):
+        if self.short_circuit:
+            return self.generate_if_jumps(p.boolexpr, p.stmt0.code, p.stmt1.code)
+        if isinstance(p.boolexpr, Condition) and p.boolexpr.negated:
+            return self.generate_if_stmt(
+                p.boolexpr.code, p.boolexpr.value, p.stmt1.code, p.stmt0.code
+            )
         return self.generate_if_stmt(
             p.boolexpr.code, p.boolexpr.value, p.stmt0.code, p.stmt1.code
         )
 
     @_("WHILE LBRACE boolexpr RBRACE stmt")
     def while_stmt(self, p) -> QuadResult:
+        if self.short_circuit:
+            return self.generate_while_jumps(p.boolexpr, p.stmt.code)
+        if self.compact_conditions:
+            return self.generate_compact_while(p.boolexpr, p.stmt.code)
         return self.generate_while_stmt(p.boolexpr.code, p.boolexpr.value, p.stmt.code)
 
     @_("LCBRACE stmtlist RCBRACE")
     def stmt_block(self, p) -> QuadResult:
-        return QuadResult(p.stmtlist.code or "", "")
+        return QuadResult(p.stmtlist.code, "")
 
     @_("stmtlist stmt")
     def stmtlist(self, p) -> QuadResult:
-        return QuadResult(p.stmtlist.code + p.stmt.code, "")
+        p.stmtlist.code.append(p.stmt.code)
+        return p.stmtlist
 
     @_("")
     def stmtlist(self, p) -> QuadResult:
-        return QuadResult("", "")
+        return QuadResult(QuadCode(), "")
 
     @_("boolexpr OR boolterm")
     def boolexpr(self, p) -> QuadResult:
-        res = self.generate_or(p.boolexpr.value, p.boolterm.value)
-        return QuadResult(p.boolexpr.code + p.boolterm.code + res.code, res.value)
+        if self.short_circuit:
+            return self.generate_jumps_sequence(p.boolexpr, p.boolterm, proceed_on=False)
+        left, right = self.materialize(p.boolexpr), self.materialize(p.boolterm)
+        res = self.generate_or(left.value, right.value)
+        return QuadResult(QuadCode(left.code, right.code, res.code), res.value)
 
     @_("boolterm")
     def boolexpr(self, p):
@@ -391,19 +686,34 @@ class CPLParser(Parser):
 
     @_("boolterm AND boolfactor")
     def boolterm(self, p) -> QuadResult:
+        if self.short_circuit:
+            return self.generate_jumps_sequence(p.boolterm, p.boolfactor, proceed_on=True)
+        left, right = self.materialize(p.boolterm), self.materialize(p.boolfactor)
         tmp = self.generate_tmp_id()
-        code = f"IMLT {tmp} {p.boolterm.value} {p.boolfactor.value}\n"
-        return QuadResult(p.boolterm.code + p.boolfactor.code + code, tmp)
+        code = Quad("IMLT", tmp, left.value, right.value)
+        return QuadResult(QuadCode(left.code, right.code, code), tmp)
 
     @_("boolfactor")
     def boolterm(self, p) -> QuadResult:
-        return QuadResult(p.boolfactor.code, p.boolfactor.value)
+        return p.boolfactor
 
     @_("NOT LBRACE boolexpr RBRACE")
     def boolfactor(self, p) -> QuadResult:
+        if self.short_circuit:
+            condition = p.boolexpr
+            return JumpResult(
+                condition.code,
+                condition.false_jumps,
+                condition.true_jumps,
+                not condition.fallthrough,
+                condition.comparison,
+                condition.test,
+            )
+        if self.compact_conditions:
+            return self.negate(p.boolexpr)
         tmp = self.generate_tmp_id()
-        code = f"ISUB {tmp} {1} {p.boolexpr.value}\n"
-        return QuadResult(p.boolexpr.code + code, tmp)
+        code = Quad("ISUB", tmp, "1", p.boolexpr.value)
+        return QuadResult(p.boolexpr.code.append(code), tmp)
 
     @_("expression RELOP expression")
     def boolfactor(self, p) -> QuadResult:
@@ -412,7 +722,12 @@ class CPLParser(Parser):
             p.expression1.value,
             p.RELOP,
         )
-        return QuadResult(p.expression0.code + p.expression1.code + res.code, res.value)
+        condition = replace(
+            res, code=QuadCode(p.expression0.code, p.expression1.code, res.code)
+        )
+        if self.short_circuit:
+            return self.condition_jumps(condition)
+        return condition
 
     @_("expression ADDOP term")
     def expression(self, p) -> QuadResult:
@@ -421,7 +736,7 @@ class CPLParser(Parser):
             p.expression.value,
             p.term.value,
         )
-        return QuadResult(p.expression.code + p.term.code + res.code, res.value)
+        return QuadResult(QuadCode(p.expression.code, p.term.code, res.code), res.value)
 
     @_("term")
     def expression(self, p) -> QuadResult:
@@ -434,7 +749,7 @@ class CPLParser(Parser):
             p.term.value,
             p.factor.value,
         )
-        return QuadResult(p.term.code + p.factor.code + res.code, res.value)
+        return QuadResult(QuadCode(p.term.code, p.factor.code, res.code), res.value)
 
     @_("factor")
     def term(self, p) -> QuadResult:
@@ -446,13 +761,12 @@ class CPLParser(Parser):
 
     @_("CAST LBRACE expression RBRACE")
     def factor(self, p) -> QuadResult:
-        if "int" in p.CAST:
-            return self.cast("I", p.expression.value)
-        return self.cast("R", p.expression.value)
+        cast = self.cast("I" if "int" in p.CAST else "R", p.expression.value)
+        return QuadResult(p.expression.code.append(cast.code), cast.value)
 
     @_("ID", "NUM")
     def factor(self, p) -> QuadResult:
-        return QuadResult("", p[0])
+        return QuadResult(QuadCode(), p[0])
 
     def error(self, p):
         """
@@ -464,12 +778,14 @@ class CPLParser(Parser):
         -   not assigning the result of a cast
         """
         if not p:
-            sys.stderr.write(
-                "ERROR: The tokenized program does not match the grammer of a valid CPL program.\n"
+            report(
+                self.diagnostics,
+                "ERROR: The tokenized program does not match the grammer of a valid CPL program.",
+                sys.stderr,
             )
             return
 
-        sys.stderr.write(f"An error was found in line {p.lineno}\n")
+        report(self.diagnostics, f"An error was found in line {p.lineno}", sys.stderr)
 
         while True:
             tok = next(self.tokens, None)
@@ -477,6 +793,16 @@ class CPLParser(Parser):
                 break
         self.restart()
 
+    @property
+    def production(self):
+        return self._production
+
+    @production.setter
+    def production(self, production) -> None:
+        # sly sets the production being reduced before calling its grammar action
+        self._production = production
+        self.reductions += 1
+
     @property
     def symtab(self) -> Dict[str, str]:
         return self._symtab
@@ -0,0 +1,109 @@
+from typing import Dict, List, Optional, Tuple
+
+from ConstantFolding import eliminate_dead_code, format_constant, meet
+from ControlFlowGraph import ControlFlowGraph
+from Quad import Quad, is_constant
+from QuadInterpreter import parse_constant
+
+# Integer operand -> the real operand holding its conversion, and real names -> literals
+Facts = Tuple[Dict[str, str], Dict[str, str]]
+
+
+def fold_cast(quad: Quad) -> Optional[str]:
+    """
+    The real literal an `ITOR` of an integer literal produces, None if it has no plain form.
+    """
+    if quad.op != "ITOR" or not is_constant(quad.args[1]):
+        return None
+    return format_constant(float(parse_constant(quad.args[1])))
+
+
+def minimize_block(block: List[Quad], facts: Facts) -> List[Quad]:
+    """
+    Reuses the conversions still held by some variable and folds the conversions of literals.
+    `facts` is updated to the conversions and literals available at the block's end.
+    """
+    casts, literals = facts
+    holders = {holder: source for source, holder in casts.items()}
+    result = []
+    for quad in block:
+        quad = quad.replace_sources(literals)
+
+        dest = quad.dest
+        if dest is None:
+            result.append(quad)
+            continue
+
+        literal = fold_cast(quad)
+        if literal is not None:
+            quad = Quad("RASN", dest, literal)
+        elif quad.op == "ITOR" and quad.args[1] in casts:
+            quad = Quad("RASN", dest, casts[quad.args[1]])
+
+        literals.pop(dest, None)
+        if dest in casts:
+            del holders[casts.pop(dest)]
+        if dest in holders:
+            del casts[holders.pop(dest)]
+        if literal is not None:
+            literals[dest] = literal
+        elif quad.op == "ITOR" and quad.args[1] != dest:
+            casts[quad.args[1]] = dest
+            holders[dest] = quad.args[1]
+        result.append(quad)
+    return result
+
+
+def minimize_casts(
+    quads: List[Quad], symtab: Optional[Dict[str, str]] = None
+) -> List[Quad]:
+    """
+    Cast minimization pass.
+
+    The parser converts an integer operand every time it meets a real one. Conversions
+    of a value some variable already holds, on every path and with neither of them
+    reassigned since, become a copy of it, and conversions of literals are computed at
+    compile time and substituted into the instructions reading them. Where the promotion
+    happens is not changed: converting the operands of an integer operation instead of its
+    result could round differently.
+
+    examples:
+    ITOR t1 a / RMLT t2 t1 x / ... / ITOR t5 a -> ITOR t1 a / RMLT t2 t1 x / ... / RASN t5 t1
+    ITOR t1 105 / RMLT t2 t1 c -> RMLT t2 105.0 c
+
+    Args:
+        quads (List[Quad])
+        symtab (Optional[Dict[str, str]]): unused, types are known from the instructions
+
+    Returns:
+        List[Quad]
+    """
+    cfg = ControlFlowGraph(quads)
+
+    # None is "not reached yet", which does not constrain the meet
+    out: List[Optional[Facts]] = [None] * len(cfg)
+
+    def entry_facts(block) -> Optional[Facts]:
+        if block is cfg.entry:
+            return {}, {}
+        reached = [out[p.index] for p in block.predecessors if out[p.index] is not None]
+        if not reached:
+            return None
+        return meet([f[0] for f in reached]), meet([f[1] for f in reached])
+
+    changed = True
+    while changed:
+        changed = False
+        for block in cfg.reverse_postorder():
+            facts = entry_facts(block)
+            if facts is None:
+                continue
+            minimize_block(block.quads, facts)
+            if facts != out[block.index]:
+                out[block.index] = facts
+                changed = True
+
+    result = []
+    for block in cfg:
+        result.extend(minimize_block(block.quads, entry_facts(block) or ({}, {})))
+    return eliminate_dead_code(result)
@@ -0,0 +1,134 @@
+from typing import Dict, List, Optional, Tuple
+
+from ControlFlowGraph import split_blocks
+from CopyPropagation import result_type
+from Quad import Quad, is_constant
+
+# Operators whose operands can be swapped, and comparisons which are mirrored by swapping
+COMMUTATIVE = {"ADD", "MLT", "EQL", "NQL"}
+MIRRORED = {"GRT": "LSS"}
+
+
+class ValueNumbering:
+    """
+    Value numbers of one basic block: operands holding the same value share a number,
+    and so do instructions computing the same operator on the same value numbers.
+    """
+
+    def __init__(self):
+        self._count = 0
+        self._numbers: Dict[str, int] = {}  # Variable or literal -> its current value number
+        self._expressions: Dict[tuple, int] = {}
+        self._holders: Dict[int, List[str]] = {}  # Value number -> operands assigned it
+
+    def _new(self) -> int:
+        self._count += 1
+        return self._count
+
+    def number(self, operand: str) -> int:
+        number = self._numbers.get(operand)
+        if number is None:
+            number = self._numbers[operand] = self._new()
+            self._holders[number] = [operand]
+        return number
+
+    def assign(self, name: str, number: int) -> None:
+        """
+        `name` now holds the value `number`, its previous value is killed.
+        """
+        self._numbers[name] = number
+        self._holders.setdefault(number, []).append(name)
+
+    def fresh(self, name: str) -> None:
+        self.assign(name, self._new())
+
+    def holder(self, number: int) -> Optional[str]:
+        """
+        An operand which still holds the value `number`, literals first.
+        """
+        live = [
+            holder
+            for holder in self._holders.get(number, [])
+            if is_constant(holder) or self._numbers.get(holder) == number
+        ]
+        self._holders[number] = live
+        constants = [holder for holder in live if is_constant(holder)]
+        return (constants or live or [None])[0]
+
+    def lookup(self, quad: Quad) -> Tuple[tuple, Optional[int]]:
+        """
+        The key of the value an instruction computes, and its value number if known.
+        """
+        op, kind = quad.op, quad.op[1:]
+        operands = [self.number(source) for source in quad.sources]
+        if kind in COMMUTATIVE:
+            operands.sort()
+        elif kind in MIRRORED:
+            op = quad.op[0] + MIRRORED[kind]
+            operands.reverse()
+        key = (op, *operands)
+        return key, self._expressions.get(key)
+
+    def record(self, key: tuple) -> int:
+        number = self._expressions[key] = self._new()
+        return number
+
+
+def number_block(block: List[Quad]) -> List[Quad]:
+    """
+    Replaces instructions recomputing a value some variable still holds by a copy of it.
+    """
+    values = ValueNumbering()
+    result = []
+    for quad in block:
+        dest = quad.dest
+        if dest is None:
+            result.append(quad)
+            continue
+        if quad.op.endswith("INP"):
+            values.fresh(dest)
+            result.append(quad)
+            continue
+        if quad.op.endswith("ASN"):
+            values.assign(dest, values.number(quad.args[1]))
+            result.append(quad)
+            continue
+
+        key, number = values.lookup(quad)
+        holder = None if number is None else values.holder(number)
+        if holder is None:
+            number = values.record(key)
+        elif holder == dest:
+            continue  # Recomputes the value the destination already holds
+        else:
+            quad = Quad(f"{result_type(quad)}ASN", dest, holder)
+        values.assign(dest, number)
+        result.append(quad)
+    return result
+
+
+def eliminate_common_subexpressions(
+    quads: List[Quad], symtab: Optional[Dict[str, str]] = None
+) -> List[Quad]:
+    """
+    Local common subexpression elimination pass.
+
+    Within every basic block, an instruction computing an operator on operands which
+    were already combined the same way, and not reassigned (or read by input) since,
+    becomes a copy of the earlier result. Copy propagation removes the copies.
+
+    examples:
+    IADD t1 d c / ... / IADD t5 c d -> IADD t1 d c / ... / IASN t5 t1
+    IGRT t1 a b / ... / ILSS t4 b a -> IGRT t1 a b / ... / IASN t4 t1
+
+    Args:
+        quads (List[Quad])
+        symtab (Optional[Dict[str, str]]): unused, types are known from the instructions
+
+    Returns:
+        List[Quad]
+    """
+    result = []
+    for block in split_blocks(quads):
+        result.extend(number_block(block))
+    return result
@@ -0,0 +1,176 @@
+import glob
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import suppress
+from mmap import mmap
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+# Bump when the generated code changes in a way the source fingerprint can't see
+COMPILER_VERSION = "1.1.0"
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+_compiler_fingerprint: Optional[str] = None
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.environ.get("CPQ_CACHE_DIR") or os.path.join(base, "cpq", "compile")
+
+
+def compiler_fingerprint() -> str:
+    """
+    Identifies the compiler build: the version and the contents of the compiler's sources,
+    so editing any compiler module invalidates previously cached outputs.
+    """
+    global _compiler_fingerprint
+    if _compiler_fingerprint is None:
+        h = hashlib.sha256(COMPILER_VERSION.encode())
+        for filename in sorted(glob.glob(os.path.join(_SRC_DIR, "*.py"))):
+            try:
+                with open(filename, "rb") as f:
+                    h.update(f.read())
+            except OSError:
+                pass
+        _compiler_fingerprint = h.hexdigest()
+    return _compiler_fingerprint
+
+
+class CompileCache:
+    """
+    Content addressed cache of compiled QUAD programs.
+
+    An entry may also hold metadata about the compilation, e.g. the diagnostics it reported,
+    as a JSON line before the program. QUAD programs start with an instruction or a label,
+    never with "{", so entries without metadata are the program alone.
+    Entries are keyed by the source program, the compiler fingerprint and the compile options.
+    Every entry is a single file, written atomically, so concurrent compilers can share a cache.
+    Hits refresh the entry's modification time, which is used for LRU eviction
+    once the cache grows beyond `max_bytes`.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory: str = directory or default_cache_dir()
+        self.max_bytes: int = max_bytes
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._size: Optional[int] = None  # Bytes on disk, recomputed on eviction
+
+    def key(self, program: Union[str, bytes, mmap], options: Optional[dict] = None) -> str:
+        h = hashlib.sha256(compiler_fingerprint().encode())
+        h.update(json.dumps(options or {}, sort_keys=True).encode())
+        h.update(b"\0")
+        # Memory-mapped sources are hashed in place
+        h.update(program.encode() if isinstance(program, str) else program)
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.qud")
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.get_entry(key)
+        return None if entry is None else entry[0]
+
+    def get_entry(self, key: str, required: Iterable[str] = ()) -> Optional[Tuple[str, dict]]:
+        """
+        Args:
+            key (str)
+            required (Iterable[str]): metadata the entry must hold, else it is a miss
+
+        Returns:
+            Optional[Tuple[str, dict]]: the program and its metadata, None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                program = f.read()
+            metadata = {}
+            if program.startswith("{"):
+                header, _, program = program.partition("\n")
+                metadata = json.loads(header)
+        except (OSError, ValueError):
+            metadata = None
+        if metadata is None or not all(name in metadata for name in required):
+            self.stats["misses"] += 1
+            return None
+
+        with suppress(OSError):
+            os.utime(path)
+        self.stats["hits"] += 1
+        return program, metadata
+
+    def put(self, key: str, program: str, metadata: Optional[dict] = None) -> None:
+        """
+        Stores a compiled program, failing to write the cache is not an error.
+
+        Args:
+            key (str)
+            program (str)
+            metadata (Optional[dict]): JSON serializable, returned by `get_entry`
+        """
+        entry = (f"{json.dumps(metadata)}\n{program}" if metadata else program).encode("utf-8")
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(entry)
+                os.replace(tmp_path, path)
+            except OSError:
+                os.remove(tmp_path)
+                raise
+        except OSError:
+            return
+
+        self.stats["stores"] += 1
+        if self._size is not None:
+            self._size += len(entry)
+        if self._size is None or self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self) -> None:
+        """
+        Removes the least recently used entries until the cache fits in `max_bytes`.
+        """
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".qud"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= entry_size
+            self.stats["evictions"] += 1
+
+        self._size = size
+
+    def format_stats(self) -> str:
+        return format_stats(self.stats)
+
+
+def format_stats(stats: Dict[str, int]) -> str:
+    lookups = stats["hits"] + stats["misses"]
+    rate = 100 * stats["hits"] / lookups if lookups else 0
+    line = f"Compile cache: {stats['hits']} hits, {stats['misses']} misses ({rate:.1f}% hit rate)"
+    # Stores and evictions are only known to the process that performed them
+    if "stores" in stats:
+        line += f", {stats['stores']} stores, {stats['evictions']} evictions"
+    return line
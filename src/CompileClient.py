@@ -0,0 +1,33 @@
+import json
+import socket
+from typing import Optional
+
+# Only the standard library is imported, so a client starts quicker than a compiler
+
+
+def is_running(socket_path: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+
+def request(socket_path: str, payload: dict, timeout: Optional[float] = None) -> dict:
+    """
+    Sends a request to the compile server (see CompileServer) and waits for its response.
+
+    Raises:
+        OSError: if no server listens on `socket_path`
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(socket_path)
+        with client.makefile("rwb") as stream:
+            stream.write((json.dumps(payload) + "\n").encode())
+            stream.flush()
+            line = stream.readline()
+    if not line:
+        raise ConnectionError(f"The compile server on {socket_path} closed the connection")
+    return json.loads(line)
@@ -0,0 +1,180 @@
+import io
+import json
+import os
+import socketserver
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from typing import Optional, TextIO
+
+from CompileCache import CompileCache
+from CompileClient import is_running
+from CPLCompiler import LEXER_BACKENDS
+from CPLLexer import CPLLexer
+from CPLParser import CPLParser
+
+# Per-process compiler state, built once by `init_worker` and reused for every request
+_lexer: Optional[CPLLexer] = None
+_parser: Optional[CPLParser] = None
+
+
+def init_worker(lexer_backend: str = "sly") -> None:
+    global _lexer, _parser
+    _lexer = LEXER_BACKENDS[lexer_backend]()
+    _parser = CPLParser()
+
+
+def compile_request(request: dict) -> dict:
+    """
+    Compiles a request the way `cpq <file.ou>` compiles a file, capturing what it prints.
+
+    A request holds:
+        source (str): the CPL program
+        output (str): absolute path of the `.qud` file to write
+        optimization (Optional[dict]): see `cpq.get_optimization`
+        cache (Optional[dict]): CompileCache arguments, None to compile without a cache
+        cache_stats (bool)
+        stats (Optional[str]): file to append the compile statistics to, "-" for stderr
+        quiet (bool): don't print the program
+        bytecode (bool): also write the program's bytecode next to `output`
+
+    Returns:
+        dict: the printed `stdout` and `stderr`, the `exit_code` and the compile `seconds`
+    """
+    # Imported here since cpq starts the server
+    import cpq
+
+    if _parser is None:
+        init_worker()
+
+    start = time.perf_counter()
+    stdout, stderr = io.StringIO(), io.StringIO()
+    cache = CompileCache(**request["cache"]) if request.get("cache") else None
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        try:
+            cpq.main(
+                request["source"],
+                request["output"],
+                cache,
+                request.get("cache_stats", False),
+                request.get("optimization"),
+                request.get("stats"),
+                lexer=_lexer,
+                parser=_parser,
+                quiet=request.get("quiet", False),
+                bytecode=request.get("bytecode", False),
+            )
+        except Exception as e:
+            sys.stderr.write(f"An unhandled exception occurred.\n{e}")
+
+    return {
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "exit_code": 0,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """
+    Reads requests as JSON lines and answers each with a JSON line, in order.
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            received = time.perf_counter()
+            request = {}
+            try:
+                request = json.loads(line)
+                response = self.server.executor.submit(compile_request, request).result()
+            except Exception as e:
+                response = {
+                    "stdout": "",
+                    "stderr": f"An unhandled exception occurred.\n{e}",
+                    "exit_code": 1,
+                    "seconds": 0.0,
+                }
+            response["latency"] = time.perf_counter() - received
+            self.server.log_request(request, response)
+            self.wfile.write((json.dumps(response) + "\n").encode())
+
+
+class CompileServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Compiles programs sent over a Unix domain socket.
+
+    A pool of `workers` processes keeps a lexer and a parser ready, so a request only pays
+    for the compilation itself instead of the interpreter startup and the parser construction.
+    Every connection is served by its own thread, requests beyond the pool's size wait for
+    a free worker. The latency of every request is logged.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: str,
+        workers: Optional[int] = None,
+        lexer_backend: str = "sly",
+        log: Optional[TextIO] = None,
+    ):
+        """
+        Args:
+            socket_path (str)
+            workers (Optional[int]): compiler processes, defaults to the number of cores
+            lexer_backend (str): one of LEXER_BACKENDS
+            log (Optional[TextIO]): where request latencies are logged, default stderr
+        """
+        if is_running(socket_path):
+            raise OSError(f"A compile server is already listening on {socket_path}")
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)  # Left behind by a server which didn't shut down
+
+        self.socket_path: str = socket_path
+        self.workers: int = max(1, workers or os.cpu_count() or 1)
+        self.log: TextIO = log or sys.stderr
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=init_worker, initargs=(lexer_backend,)
+        )
+        # Start the workers now, so the first requests find them ready
+        for future in [self.executor.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+        super().__init__(socket_path, RequestHandler)
+
+    def log_request(self, request: dict, response: dict) -> None:
+        latency = response["latency"]
+        waited = max(0.0, latency - response["seconds"])
+        self.log.write(
+            f"{request.get('output', '<invalid request>')}: {latency * 1000:.1f} ms "
+            f"({waited * 1000:.1f} ms waiting)\n"
+        )
+        self.log.flush()
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def serve(socket_path: str, workers: Optional[int] = None) -> int:
+    """
+    Server mode entry point, runs until interrupted.
+
+    Returns:
+        int: exit code
+    """
+    try:
+        server = CompileServer(socket_path, workers)
+    except OSError as e:
+        sys.stderr.write(f"ERROR (Compile Server): {e}\n")
+        return 1
+
+    sys.stderr.write(f"Listening on {socket_path} with {server.workers} workers\n")
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
@@ -0,0 +1,91 @@
+import json
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Called with the name of every phase as it ends ("cache", "lex", "parse", "optimize",
+# "render"), with "finished" once the program is compiled and with "write" when a compiler
+# used as a context manager has written the output file
+Hook = Callable[[str, "CompileStats"], None]
+
+
+def peak_memory_kb() -> Optional[int]:
+    """
+    The peak resident set size of the process so far, None where it's not available.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+@dataclass
+class CompileStats:
+    """
+    Measurements of a single compilation, see `CPLCompiler(hooks=...)`.
+
+    Lexing and parsing are interleaved, the lexer producing tokens as the parser asks for
+    them, so the time spent in the lexer is measured per token and excluded from "parse".
+    """
+
+    phases: Dict[str, float] = field(default_factory=dict)  # Phase -> seconds
+    tokens: int = 0
+    reductions: int = 0
+    symbols: int = 0
+    temporaries: int = 0
+    labels: int = 0
+    instructions: int = 0
+    peak_memory_kb: Optional[int] = None  # Of the whole process
+    cache_hit: Optional[bool] = None
+    passes: List[dict] = field(default_factory=list)  # See PassManager.PassStats
+
+    def add_time(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(self.phases.values())
+
+    def to_dict(self) -> dict:
+        """
+        The stats as JSON compatible values, see `write_stats`.
+        """
+        result = asdict(self)
+        result["total_seconds"] = self.total_seconds
+        return result
+
+
+def timed_tokens(tokens: Iterable, stats: CompileStats) -> Iterator:
+    """
+    Passes tokens through, counting them and adding the time taken to produce them to "lex".
+    """
+    iterator = iter(tokens)
+    while True:
+        start = time.perf_counter()
+        try:
+            token = next(iterator)
+        except StopIteration:
+            stats.add_time("lex", time.perf_counter() - start)
+            return
+        stats.add_time("lex", time.perf_counter() - start)
+        stats.tokens += 1
+        yield token
+
+
+def write_stats(records: Iterable[dict], target: str) -> None:
+    """
+    Appends records as JSON lines to the file `target`, "-" writes them to stderr.
+    """
+    lines = "".join(f"{json.dumps(record, sort_keys=True)}\n" for record in records)
+    if target == "-":
+        sys.stderr.write(lines)
+        return
+    with open(target, "a") as f:
+        f.write(lines)
@@ -0,0 +1,57 @@
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+from CPLCompiler import LEXER_BACKENDS, CompileResult, compile_source
+from CPLLexer import CPLLexer
+from CPLParser import CPLParser
+
+
+class CompilerPool:
+    """
+    Lexers and parsers shared by threads compiling programs in the same process.
+
+    Every compilation borrows an idle lexer and parser, or builds them if there are none,
+    and returns them once it's done, so no two threads use the same instances.
+    The parse tables are built once per process, so building another parser is cheap.
+    """
+
+    def __init__(self, size: Optional[int] = None, lexer_backend: str = "sly"):
+        """
+        Args:
+            size (Optional[int]): the most compilations running at once, further ones wait
+                for an instance to be returned. Unlimited by default
+            lexer_backend (str): one of LEXER_BACKENDS
+        """
+        self._lexer_class = LEXER_BACKENDS[lexer_backend]
+        # The most recently returned instances are borrowed first, they are likely in cache
+        self._idle: "queue.LifoQueue[Tuple[CPLLexer, CPLParser]]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size) if size else None
+
+    @contextmanager
+    def acquire(self) -> Iterator[Tuple[CPLLexer, CPLParser]]:
+        """
+        Borrows a lexer and a parser for the duration of the `with` block.
+        """
+        if self._slots:
+            self._slots.acquire()
+        try:
+            try:
+                instances = self._idle.get_nowait()
+            except queue.Empty:
+                instances = self._lexer_class(), CPLParser()
+            try:
+                yield instances
+            finally:
+                self._idle.put(instances)
+        finally:
+            if self._slots:
+                self._slots.release()
+
+    def compile(self, source: str, **options) -> CompileResult:
+        """
+        `compile_source` with a borrowed lexer and parser, safe to call from any thread.
+        """
+        with self.acquire() as (lexer, parser):
+            return compile_source(source, lexer=lexer, parser=parser, **options)
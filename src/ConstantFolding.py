@@ -0,0 +1,191 @@
+import math
+from typing import Dict, List, Optional, Sequence, Union
+
+from ControlFlowGraph import ControlFlowGraph
+from Quad import Quad, is_constant
+from QuadInterpreter import int_div, parse_constant
+
+Value = Union[int, float]
+
+BINARY_OPS = {
+    "ADD": lambda a, b: a + b,
+    "SUB": lambda a, b: a - b,
+    "MLT": lambda a, b: a * b,
+    "EQL": lambda a, b: 1 if a == b else 0,
+    "NQL": lambda a, b: 1 if a != b else 0,
+    "LSS": lambda a, b: 1 if a < b else 0,
+    "GRT": lambda a, b: 1 if a > b else 0,
+}
+
+
+def evaluate(op: str, values: Sequence[Value]) -> Optional[Value]:
+    """
+    Computes an instruction on constant operands with the same semantics as QuadInterpreter.
+    Returns None if the instruction can't be computed at compile time (division by zero).
+
+    Args:
+        op (str): instruction, e.g. "IADD"
+        values (Sequence[Value]): source operand values
+
+    Returns:
+        Optional[Value]: int for integer results (including relational operators), float otherwise
+    """
+    if op == "ITOR":
+        return float(values[0]) if abs(values[0]) < 2**1023 else None
+    if op == "RTOI":
+        return int(values[0]) if math.isfinite(values[0]) else None
+    if op.endswith("ASN"):
+        return values[0]
+
+    kind = op[1:]
+    a, b = values
+    if op[0] == "R":
+        a, b = float(a), float(b)
+
+    if kind == "DIV":
+        if b == 0:
+            return None
+        return a / b if op[0] == "R" else int_div(a, b)
+    return BINARY_OPS[kind](a, b)
+
+
+def format_constant(value: Value) -> Optional[str]:
+    """
+    Renders a value as a QUAD literal.
+    Returns None for reals without a plain decimal form (exponents, inf, nan).
+    """
+    text = repr(value)
+    if isinstance(value, float) and not set(text) <= set("-.0123456789"):
+        return None
+    return text
+
+
+def is_foldable(quad: Quad) -> bool:
+    return (
+        quad.dest is not None
+        and not quad.op.endswith("INP")
+        and all(is_constant(operand) for operand in quad.sources)
+    )
+
+
+def is_pure(quad: Quad) -> bool:
+    """
+    Instructions which can be removed when their result is unused.
+    Input consumes a value and division may fault, so they are only pure when proven safe.
+    """
+    if quad.dest is None or quad.op.endswith("INP"):
+        return False
+    if quad.op.endswith("DIV"):
+        divisor = quad.args[2]
+        return is_constant(divisor) and parse_constant(divisor) != 0
+    return True
+
+
+def fold_block(block: List[Quad], known: Dict[str, str]) -> List[Quad]:
+    """
+    Substitutes known constants into the block's instructions and folds them.
+    `known` maps variables to constant operands and is updated to the facts at the block's end.
+    """
+    result = []
+    for quad in block:
+        quad = quad.replace_sources(known)
+
+        dest = quad.dest
+        if dest is None:
+            result.append(quad)
+            continue
+
+        constant = None
+        if is_foldable(quad):
+            value = evaluate(quad.op, [parse_constant(s) for s in quad.sources])
+            constant = None if value is None else format_constant(value)
+        if constant is not None:
+            prefix = "R" if isinstance(parse_constant(constant), float) else "I"
+            quad = Quad(f"{prefix}ASN", dest, constant)
+            known[dest] = constant
+        else:
+            known.pop(dest, None)
+        result.append(quad)
+    return result
+
+
+def meet(facts: List[Dict[str, str]]) -> Dict[str, str]:
+    """
+    Keeps the constants all incoming paths agree on.
+    """
+    if not facts:
+        return {}
+    result = dict(facts[0])
+    for other in facts[1:]:
+        for name in list(result):
+            if other.get(name) != result[name]:
+                del result[name]
+    return result
+
+
+def propagate_constants(quads: List[Quad]) -> List[Quad]:
+    """
+    Global constant propagation: iterates the block transfer functions to a fixpoint,
+    then rewrites every block with the constants known at its entry.
+    """
+    cfg = ControlFlowGraph(quads)
+
+    # None is "not reached yet", which does not constrain the meet
+    out: List[Optional[Dict[str, str]]] = [None] * len(cfg)
+
+    def entry_facts(block):
+        if block is cfg.entry:
+            return {}
+        reached = [out[p.index] for p in block.predecessors if out[p.index] is not None]
+        return meet(reached) if reached else None
+
+    changed = True
+    while changed:
+        changed = False
+        for block in cfg.reverse_postorder():
+            known = entry_facts(block)
+            if known is None:
+                continue
+            fold_block(block.quads, known)
+            if known != out[block.index]:
+                out[block.index] = known
+                changed = True
+
+    result = []
+    for block in cfg:
+        result.extend(fold_block(block.quads, entry_facts(block) or {}))
+    return result
+
+
+def eliminate_dead_code(quads: List[Quad]) -> List[Quad]:
+    """
+    Removes pure instructions whose result is never read anywhere in the program.
+    """
+    while True:
+        used = {source for quad in quads for source in quad.sources}
+        live = [q for q in quads if not (is_pure(q) and q.dest not in used)]
+        if len(live) == len(quads):
+            return live
+        quads = live
+
+
+def fold_constants(quads: List[Quad], symtab: Optional[Dict[str, str]] = None) -> List[Quad]:
+    """
+    Constant folding and propagation pass.
+
+    Arithmetic, relational operators and casts on constants are computed at compile time,
+    the results flow into the instructions that read them (across blocks, as long as
+    every path agrees on the value) and the definitions nobody reads are removed.
+
+    examples:
+    IADD t15 33 2 / IMLT t16 3 t15 -> IASN t16 105 (if t15 is not used elsewhere)
+    IGRT t4 5 3 / JMPZ L1 t4 -> JMPZ L1 1
+
+    Args:
+        quads (List[Quad])
+        symtab (Optional[Dict[str, str]]): unused, types are known from the instructions
+
+    Returns:
+        List[Quad]
+    """
+    return eliminate_dead_code(propagate_constants(quads))
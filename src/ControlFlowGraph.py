@@ -0,0 +1,228 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Set
+
+from Quad import JUMP_OPS, LABEL, Quad
+
+
+def split_blocks(quads: List[Quad]) -> List[List[Quad]]:
+    """
+    Splits instructions into basic blocks, a block starts at a label or after a jump.
+    """
+    blocks: List[List[Quad]] = []
+    block: List[Quad] = []
+    for quad in quads:
+        if quad.op == LABEL and block:
+            blocks.append(block)
+            block = []
+        block.append(quad)
+        if quad.op in JUMP_OPS or quad.op == "HALT":
+            blocks.append(block)
+            block = []
+    if block:
+        blocks.append(block)
+    return blocks
+
+
+class BasicBlock:
+    """
+    A straight-line sequence of instructions, only entered at its first instruction
+    (its label, if it has one) and only left after its last instruction.
+    """
+
+    __slots__ = ("index", "quads", "successors", "predecessors")
+
+    def __init__(self, index: int, quads: List[Quad]):
+        self.index: int = index
+        self.quads: List[Quad] = quads
+        self.successors: List["BasicBlock"] = []
+        self.predecessors: List["BasicBlock"] = []
+
+    @property
+    def label(self) -> Optional[str]:
+        return self.quads[0].args[0] if self.quads[0].op == LABEL else None
+
+    @property
+    def terminator(self) -> Optional[Quad]:
+        """
+        The jump or HALT ending the block, None if the block falls through.
+        """
+        last = self.quads[-1]
+        return last if last.op in JUMP_OPS or last.op == "HALT" else None
+
+    def __iter__(self) -> Iterator[Quad]:
+        return iter(self.quads)
+
+    def __len__(self) -> int:
+        return len(self.quads)
+
+    def __repr__(self) -> str:
+        return f"BasicBlock({self.index}, {len(self.quads)} quads)"
+
+
+@dataclass
+class Loop:
+    """
+    A natural loop: its header dominates every block of the loop,
+    and some block of the loop jumps back to the header.
+    """
+
+    header: BasicBlock
+    blocks: List[BasicBlock]  # In program order, including the header
+    indices: Set[int] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.indices = {block.index for block in self.blocks}
+
+    def __contains__(self, block: BasicBlock) -> bool:
+        return block.index in self.indices
+
+    def exits(self) -> List[BasicBlock]:
+        """
+        The blocks outside the loop which a block of the loop jumps or falls through to.
+        """
+        exits: List[BasicBlock] = []
+        for block in self.blocks:
+            for successor in block.successors:
+                if successor not in self and successor not in exits:
+                    exits.append(successor)
+        return exits
+
+
+class ControlFlowGraph:
+    """
+    Basic blocks of a QUAD program, in program order, connected by their jumps and
+    fall-through edges. The first block is the entry.
+
+    examples:
+    cfg = ControlFlowGraph(quads)
+    for block in cfg: block.successors, block.predecessors
+    cfg.quads(cfg.reachable()) -> the program without unreachable blocks
+    """
+
+    def __init__(self, quads: List[Quad]):
+        self.blocks: List[BasicBlock] = [
+            BasicBlock(i, block) for i, block in enumerate(split_blocks(quads))
+        ]
+        self._label_block: Dict[str, BasicBlock] = {
+            block.label: block for block in self.blocks if block.label is not None
+        }
+
+        for i, block in enumerate(self.blocks):
+            last = block.quads[-1]
+            if last.op in JUMP_OPS:
+                block.successors.append(self._label_block[last.args[0]])
+            if last.op not in ("JUMP", "HALT") and i + 1 < len(self.blocks):
+                following = self.blocks[i + 1]
+                if following not in block.successors:
+                    block.successors.append(following)
+            for successor in block.successors:
+                successor.predecessors.append(block)
+
+    @property
+    def entry(self) -> Optional[BasicBlock]:
+        return self.blocks[0] if self.blocks else None
+
+    def block_of(self, label: str) -> BasicBlock:
+        return self._label_block[label]
+
+    def __iter__(self) -> Iterator[BasicBlock]:
+        return iter(self.blocks)
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    def reachable(self) -> List[BasicBlock]:
+        """
+        The blocks some path from the entry reaches, in program order.
+        """
+        if not self.blocks:
+            return []
+        seen: Set[int] = {0}
+        stack = [self.blocks[0]]
+        while stack:
+            for successor in stack.pop().successors:
+                if successor.index not in seen:
+                    seen.add(successor.index)
+                    stack.append(successor)
+        return [block for block in self.blocks if block.index in seen]
+
+    def reverse_postorder(self) -> List[BasicBlock]:
+        """
+        Reachable blocks ordered so every block comes before its successors,
+        except along back edges. Forward dataflow problems converge fastest in this order.
+        """
+        if not self.blocks:
+            return []
+        order: List[BasicBlock] = []
+        seen: Set[int] = {0}
+        stack = [(self.blocks[0], iter(self.blocks[0].successors))]
+        while stack:
+            block, successors = stack[-1]
+            for successor in successors:
+                if successor.index not in seen:
+                    seen.add(successor.index)
+                    stack.append((successor, iter(successor.successors)))
+                    break
+            else:
+                order.append(block)
+                stack.pop()
+        order.reverse()
+        return order
+
+    def dominators(self) -> List[Set[int]]:
+        """
+        For every block, the indices of the blocks on every path from the entry to it
+        (including itself). Unreachable blocks have no dominators.
+        """
+        order = self.reverse_postorder()
+        everything = {block.index for block in order}
+        dominators: List[Set[int]] = [set() for _ in self.blocks]
+        for block in order:
+            dominators[block.index] = set(everything)
+        if order:
+            dominators[order[0].index] = {order[0].index}
+
+        changed = True
+        while changed:
+            changed = False
+            for block in order[1:]:
+                reached = [
+                    dominators[p.index] for p in block.predecessors if dominators[p.index]
+                ]
+                new = set.intersection(*reached) | {block.index}
+                if new != dominators[block.index]:
+                    dominators[block.index] = new
+                    changed = True
+        return dominators
+
+    def natural_loops(self) -> List[Loop]:
+        """
+        The loops formed by back edges (jumps to a dominating block), loops sharing a header
+        are merged. Inner loops come before the loops containing them.
+        """
+        dominators = self.dominators()
+        bodies: Dict[int, Set[int]] = {}
+        for block in self.blocks:
+            for successor in block.successors:
+                if successor.index not in dominators[block.index]:
+                    continue
+                # Everything reaching the back edge without passing the header
+                body = bodies.setdefault(successor.index, {successor.index})
+                stack = [block]
+                while stack:
+                    member = stack.pop()
+                    if member.index not in body:
+                        body.add(member.index)
+                        stack.extend(p for p in member.predecessors if dominators[p.index])
+
+        loops = [
+            Loop(self.blocks[header], [b for b in self.blocks if b.index in body])
+            for header, body in bodies.items()
+        ]
+        return sorted(loops, key=lambda loop: len(loop.blocks))
+
+    def quads(self, blocks: Optional[List[BasicBlock]] = None) -> List[Quad]:
+        """
+        The instructions of the given blocks (all blocks by default), in order.
+        """
+        return [quad for block in (self.blocks if blocks is None else blocks) for quad in block]
@@ -0,0 +1,154 @@
+from typing import Dict, List, Optional
+
+from ControlFlowGraph import ControlFlowGraph
+from Quad import JUMP_OPS, LABEL, Quad, is_constant
+from QuadInterpreter import parse_constant
+
+
+def fold_constant_branches(quads: List[Quad]) -> List[Quad]:
+    """
+    `JMPZ L 0` always jumps and becomes `JUMP L`, `JMPZ L 1` never jumps and is removed.
+    """
+    result = []
+    for quad in quads:
+        if quad.op == "JMPZ" and is_constant(quad.args[1]):
+            if parse_constant(quad.args[1]) != 0:
+                continue
+            quad = Quad("JUMP", quad.args[0])
+        result.append(quad)
+    return result
+
+
+def label_targets(quads: List[Quad]) -> Dict[str, Optional[Quad]]:
+    """
+    The instruction every label leads to, None for labels at the end of the program.
+    """
+    targets: Dict[str, Optional[Quad]] = {}
+    pending: List[str] = []
+    for quad in quads:
+        if quad.op == LABEL:
+            pending.append(quad.args[0])
+            continue
+        for label in pending:
+            targets[label] = quad
+        pending = []
+    for label in pending:
+        targets[label] = None
+    return targets
+
+
+def thread_jumps(quads: List[Quad]) -> List[Quad]:
+    """
+    Jumps to an unconditional jump go straight to its final target,
+    and a `JUMP` to a `HALT` halts right away.
+    """
+    targets = label_targets(quads)
+
+    def final_target(label: str) -> str:
+        seen = {label}
+        target = targets[label]
+        while target is not None and target.op == "JUMP" and target.args[0] not in seen:
+            label = target.args[0]
+            seen.add(label)
+            target = targets[label]
+        return label
+
+    result = []
+    for quad in quads:
+        if quad.op in JUMP_OPS:
+            label = final_target(quad.args[0])
+            target = targets[label]
+            if quad.op == "JUMP" and target is not None and target.op == "HALT":
+                quad = Quad("HALT")
+            elif label != quad.args[0]:
+                quad = Quad(quad.op, label, *quad.args[1:])
+        result.append(quad)
+    return result
+
+
+def remove_unreachable(quads: List[Quad]) -> List[Quad]:
+    """
+    Removes the blocks no path from the start of the program reaches.
+    The final HALT is kept, even if the program never gets there.
+    """
+    cfg = ControlFlowGraph(quads)
+    result = cfg.quads(cfg.reachable())
+    if quads and quads[-1].op == "HALT" and (not result or result[-1] is not quads[-1]):
+        result.append(quads[-1])
+    return result
+
+
+def remove_jumps_to_next(quads: List[Quad]) -> List[Quad]:
+    """
+    Removes jumps to a label directly following them, possibly among other labels.
+    """
+    result = []
+    for i, quad in enumerate(quads):
+        if quad.op in JUMP_OPS:
+            following = i + 1
+            while (
+                following < len(quads)
+                and quads[following].op == LABEL
+                and quads[following].args[0] != quad.args[0]
+            ):
+                following += 1
+            if following < len(quads) and quads[following].op == LABEL:
+                continue
+        result.append(quad)
+    return result
+
+
+def merge_labels(quads: List[Quad]) -> List[Quad]:
+    """
+    Consecutive labels are replaced by the first of them, and labels which are not
+    the target of any jump are removed.
+    """
+    merged: Dict[str, str] = {}
+    first: Optional[str] = None
+    for quad in quads:
+        if quad.op == LABEL:
+            first = first or quad.args[0]
+            merged[quad.args[0]] = first
+        else:
+            first = None
+
+    result = []
+    for quad in quads:
+        if quad.op in JUMP_OPS and merged[quad.args[0]] != quad.args[0]:
+            quad = Quad(quad.op, merged[quad.args[0]], *quad.args[1:])
+        result.append(quad)
+
+    used = {quad.args[0] for quad in result if quad.op in JUMP_OPS}
+    return [quad for quad in result if quad.op != LABEL or quad.args[0] in used]
+
+
+def simplify_control_flow(
+    quads: List[Quad], symtab: Optional[Dict[str, str]] = None
+) -> List[Quad]:
+    """
+    Control flow simplification pass.
+
+    Branches on constant conditions become unconditional, the code they can no longer
+    reach is removed, jumps are threaded through jumps and labels are merged, until
+    none of these apply anymore.
+
+    examples:
+    JMPZ L1 1 / IPRT a / JUMP L2 / L1: / IPRT b / L2: -> IPRT a
+    JUMP L1 / ... / L1: / JUMP L2 -> JUMP L2
+
+    Args:
+        quads (List[Quad])
+        symtab (Optional[Dict[str, str]]): unused
+
+    Returns:
+        List[Quad]
+    """
+    while True:
+        simplified = fold_constant_branches(quads)
+        simplified = thread_jumps(simplified)
+        simplified = remove_unreachable(simplified)
+        simplified = remove_jumps_to_next(simplified)
+        simplified = merge_labels(simplified)
+        if simplified == quads:
+            return simplified
+        quads = simplified
@@ -0,0 +1,103 @@
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set
+
+from ConstantFolding import eliminate_dead_code
+from ControlFlowGraph import split_blocks
+from Quad import Quad, is_constant
+
+
+def result_type(quad: Quad) -> str:
+    """
+    The type ("I"/"R") of the value an instruction assigns.
+    """
+    if quad.op == "ITOR":
+        return "R"
+    if quad.op == "RTOI" or quad.op[1:] in ("EQL", "NQL", "LSS", "GRT"):
+        return "I"
+    return quad.op[0]
+
+
+def coalesce_block(block: List[Quad], defs: Counter, uses: Counter) -> List[Quad]:
+    """
+    Rewrites `OP t ...` followed by `XASN v t` into `OP v ...`, when `t` is assigned and read
+    exactly once and `v` is neither read nor assigned in between.
+    """
+    block = list(block)
+    definition: Dict[str, int] = {}
+    for i, quad in enumerate(block):
+        if quad is None:
+            continue
+        if quad.op.endswith("ASN") and not is_constant(quad.args[1]):
+            v, t = quad.args
+            j = definition.get(t)
+            if (
+                j is not None
+                and t != v
+                and defs[t] == 1
+                and uses[t] == 1
+                and result_type(block[j]) == quad.op[0]
+                and not any(
+                    q is not None and (q.dest == v or v in q.sources)
+                    for q in block[j + 1 : i]
+                )
+            ):
+                block[j] = Quad(block[j].op, v, *block[j].args[1:])
+                block[i] = None
+                definition[v] = j
+                continue
+        if quad.dest is not None:
+            definition[quad.dest] = i
+    return [quad for quad in block if quad is not None]
+
+
+def propagate_block(block: List[Quad]) -> List[Quad]:
+    """
+    Replaces reads of `x` after `XASN x y` by reads of `y`, until either of them is reassigned.
+    """
+    copies: Dict[str, str] = {}
+    copied_from: Dict[str, Set[str]] = defaultdict(set)  # The names copying a variable
+    result = []
+    for quad in block:
+        quad = quad.replace_sources(copies)
+
+        dest = quad.dest
+        if dest is not None:
+            if dest in copies:
+                copied_from[copies.pop(dest)].discard(dest)
+            for name in copied_from.pop(dest, ()):
+                del copies[name]
+            if quad.op.endswith("ASN") and not is_constant(quad.args[1]):
+                if quad.args[1] != dest:
+                    copies[dest] = quad.args[1]
+                    copied_from[quad.args[1]].add(dest)
+        result.append(quad)
+    return result
+
+
+def propagate_copies(quads: List[Quad], symtab: Optional[Dict[str, str]] = None) -> List[Quad]:
+    """
+    Copy propagation and temporary coalescing pass.
+
+    Every assignment is generated as a computation into a fresh temporary followed by a copy,
+    the computation is retargeted to the assigned variable instead, and the remaining copies
+    are propagated into the instructions reading them within each basic block.
+    Copies which are no longer read are removed.
+
+    examples:
+    ISUB t2 a 1 / IASN a t2 -> ISUB a a 1
+    IASN a b / IPRT a -> IPRT b (and IASN a b is removed if `a` is not read elsewhere)
+
+    Args:
+        quads (List[Quad])
+        symtab (Optional[Dict[str, str]]): unused, types are known from the instructions
+
+    Returns:
+        List[Quad]
+    """
+    defs = Counter(quad.dest for quad in quads if quad.dest is not None)
+    uses = Counter(source for quad in quads for source in quad.sources)
+
+    result = []
+    for block in split_blocks(quads):
+        result.extend(propagate_block(coalesce_block(block, defs, uses)))
+    return eliminate_dead_code(result)
@@ -1,38 +1,214 @@
 import argparse
+import glob
+import mmap
+import os
 import sys
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple, Union
 
+from OptimizationLevels import OPTIMIZATION_LEVELS, PASS_NAMES
 
-def get_args() -> Tuple[str, str]:
+
+def get_args() -> argparse.Namespace:
     """
     Internal functions to handle arguments
 
-    Checks for the following errors:
-    -   Filename was not provided
-    -   Filename does not end with `.ou`
-    -   Filename is not a valid path
-
-    Shows an error message according to each case and exits with code 0.
+    Exits with code 0 if no input was provided, unless a compile server is started.
 
     Returns:
-        Tuple[str, str]: file contents and output file name
+        argparse.Namespace: parsed arguments, `prog` holds the program name for error messages
     """
     parser = argparse.ArgumentParser()
     parser.add_argument(
-        "input", nargs="?", type=str, help="CPL program file", default=None
+        "inputs",
+        nargs="*",
+        type=str,
+        help="CPL program files, directories or glob patterns",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="worker processes used to compile several files or by the compile server "
+        "(default: number of cores)",
+    )
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        action="store_true",
+        help="only write the .qud file, without printing the program to stdout",
+    )
+    parser.add_argument(
+        "--bytecode",
+        action="store_true",
+        help="also write the program as binary QUAD bytecode to a .qbc file next to the .qud",
+    )
+    parser.add_argument(
+        "--mmap",
+        action="store_true",
+        help="memory-map the input files and lex their bytes in place with the fast lexer, "
+        "for very large programs",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="serve unchanged programs from the compile cache ($CPQ_CACHE_DIR or ~/.cache/cpq)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=None,
+        help="compile cache directory, implies --cache",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=256,
+        help="compile cache size limit, least recently used outputs are evicted first",
+    )
+    parser.add_argument(
+        "--cache-stats",
+        action="store_true",
+        help="print compile cache hit/miss statistics to stderr",
     )
 
-    filename = parser.parse_args().input
+    parser.add_argument(
+        "-O",
+        dest="level",
+        type=int,
+        choices=sorted(OPTIMIZATION_LEVELS),
+        default=0,
+        help="optimization level: -O0 (default) is unoptimized, -O1 runs the cheap passes, -O2 all",
+    )
+    parser.add_argument(
+        "--enable-pass",
+        dest="enable",
+        action="append",
+        choices=PASS_NAMES,
+        default=[],
+        help="run an optimization pass the level doesn't include, may be repeated",
+    )
+    parser.add_argument(
+        "--disable-pass",
+        dest="disable",
+        action="append",
+        choices=PASS_NAMES,
+        default=[],
+        help="skip an optimization pass of the level, may be repeated",
+    )
+    parser.add_argument(
+        "--time-passes",
+        action="store_true",
+        help="print the wall time and instruction count change of every pass to stderr",
+    )
+
+    parser.add_argument(
+        "--stats",
+        nargs="?",
+        const="-",
+        default=None,
+        metavar="FILE",
+        help="append compile statistics as JSON lines to FILE (default: stderr)",
+    )
+
+    parser.add_argument(
+        "--serve",
+        type=str,
+        default=None,
+        metavar="SOCKET",
+        help="run a compile server listening on the Unix socket SOCKET with --jobs workers",
+    )
+    parser.add_argument(
+        "--server",
+        type=str,
+        default=None,
+        metavar="SOCKET",
+        help="compile a single file through the compile server on SOCKET (default: "
+        "$CPQ_SERVER), compiles it directly when no server is running",
+    )
+
+    args = parser.parse_args()
+    args.prog = parser.prog
+
+    if not args.inputs and not args.serve:
+        check_file_validity(None, parser.prog)
+
+    return args
+
+
+def is_batch(inputs: List[str]) -> bool:
+    """
+    Several files, a directory or a glob pattern are compiled in batch mode,
+    a single file is compiled and printed like before.
+    """
+    if len(inputs) != 1:
+        return True
+    return os.path.isdir(inputs[0]) or glob.has_magic(inputs[0])
 
-    check_file_validity(filename, parser.prog)
 
-    return attempt_to_read_file(filename), filename.replace(".ou", ".qud")
+def collect_input_files(inputs: List[str]) -> List[str]:
+    """
+    Expands directories (recursively) and glob patterns into `.ou` files.
+    Explicitly named files are kept as is, so invalid names are reported per file.
+
+    Args:
+        inputs (List[str]): files, directories and glob patterns
+
+    Returns:
+        List[str]: file names without duplicates, in the given order
+    """
+    files = []
+    for entry in inputs:
+        if os.path.isdir(entry):
+            pattern = os.path.join(entry, "**", "*.ou")
+            files.extend(sorted(glob.glob(pattern, recursive=True)))
+        elif glob.has_magic(entry):
+            matches = glob.glob(entry, recursive=True)
+            files.extend(sorted(f for f in matches if f.endswith(".ou")))
+        else:
+            files.append(entry)
+
+    return list(dict.fromkeys(files))
+
+
+def read_input(
+    filename: str, prog: str, memory_map: bool = False
+) -> Tuple[Union[str, bytes, mmap.mmap], str]:
+    """
+    Checks a single input file and reads it.
+
+    Args:
+        filename (str)
+        prog (str): program name, for error messages
+        memory_map (bool): map the file instead of reading it, see `map_input`
+
+    Returns:
+        Tuple[Union[str, bytes, mmap.mmap], str]: file contents and output file name
+    """
+    check_file_validity(filename, prog)
+
+    data = map_input(filename) if memory_map else attempt_to_read_file(filename)
+    return data, output_filename(filename)
+
+
+def output_filename(filename: str) -> str:
+    return filename.replace(".ou", ".qud")
+
+
+def bytecode_filename(outfile: str) -> str:
+    return os.path.splitext(outfile)[0] + ".qbc"
 
 
 def check_file_validity(filename: str, prog: str) -> None:
     """
     Checks if the input file exists and has the correct extension.
 
+    Checks for the following errors:
+    -   Filename was not provided
+    -   Filename does not end with `.ou`
+
+    Shows an error message according to each case and exits with code 0.
+
     Args:
         filename (str)
         prog (str): program name, for error messages
@@ -70,3 +246,41 @@ def attempt_to_read_file(filename: str) -> Optional[str]:
             f"ERROR (Input File Does Not Exist): {filename} is not a valid path."
         )
         sys.exit(0)
+
+
+def map_input(filename: str) -> Union[bytes, mmap.mmap]:
+    """
+    Memory-maps a file read-only, so its pages are loaded as the lexer scans them
+    instead of reading and decoding all of it up front.
+    Exits with 0 if the file could not be opened, like `attempt_to_read_file`.
+
+    Args:
+        filename (str)
+
+    Returns:
+        Union[bytes, mmap.mmap]: the mapped file, empty bytes for an empty file
+    """
+    try:
+        return map_file(filename)
+    except IOError:
+        sys.stderr.write(
+            f"ERROR (Input File Does Not Exist): {filename} is not a valid path."
+        )
+        sys.exit(0)
+
+
+def map_file(filename: str) -> Union[bytes, mmap.mmap]:
+    """
+    Memory-maps a file read-only, raising OSError if it could not be opened.
+
+    Args:
+        filename (str)
+
+    Returns:
+        Union[bytes, mmap.mmap]: the mapped file, empty bytes for an empty file
+    """
+    with open(filename, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""  # Empty files can't be mapped
+        # The mapping stays valid after the file is closed
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
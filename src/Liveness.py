@@ -0,0 +1,62 @@
+from typing import List, Set, Tuple
+
+from ControlFlowGraph import ControlFlowGraph
+from Quad import Quad, is_constant
+
+
+def uses_and_defs(block: List[Quad]) -> Tuple[Set[str], Set[str]]:
+    """
+    The variables a block reads before assigning them, and the variables it assigns.
+    """
+    used: Set[str] = set()
+    defined: Set[str] = set()
+    for quad in block:
+        used.update(s for s in quad.sources if s not in defined and not is_constant(s))
+        if quad.dest is not None:
+            defined.add(quad.dest)
+    return used, defined
+
+
+def live_variables(quads: List[Quad]) -> Tuple[List[Set[str]], List[Set[str]]]:
+    """
+    Backward liveness analysis: a variable is live at a point if some path from that point
+    reads it before assigning it.
+
+    Args:
+        quads (List[Quad])
+
+    Returns:
+        Tuple[List[Set[str]], List[Set[str]]]: the live variables before and after every
+        instruction, indexed like `quads`
+    """
+    cfg = ControlFlowGraph(quads)
+    summaries = [uses_and_defs(block.quads) for block in cfg]
+
+    live_in: List[Set[str]] = [set() for _ in cfg]
+    live_out: List[Set[str]] = [set() for _ in cfg]
+    changed = True
+    while changed:
+        changed = False
+        for block in reversed(cfg.blocks):
+            i = block.index
+            out = set().union(*(live_in[s.index] for s in block.successors))
+            used, defined = summaries[i]
+            entry = used | (out - defined)
+            if entry != live_in[i] or out != live_out[i]:
+                live_in[i], live_out[i] = entry, out
+                changed = True
+
+    before: List[Set[str]] = []
+    after: List[Set[str]] = []
+    for block, out in zip(cfg, live_out):
+        block_before, block_after = [], []
+        live = set(out)
+        for quad in reversed(block.quads):
+            block_after.append(set(live))
+            if quad.dest is not None:
+                live.discard(quad.dest)
+            live.update(s for s in quad.sources if not is_constant(s))
+            block_before.append(set(live))
+        before.extend(reversed(block_before))
+        after.extend(reversed(block_after))
+    return before, after
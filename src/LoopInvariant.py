@@ -0,0 +1,138 @@
+from collections import Counter
+from typing import Dict, List, Optional, Set
+
+from ConstantFolding import is_pure
+from ControlFlowGraph import BasicBlock, ControlFlowGraph, Loop
+from Liveness import live_variables
+from Quad import Quad, is_constant
+
+
+def find_preheader(loop: Loop) -> Optional[BasicBlock]:
+    """
+    The block entering the loop from outside, if there is exactly one and it only leads
+    into the loop, so code placed at its end runs once before the loop starts.
+    Generated while loops always have one: the block ending with the jump to the condition.
+    """
+    outside = [block for block in loop.header.predecessors if block not in loop]
+    if len(outside) != 1 or outside[0].successors != [loop.header]:
+        return None
+    return outside[0]
+
+
+def invariant_instructions(
+    loop: Loop, dominators: List[Set[int]], live_in: Dict[int, Set[str]]
+) -> List[Quad]:
+    """
+    The instructions of the loop which compute the same value on every iteration and can
+    run once before the loop instead, in an order respecting their dependencies.
+
+    An instruction qualifies when it can't fault or read input (see `is_pure`), all its
+    operands are literals, not assigned in the loop or assigned by a qualifying
+    instruction, and its destination is assigned only there and not read before that
+    in any iteration. If the loop may exit without running it, the destination must not
+    be read after the loop either, as the loop would have kept its old value.
+    """
+    definitions = Counter(
+        quad.dest for block in loop.blocks for quad in block if quad.dest is not None
+    )
+    exiting = [
+        block for block in loop.blocks if any(s not in loop for s in block.successors)
+    ]
+    live_after = set().union(*(live_in[exit.index] for exit in loop.exits()))
+
+    hoisted: List[Quad] = []
+    hoisted_ids: Set[int] = set()
+    hoisted_names: Set[str] = set()
+
+    def qualifies(quad: Quad, block: BasicBlock) -> bool:
+        dest = quad.dest
+        if dest is None or not is_pure(quad) or definitions[dest] != 1:
+            return False
+        if dest in live_in[loop.header.index]:
+            return False
+        if not all(
+            is_constant(s) or definitions[s] == 0 or s in hoisted_names for s in quad.sources
+        ):
+            return False
+        return dest not in live_after or all(
+            block.index in dominators[e.index] for e in exiting
+        )
+
+    changed = True
+    while changed:
+        changed = False
+        for block in loop.blocks:
+            for quad in block:
+                if id(quad) not in hoisted_ids and qualifies(quad, block):
+                    hoisted.append(quad)
+                    hoisted_ids.add(id(quad))
+                    hoisted_names.add(quad.dest)
+                    changed = True
+    return hoisted
+
+
+def hoist_loop(
+    loop: Loop, dominators: List[Set[int]], live_in: Dict[int, Set[str]]
+) -> bool:
+    """
+    Moves the loop's invariant instructions to the end of its preheader.
+    Returns whether anything was moved.
+    """
+    preheader = find_preheader(loop)
+    if preheader is None:
+        return False
+    hoisted = invariant_instructions(loop, dominators, live_in)
+    if not hoisted:
+        return False
+
+    hoisted_ids = {id(quad) for quad in hoisted}
+    for block in loop.blocks:
+        block.quads = [quad for quad in block.quads if id(quad) not in hoisted_ids]
+
+    at = len(preheader.quads) - (1 if preheader.terminator is not None else 0)
+    preheader.quads[at:at] = hoisted
+    return True
+
+
+def hoist_loop_invariants(
+    quads: List[Quad], symtab: Optional[Dict[str, str]] = None
+) -> List[Quad]:
+    """
+    Loop invariant code motion pass.
+
+    Finds the natural loops of the program and moves the instructions computing the same
+    value on every iteration in front of the loop, innermost loops first, so invariants
+    of nested loops move out as far as they can.
+
+    examples:
+    JUMP L2 / L1: / IMLT t1 c d / IADD a a t1 / L2: ...
+    -> IMLT t1 c d / JUMP L2 / L1: / IADD a a t1 / L2: ...
+
+    Args:
+        quads (List[Quad])
+        symtab (Optional[Dict[str, str]]): unused
+
+    Returns:
+        List[Quad]
+    """
+    while True:
+        cfg = ControlFlowGraph(quads)
+        before, _ = live_variables(quads)
+        live_in: Dict[int, Set[str]] = {}
+        position = 0
+        for block in cfg:
+            live_in[block.index] = before[position]
+            position += len(block)
+
+        # Moving instructions keeps the blocks and their edges, and doesn't change what is
+        # live at the headers and exits of the other loops: the moved definition still
+        # precedes every read of it, and its operands were already read inside the loop.
+        # So every loop is handled with the same analysis, and invariants hoisted out of
+        # an inner loop move on out of the enclosing loops in the same round.
+        dominators = cfg.dominators()
+        changed = False
+        for loop in cfg.natural_loops():
+            changed |= hoist_loop(loop, dominators, live_in)
+        if not changed:
+            return quads
+        quads = cfg.quads()
@@ -0,0 +1,19 @@
+from typing import Dict, List
+
+# The optimization passes and levels by name. The passes themselves live in PassManager,
+# so the command line can be parsed without importing them (see CompileClient)
+
+# Every pass by its command line name, in the order the pass manager runs them
+PASS_NAMES: List[str] = ["fold", "cfg", "alg", "cast", "cse", "copy", "licm", "alloc"]
+
+# The passes and code generation options of every optimization level.
+# -O0 is the unoptimized output the golden samples are compared against.
+OPTIMIZATION_LEVELS: Dict[int, dict] = {
+    0: {"passes": [], "short_circuit": False, "compact_conditions": False},
+    1: {
+        "passes": ["fold", "cfg", "copy"],
+        "short_circuit": False,
+        "compact_conditions": True,
+    },
+    2: {"passes": list(PASS_NAMES), "short_circuit": True, "compact_conditions": True},
+}
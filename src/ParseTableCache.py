@@ -0,0 +1,143 @@
+import marshal
+import os
+import sys
+import zlib
+from typing import Optional
+
+import sly
+from sly import yacc
+
+# Bump whenever the layout of the cached tables changes
+CACHE_FORMAT_VERSION = 2
+
+# The tables live next to the compiled bytecode of the parser module
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "__pycache__")
+
+# Set to a non-empty value to always rebuild the tables (used by benchmarks)
+DISABLE_ENV = "CPQ_NO_TABLE_CACHE"
+
+
+class CachedLRTable:
+    """
+    Stand-in for sly's LRTable, holding only the tables `Parser.parse` reads.
+    """
+
+    def __init__(self, grammar, lr_action, lr_goto, defaulted_states, conflicts):
+        self.grammar = grammar
+        self.lr_action = lr_action
+        self.lr_goto = lr_goto
+        self.defaulted_states = defaulted_states
+        # Only the amount of conflicts is used, for sly's warnings
+        self.sr_conflicts = [None] * conflicts[0]
+        self.rr_conflicts = [None] * conflicts[1]
+
+
+def grammar_fingerprint(grammar) -> str:
+    """
+    Describes everything the LALR construction depends on, so any change
+    to the grammar rules, tokens or precedence results in a new fingerprint.
+
+    The description itself is stored with the tables and compared on load, which
+    saves importing a cryptographic hash on every start.
+
+    Args:
+        grammar (sly.yacc.Grammar)
+
+    Returns:
+        str
+    """
+    parts = [
+        f"{CACHE_FORMAT_VERSION}|{sly.__version__}|{sys.version_info[:2]}",
+        f"{grammar.Start}|{sorted(grammar.Terminals)}",
+        f"{sorted(grammar.Precedence.items())}",
+    ]
+    parts.extend(f"{p} {p.prec}" for p in grammar.Productions)
+    return "\n".join(parts)
+
+
+def table_path(name: str, fingerprint: str) -> str:
+    return os.path.join(CACHE_DIR, f"{name}.{zlib.crc32(fingerprint.encode()):08x}.lrtab")
+
+
+def load_tables(name: str, grammar) -> Optional[CachedLRTable]:
+    """
+    Loads previously built tables for the grammar.
+    Returns None if there are no tables, they were built for a different grammar
+    or they can't be read, a broken cache is never an error.
+    """
+    fingerprint = grammar_fingerprint(grammar)
+    try:
+        with open(table_path(name, fingerprint), "rb") as f:
+            cached_fingerprint, tables = marshal.load(f)
+        if cached_fingerprint != fingerprint:
+            return None
+        return CachedLRTable(grammar, *tables)
+    except Exception:
+        return None
+
+
+def save_tables(name: str, grammar, lrtable) -> None:
+    """
+    Writes the tables atomically and removes tables of older grammars.
+    Failing to write the cache is not an error, the tables are simply rebuilt next time.
+    """
+    # Only needed when the tables are built, which most starts skip
+    import tempfile
+
+    fingerprint = grammar_fingerprint(grammar)
+    tables = (
+        lrtable.lr_action,
+        lrtable.lr_goto,
+        lrtable.defaulted_states,
+        (len(lrtable.sr_conflicts), len(lrtable.rr_conflicts)),
+    )
+    path = table_path(name, fingerprint)
+    tmp_path = None
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            marshal.dump((fingerprint, tables), f)
+        os.replace(tmp_path, path)
+        tmp_path = None
+
+        for stale in os.listdir(CACHE_DIR):
+            if stale.startswith(f"{name}.") and stale.endswith(".lrtab"):
+                if os.path.join(CACHE_DIR, stale) != path:
+                    os.remove(os.path.join(CACHE_DIR, stale))
+    except Exception:
+        pass
+    finally:
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+class CachedParserMeta(yacc.ParserMeta):
+    """
+    Parser metaclass which loads the LALR tables from disk instead of rebuilding them.
+
+    sly still builds (and validates) the grammar itself, which is cheap,
+    only the LALR automaton construction is replaced by the cached tables.
+    """
+
+    def __new__(meta, clsname, bases, attributes):
+        if os.environ.get(DISABLE_ENV):
+            return super().__new__(meta, clsname, bases, attributes)
+
+        build_lrtable = yacc.LRTable
+
+        def cached_lrtable(grammar):
+            lrtable = load_tables(clsname, grammar)
+            if lrtable is None:
+                lrtable = build_lrtable(grammar)
+                save_tables(clsname, grammar, lrtable)
+            return lrtable
+
+        yacc.LRTable = cached_lrtable
+        try:
+            return super().__new__(meta, clsname, bases, attributes)
+        finally:
+            yacc.LRTable = build_lrtable
@@ -0,0 +1,165 @@
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Sequence
+
+from AlgebraicSimplifier import simplify_algebra
+from CastMinimization import minimize_casts
+from CommonSubexpression import eliminate_common_subexpressions
+from ConstantFolding import fold_constants
+from ControlFlowSimplification import simplify_control_flow
+from CopyPropagation import propagate_copies
+from LoopInvariant import hoist_loop_invariants
+from OptimizationLevels import OPTIMIZATION_LEVELS
+from Quad import Quad, count_instructions
+from TempAllocator import allocate_temporaries
+
+# An optimization pass rewrites the program, given the symbol table of the parser
+Pass = Callable[[List[Quad], Dict[str, str]], List[Quad]]
+
+# Every pass by its name, in the order of OptimizationLevels.PASS_NAMES
+PIPELINE: Dict[str, Pass] = {
+    "fold": fold_constants,
+    "cfg": simplify_control_flow,
+    "alg": simplify_algebra,
+    "cast": minimize_casts,
+    "cse": eliminate_common_subexpressions,
+    "copy": propagate_copies,
+    "licm": hoist_loop_invariants,
+    "alloc": allocate_temporaries,
+}
+
+# Passes which run once after the others reached their fixpoint,
+# renaming temporaries on every round would keep the program from converging
+FINAL_PASSES = {"alloc"}
+
+
+@dataclass
+class PassStats:
+    name: str
+    runs: int = 0
+    seconds: float = 0.0
+    delta: int = 0  # Change of the instruction count, negative when instructions were removed
+
+
+def select_passes(
+    level: int, enable: Sequence[str] = (), disable: Sequence[str] = ()
+) -> List[str]:
+    """
+    The passes of an optimization level, with individual passes turned on or off.
+
+    examples:
+    select_passes(1, enable=["cse"]) -> ["fold", "cfg", "cse", "copy"]
+    select_passes(2, disable=["licm"]) -> every pass except "licm"
+
+    Args:
+        level (int): one of OPTIMIZATION_LEVELS
+        enable (Sequence[str]): pass names added to the level's passes
+        disable (Sequence[str]): pass names removed from them, wins over `enable`
+
+    Returns:
+        List[str]: pass names in pipeline order
+    """
+    unknown = [name for name in [*enable, *disable] if name not in PIPELINE]
+    if unknown:
+        raise ValueError(
+            f"Unknown optimization pass {unknown[0]!r}, expected one of {', '.join(PIPELINE)}."
+        )
+    selected = set(OPTIMIZATION_LEVELS[level]["passes"]) | set(enable)
+    return [name for name in PIPELINE if name in selected and name not in disable]
+
+
+class PassManager:
+    """
+    Runs optimization passes over a program in pipeline order, repeating them until
+    a whole round leaves the program unchanged (or `max_rounds` is reached), then runs
+    the final passes once. Every pass is timed and its effect on the instruction count
+    is recorded for the last program run, see `format_stats`.
+
+    examples:
+    manager = PassManager(select_passes(2))
+    quads = manager.run(quads, symtab)
+    sys.stderr.write(manager.format_stats())
+    """
+
+    def __init__(self, passes: Sequence[str] = (), max_rounds: int = 10):
+        self.passes: List[str] = [name for name in PIPELINE if name in passes]
+        self.max_rounds: int = max_rounds
+        self.rounds: int = 0
+        self.stats: Dict[str, PassStats] = {name: PassStats(name) for name in self.passes}
+
+    @classmethod
+    def for_level(
+        cls, level: int, enable: Sequence[str] = (), disable: Sequence[str] = ()
+    ) -> "PassManager":
+        return cls(select_passes(level, enable, disable))
+
+    def run_pass(self, name: str, quads: List[Quad], symtab: Dict[str, str]) -> List[Quad]:
+        stats = self.stats[name]
+        before = count_instructions(quads)
+        start = time.perf_counter()
+        quads = PIPELINE[name](quads, symtab)
+        stats.seconds += time.perf_counter() - start
+        stats.runs += 1
+        stats.delta += count_instructions(quads) - before
+        return quads
+
+    def run(self, quads: List[Quad], symtab: Dict[str, str]) -> List[Quad]:
+        """
+        Optimizes a program.
+
+        Args:
+            quads (List[Quad])
+            symtab (Dict[str, str]): the parser's symbol table
+
+        Returns:
+            List[Quad]
+        """
+        repeated = [name for name in self.passes if name not in FINAL_PASSES]
+        self.rounds = 0
+        self.stats = {name: PassStats(name) for name in self.passes}
+        while repeated and self.rounds < self.max_rounds:
+            self.rounds += 1
+            previous = quads
+            for name in repeated:
+                quads = self.run_pass(name, quads, symtab)
+            if quads == previous:
+                break
+
+        for name in self.passes:
+            if name in FINAL_PASSES:
+                quads = self.run_pass(name, quads, symtab)
+        return quads
+
+    def format_stats(self) -> str:
+        """
+        A table of the runs, wall time and instruction count change of every pass.
+        """
+        lines = [f"{'pass':<8}{'runs':>6}{'time (ms)':>12}{'delta':>8}"]
+        for stats in self.stats.values():
+            lines.append(
+                f"{stats.name:<8}{stats.runs:>6}{stats.seconds * 1000:>12.3f}{stats.delta:>+8}"
+            )
+        seconds = sum(stats.seconds for stats in self.stats.values())
+        delta = sum(stats.delta for stats in self.stats.values())
+        lines.append(f"{'total':<8}{'':>6}{seconds * 1000:>12.3f}{delta:>+8}")
+        lines.append(f"rounds until the fixpoint: {self.rounds}")
+        return "\n".join(lines) + "\n"
+
+
+def compiler_options(
+    level: int = 0, enable: Sequence[str] = (), disable: Sequence[str] = ()
+) -> dict:
+    """
+    The CPLCompiler arguments of an optimization level: its code generation options
+    and a pass manager, None when no pass is selected.
+
+    examples:
+    CPLCompiler(program, outfile, **compiler_options(2, disable=["licm"]))
+    """
+    settings = OPTIMIZATION_LEVELS[level]
+    passes = select_passes(level, enable, disable)
+    return {
+        "pass_manager": PassManager(passes) if passes else None,
+        "short_circuit": settings["short_circuit"],
+        "compact_conditions": settings["compact_conditions"],
+    }
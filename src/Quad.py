@@ -0,0 +1,143 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+LABEL = "LABEL"  # Pseudo opcode, rendered as "<name>:"
+
+# Instructions which assign their first operand
+DEFINING_OPS = {
+    f"{prefix}{op}"
+    for prefix in "IR"
+    for op in ("ASN", "ADD", "SUB", "MLT", "DIV", "EQL", "NQL", "LSS", "GRT", "INP")
+} | {"ITOR", "RTOI"}
+
+JUMP_OPS = {"JUMP", "JMPZ"}
+
+
+def is_constant(operand: str) -> bool:
+    return operand[:1].isdigit() or operand[:1] in ("-", ".")
+
+
+class Quad:
+    """
+    A single QUAD instruction.
+
+    Operands are kept as strings (variable names, temporaries, labels or literals)
+    exactly as they appear in the rendered `.qud` output.
+
+    examples:
+    Quad("IADD", "t1", "a", "1") -> IADD t1 a 1
+    Quad(LABEL, "L1") -> L1:
+    """
+
+    __slots__ = ("op", "args")
+
+    def __init__(self, op: str, *args: str):
+        self.op: str = op
+        self.args: tuple = args
+
+    @property
+    def dest(self) -> Optional[str]:
+        """
+        The variable this instruction assigns, if any.
+        """
+        return self.args[0] if self.op in DEFINING_OPS else None
+
+    @property
+    def sources(self) -> tuple:
+        """
+        The operands this instruction reads (variables and constants).
+        """
+        if self.op in DEFINING_OPS or self.op == "JMPZ":
+            return self.args[1:]
+        if self.op in ("IPRT", "RPRT"):
+            return self.args
+        return ()
+
+    def replace_sources(self, replacements: Dict[str, str]) -> "Quad":
+        """
+        The same instruction reading `replacements[x]` instead of every source `x` in it.
+        Returns the instruction itself if none of its sources is replaced.
+        """
+        sources = self.sources
+        if not any(source in replacements for source in sources):
+            return self
+        skip = len(self.args) - len(sources)
+        args = self.args[:skip] + tuple(replacements.get(s, s) for s in sources)
+        return Quad(self.op, *args)
+
+    def __str__(self) -> str:
+        if self.op == LABEL:
+            return f"{self.args[0]}:"
+        return " ".join((self.op, *self.args))
+
+    def __repr__(self) -> str:
+        return f"Quad({self})"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Quad):
+            return NotImplemented
+        return self.op == other.op and self.args == other.args
+
+    def __hash__(self) -> int:
+        return hash((self.op, self.args))
+
+
+class QuadCode:
+    """
+    Rope of QUAD instructions built by the parser's grammar actions.
+
+    Appending a Quad or another QuadCode is O(1), the instructions are
+    only materialized once the whole program was parsed (see `flatten`).
+    """
+
+    __slots__ = ("_parts",)
+
+    def __init__(self, *parts: Union[Quad, "QuadCode"]):
+        self._parts: List[Union[Quad, QuadCode]] = list(parts)
+
+    def append(self, part: Union[Quad, "QuadCode"]) -> "QuadCode":
+        self._parts.append(part)
+        return self
+
+    def __iter__(self) -> Iterator[Quad]:
+        # Iterative walk, nested blocks may be deeper than the recursion limit
+        stack = [iter(self._parts)]
+        while stack:
+            for part in stack[-1]:
+                if isinstance(part, QuadCode):
+                    stack.append(iter(part._parts))
+                    break
+                yield part
+            else:
+                stack.pop()
+
+    def flatten(self) -> List[Quad]:
+        return list(self)
+
+
+def render(quads: Iterable[Quad]) -> str:
+    """
+    Renders instructions to the textual `.qud` format, one instruction per line.
+    """
+    return "".join([f"{quad}\n" for quad in quads])
+
+
+def render_chunks(quads: Iterable[Quad], size: int = 4096) -> Iterator[str]:
+    """
+    Renders instructions like `render`, `size` instructions per chunk, so a large program
+    can be written out without holding all of its text in memory.
+    """
+    chunk: List[str] = []
+    for quad in quads:
+        chunk.append(f"{quad}\n")
+        if len(chunk) == size:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def count_instructions(quads: Iterable[Quad]) -> int:
+    """
+    Number of executable instructions, labels are not counted.
+    """
+    return sum(1 for quad in quads if quad.op != LABEL)
@@ -0,0 +1,381 @@
+"""
+Binary QUAD bytecode (`.qbc`), an alternative to the textual `.qud` format which loads
+without any parsing.
+
+Layout, all integers little-endian:
+
+    header    magic, version, the word size of every operand column, and the number of
+              instructions, operands and labels and the size of the string table (HEADER)
+    operands  three columns, the first, second and third operand of every instruction.
+              A column's words are as wide as its largest value needs, up to 4 bytes,
+              and a column of zeros takes no space.
+              Jump targets are instruction indices, other operands index the operand table,
+              unused operands are 0. Jumps keep the number of their label in the third
+              operand, since several labels may precede the same instruction
+    opcodes   one byte per instruction (OPS)
+    labels    index of the instruction every label precedes (LABEL_INDEX)
+    kinds     one byte per operand: whether it holds a real, whether it is a constant, and
+              the variable's declared type from CPLParser.symtab (see KINDS, DECLARED).
+              An operand's index is also its memory slot
+    strings   names of the operands, then of the labels, UTF-8 and separated by newlines.
+              Constants are named by their literal, which gives their value
+
+Every section starts at a multiple of 4 bytes.
+"""
+import array
+import mmap
+import os
+import struct
+import sys
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from Quad import LABEL, Quad, render_chunks
+from QuadInterpreter import (
+    HALT,
+    OPCODES,
+    REAL_OPERANDS,
+    QuadError,
+    QuadInterpreter,
+    parse_constant,
+    parse_program,
+)
+
+MAGIC = b"QBC\0"
+VERSION = 2
+
+HEADER = struct.Struct("<4sH3B3xIIII")
+# `array` and `memoryview.cast` formats by word size, 3 byte words are widened to 4 on load
+WORD_FORMATS = {1: "B", 2: "H", 4: "I"}
+LABEL_INDEX = struct.Struct("<I")
+
+# Opcode numbers of the format, new instructions must be appended
+OPS = (
+    "IASN", "RASN", "IADD", "RADD", "ISUB", "RSUB", "IMLT", "RMLT", "IDIV", "RDIV",
+    "IEQL", "REQL", "INQL", "RNQL", "ILSS", "RLSS", "IGRT", "RGRT", "ITOR", "RTOI",
+    "JUMP", "JMPZ", "IPRT", "RPRT", "IINP", "RINP", "HALT",
+)  # fmt: skip
+OP_NUMBERS = {op: number for number, op in enumerate(OPS)}
+
+# Number of operands of every instruction
+ARITY = {op: 3 for op in OPS}
+ARITY.update({"IASN": 2, "RASN": 2, "ITOR": 2, "RTOI": 2, "JUMP": 1, "JMPZ": 2, "HALT": 0})
+ARITY.update({op: 1 for op in ("IPRT", "RPRT", "IINP", "RINP")})
+
+# Operand kinds: bit 0 is set for real values, bit 1 for constants
+INT_VARIABLE, REAL_VARIABLE, INT_CONSTANT, REAL_CONSTANT = range(4)
+KINDS = (INT_VARIABLE, REAL_VARIABLE, INT_CONSTANT, REAL_CONSTANT)
+# Bits 2 and 3 of a variable's kind hold its declared type, 0 if it has none
+DECLARED = {"I": 1 << 2, "R": 2 << 2}
+DECLARED_MASK = 3 << 2
+
+
+def word_size(values: Sequence[int]) -> int:
+    largest = max(values, default=0)
+    return next(size for size in (0, 1, 2, 3, 4) if largest < 1 << 8 * size)
+
+
+def pack_column(values: Sequence[int], size: int) -> bytes:
+    """
+    Little-endian words of `size` bytes, padded to a multiple of 4 bytes.
+    """
+    if size == 0:
+        return b""
+    words = array.array(WORD_FORMATS[4 if size == 3 else size], values)
+    if sys.byteorder == "big":
+        words.byteswap()
+    data = words.tobytes()
+    if size == 3:
+        wide, data = data, bytearray(len(values) * 3)
+        for i in range(3):
+            data[i::3] = wide[i::4]
+    return bytes(data) + bytes(-len(data) % 4)
+
+
+def read_column(data: memoryview, size: int) -> Sequence[int]:
+    """
+    The words of a column, read in place if the machine's words are the same.
+    """
+    if size == 3:
+        narrow, wide = bytes(data), bytearray(len(data) // 3 * 4)
+        for i in range(3):
+            wide[i::4] = narrow[i::3]
+        data, size = memoryview(wide), 4
+    if size == 1 or sys.byteorder == "little":
+        return data.cast(WORD_FORMATS[size])
+    words = array.array(WORD_FORMATS[size], data)
+    words.byteswap()
+    return words
+
+
+def padded(size: int) -> int:
+    return size + -size % 4
+
+
+class Operand(NamedTuple):
+    name: str
+    kind: int
+    value: Union[int, float]
+
+
+def encode(quads: Iterable[Quad], symtab: Optional[Dict[str, str]] = None) -> bytes:
+    """
+    Encodes instructions, as generated by CPLCompiler or parsed from a `.qud` file.
+
+    Args:
+        quads (Iterable[Quad])
+        symtab (Optional[Dict[str, str]]): declared types ("I" or "R") of the variables
+
+    Returns:
+        bytes
+    """
+    quads = list(quads)
+    labels: List[Tuple[int, str]] = []
+    label_numbers: Dict[str, int] = {}
+    index = 0
+    for quad in quads:
+        if quad.op == LABEL:
+            label_numbers[quad.args[0]] = len(labels)
+            labels.append((index, quad.args[0]))
+        else:
+            index += 1
+
+    # Operands are numbered in order of appearance, like the interpreter's memory slots
+    slots: Dict[str, int] = {}
+    kinds: List[int] = []
+
+    def slot(operand: str, real: bool) -> int:
+        number = slots.get(operand)
+        if number is None:
+            value = parse_constant(operand)
+            number = slots[operand] = len(kinds)
+            if value is None:
+                kinds.append(INT_VARIABLE)
+            else:
+                kinds.append(REAL_CONSTANT if isinstance(value, float) else INT_CONSTANT)
+        if real and kinds[number] == INT_VARIABLE:
+            kinds[number] = REAL_VARIABLE
+        return number
+
+    instructions = []
+    for quad in quads:
+        if quad.op == LABEL:
+            continue
+        if quad.op not in OP_NUMBERS:
+            raise QuadError(f"Unknown instruction {quad.op}")
+        if len(quad.args) != ARITY[quad.op]:
+            raise QuadError(f"{quad.op} takes {ARITY[quad.op]} operands: {quad}")
+
+        args = quad.args
+        if quad.op in ("JUMP", "JMPZ"):
+            if args[0] not in label_numbers:
+                raise QuadError(f"Undefined label {args[0]}")
+            label = label_numbers[args[0]]
+            operands = [labels[label][0]] + [slot(arg, False) for arg in args[1:]]
+            operands += [0] * (2 - len(operands)) + [label]
+        else:
+            real = REAL_OPERANDS.get(quad.op, ())
+            operands = [slot(arg, i in real) for i, arg in enumerate(args)]
+            operands += [0] * (3 - len(operands))
+        instructions.append((OP_NUMBERS[quad.op], *operands))
+
+    for name, number in slots.items():
+        declared = (symtab or {}).get(name)
+        if declared in DECLARED and not kinds[number] & 2:
+            kinds[number] |= DECLARED[declared]
+
+    opcodes, *columns = zip(*instructions) if instructions else [()] * 4
+    sizes = [word_size(column) for column in columns]
+    label_table = b"".join(LABEL_INDEX.pack(index) for index, _ in labels)
+    strings = "\n".join([*slots, *(name for _, name in labels)]).encode()
+
+    header = HEADER.pack(
+        MAGIC, VERSION, *sizes, len(instructions), len(slots), len(labels), len(strings)
+    )
+    return b"".join(
+        [
+            header,
+            *(pack_column(column, size) for column, size in zip(columns, sizes)),
+            pack_column(opcodes, 1),
+            label_table,
+            pack_column(kinds, 1),
+            strings,
+        ]
+    )
+
+
+class Bytecode:
+    """
+    A loaded `.qbc` program, read in place from a buffer such as a memory-mapped file.
+
+    The instructions are used as they are: `opcodes` and the three `columns` of operands
+    are views of the buffer, and only the operand and label tables are decoded.
+
+    examples:
+    Bytecode.from_file("samples/sample.qbc").interpreter().run(sys.stdin, sys.stdout)
+    """
+
+    def __init__(self, data: Union[bytes, mmap.mmap]):
+        if len(data) < HEADER.size:
+            raise QuadError("Truncated bytecode header")
+        magic, version, *sizes, n_code, n_operands, n_labels, n_strings = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise QuadError("Not a QUAD bytecode file")
+        if version != VERSION or not all(size <= 4 for size in sizes):
+            raise QuadError(f"Unsupported bytecode version {version}")
+
+        column_starts = []
+        offset = HEADER.size
+        for size in sizes:
+            column_starts.append(offset)
+            offset += padded(n_code * size)
+        opcodes_start = offset
+        labels_start = opcodes_start + padded(n_code)
+        kinds_start = labels_start + n_labels * LABEL_INDEX.size
+        strings_start = kinds_start + padded(n_operands)
+        if len(data) < strings_start + n_strings:
+            raise QuadError("Truncated bytecode")
+
+        self.data = data
+        view = memoryview(data)
+        self.columns: List[Sequence[int]] = [
+            read_column(view[start : start + n_code * size], size)
+            if size
+            else array.array("B", bytes(n_code))
+            for start, size in zip(column_starts, sizes)
+        ]
+        self.opcodes: Sequence[int] = view[opcodes_start : opcodes_start + n_code]
+
+        names = bytes(view[strings_start : strings_start + n_strings]).decode().split("\n")
+        if len(names) != max(1, n_operands + n_labels):
+            raise QuadError("Corrupt bytecode string table")
+
+        self.operands: List[Operand] = []
+        self.types: Dict[str, str] = {}
+        for name, kind in zip(names, view[kinds_start : kinds_start + n_operands]):
+            if kind & 2:
+                value = parse_constant(name)
+            else:
+                value = 0.0 if kind & 1 else 0
+                declared = (kind & DECLARED_MASK) >> 2
+                if declared:
+                    self.types[name] = "IR"[declared - 1]
+            self.operands.append(Operand(name, kind & 3, value))
+
+        self.labels: List[Tuple[int, str]] = [
+            (index, name)
+            for (index,), name in zip(
+                LABEL_INDEX.iter_unpack(view[labels_start:kinds_start]),
+                names[n_operands:],
+            )
+        ]
+
+    @classmethod
+    def from_file(cls, filename: str) -> "Bytecode":
+        """
+        Memory-maps a `.qbc` file, its pages are read as the program uses them.
+        """
+        with open(filename, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise QuadError("Truncated bytecode header")
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self) -> int:
+        return len(self.opcodes)
+
+    def instruction(self, index: int) -> Tuple[str, int, int, int]:
+        a, b, c = (column[index] for column in self.columns)
+        return OPS[self.opcodes[index]], a, b, c
+
+    def interpreter(self) -> QuadInterpreter:
+        """
+        An interpreter for the program, built without parsing or resolving labels.
+        """
+        decoded = tuple(OPCODES[op] for op in OPS)
+        try:
+            code = list(
+                zip(
+                    map(decoded.__getitem__, self.opcodes.tolist()),
+                    *(column.tolist() for column in self.columns),
+                )
+            )
+        except IndexError:
+            raise QuadError("Unknown instruction in bytecode")
+        code.append((HALT, 0, 0, 0))
+        slots = {operand.name: number for number, operand in enumerate(self.operands)}
+        memory = [operand.value for operand in self.operands]
+        constants = {number for number, operand in enumerate(self.operands) if operand.kind & 2}
+        return QuadInterpreter.from_decoded(code, slots, memory, constants)
+
+    def to_quads(self) -> List[Quad]:
+        """
+        The instructions and labels, as they were encoded.
+        """
+        labels = self.labels  # In order of the instructions they precede
+        next_label = 0
+        quads = []
+        for index in range(len(self) + 1):
+            while next_label < len(labels) and labels[next_label][0] == index:
+                quads.append(Quad(LABEL, labels[next_label][1]))
+                next_label += 1
+            if index == len(self):
+                break
+
+            op, a, b, c = self.instruction(index)
+            if op in ("JUMP", "JMPZ"):
+                args = [labels[c][1]] + [self.operands[b].name] * (op == "JMPZ")
+            else:
+                args = [self.operands[n].name for n in (a, b, c)[: ARITY[op]]]
+            quads.append(Quad(op, *args))
+        return quads
+
+
+USAGE = "Usage: {} <in.qud> <out.qbc> [types.qbc] | <in.qbc> <out.qud>"
+
+
+def main(source: str, target: str, types_from: Optional[str] = None) -> int:
+    """
+    Converts between the text and binary forms, in the direction the extensions give.
+
+    Text has no declared types, so converting it back to bytecode restores the bytecode
+    exactly only with the types of another bytecode file, e.g. the one it came from.
+
+    Args:
+        source (str)
+        target (str)
+        types_from (Optional[str]): `.qbc` file whose declared types the bytecode gets
+
+    Returns:
+        int: exit code
+    """
+    # CPLCompiler imports this module to emit bytecode
+    from CPLCompiler import write_output
+
+    try:
+        if source.endswith(".qud") and target.endswith(".qbc"):
+            types = Bytecode.from_file(types_from).types if types_from else None
+            with open(source, "r") as f:
+                write_output(target, [encode(parse_program(f.read()), types)], binary=True)
+        elif source.endswith(".qbc") and target.endswith(".qud") and not types_from:
+            write_output(
+                target,
+                render_chunks(Bytecode.from_file(source).to_quads()),
+                trailer="Signature Line - Liam Aslan, 215191347",
+            )
+        else:
+            sys.stderr.write(USAGE.format(sys.argv[0]))
+            return 0
+    except IOError as e:
+        sys.stderr.write(
+            f"ERROR (Input File Does Not Exist): {e.filename or source} is not a valid path."
+        )
+    except QuadError as e:
+        sys.stderr.write(f"ERROR: {e}\n")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4):
+        sys.stderr.write(USAGE.format(sys.argv[0]))
+        sys.exit(0)
+    sys.exit(main(*sys.argv[1:]))
@@ -0,0 +1,342 @@
+import sys
+from typing import Dict, Iterable, List, Optional, Set, TextIO, Tuple, Union
+
+from Quad import LABEL, Quad
+
+SIGNATURE_PREFIX = "Signature Line"
+
+# Decoded opcodes, integer and real variants share an opcode where Python's semantics agree
+(
+    ASN,
+    ADD,
+    SUB,
+    MLT,
+    IDIV,
+    RDIV,
+    EQL,
+    NQL,
+    LSS,
+    GRT,
+    ITOR,
+    RTOI,
+    JUMP,
+    JMPZ,
+    IPRT,
+    RPRT,
+    IINP,
+    RINP,
+    HALT,
+) = range(19)
+
+OPCODES = {
+    "IASN": ASN,
+    "RASN": ASN,
+    "IADD": ADD,
+    "RADD": ADD,
+    "ISUB": SUB,
+    "RSUB": SUB,
+    "IMLT": MLT,
+    "RMLT": MLT,
+    "IDIV": IDIV,
+    "RDIV": RDIV,
+    "IEQL": EQL,
+    "REQL": EQL,
+    "INQL": NQL,
+    "RNQL": NQL,
+    "ILSS": LSS,
+    "RLSS": LSS,
+    "IGRT": GRT,
+    "RGRT": GRT,
+    "ITOR": ITOR,
+    "RTOI": RTOI,
+    "JUMP": JUMP,
+    "JMPZ": JMPZ,
+    "IPRT": IPRT,
+    "RPRT": RPRT,
+    "IINP": IINP,
+    "RINP": RINP,
+    "HALT": HALT,
+}
+
+
+# Operand positions holding real values, for instructions with real operands
+REAL_OPERANDS = {
+    "RASN": (0, 1),
+    "RADD": (0, 1, 2),
+    "RSUB": (0, 1, 2),
+    "RMLT": (0, 1, 2),
+    "RDIV": (0, 1, 2),
+    "REQL": (1, 2),
+    "RNQL": (1, 2),
+    "RLSS": (1, 2),
+    "RGRT": (1, 2),
+    "ITOR": (0,),
+    "RTOI": (1,),
+    "RPRT": (0,),
+    "RINP": (0,),
+}
+
+
+class QuadError(Exception):
+    """
+    Raised for malformed QUAD programs and for runtime errors (division by zero, bad input).
+    """
+
+
+def parse_constant(operand: str) -> Optional[Union[int, float]]:
+    """
+    Returns the value of a literal operand, or None if the operand is a variable.
+    """
+    if not operand or not (operand[0].isdigit() or operand[0] in "-."):
+        return None
+    try:
+        return int(operand)
+    except ValueError:
+        pass
+    try:
+        return float(operand)
+    except ValueError:
+        raise QuadError(f"Invalid constant {operand}")
+
+
+def parse_program(text: str) -> List[Quad]:
+    """
+    Parses textual QUAD code, as written by CPLCompiler, including its signature trailer.
+    """
+    quads = []
+    for lineno, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line or line.startswith(SIGNATURE_PREFIX):
+            continue
+        if line.endswith(":"):
+            quads.append(Quad(LABEL, line[:-1]))
+            continue
+
+        op, *args = line.split()
+        if op not in OPCODES:
+            raise QuadError(f"Line {lineno}: Unknown instruction {op}")
+        quads.append(Quad(op, *args))
+    return quads
+
+
+def int_div(a: int, b: int) -> int:
+    """
+    Integer division truncating toward zero, like RTOI.
+    """
+    q = abs(a) // abs(b)
+    return q if (a < 0) == (b < 0) else -q
+
+
+class QuadInterpreter:
+    """
+    Executes QUAD programs.
+
+    The program is decoded once: labels are resolved to instruction indices and every
+    operand becomes an index into a single memory list, where constants are preloaded
+    into their own slots. Executing an instruction is then a tuple unpack and a few
+    list accesses, without any string handling.
+
+    examples:
+    QuadInterpreter.from_file("samples/sample.qud").run(sys.stdin, sys.stdout)
+    """
+
+    def __init__(self, quads: Iterable[Quad]):
+        self._slots: Dict[str, int] = {}
+        self._initial_memory: List[Union[int, float]] = []
+        self._constants: Set[int] = set()
+        self.code: List[Tuple[int, int, int, int]] = []
+        self.steps: int = 0
+        self.memory: List[Union[int, float]] = []
+        self._decode(list(quads))
+
+    @classmethod
+    def from_decoded(
+        cls,
+        code: List[Tuple[int, int, int, int]],
+        slots: Dict[str, int],
+        memory: List[Union[int, float]],
+        constants: Set[int],
+    ) -> "QuadInterpreter":
+        """
+        An interpreter for a program decoded elsewhere, see QuadBytecode.
+
+        Args:
+            code (List[Tuple[int, int, int, int]]): ending with HALT, jumps hold indices into it
+            slots (Dict[str, int]): memory slot of every operand
+            memory (List[Union[int, float]]): initial values, real variables are 0.0
+            constants (Set[int]): slots of the constants
+        """
+        interpreter = cls([])
+        interpreter.code = code
+        interpreter._slots = slots
+        interpreter._initial_memory = memory
+        interpreter._constants = constants
+        return interpreter
+
+    @classmethod
+    def from_text(cls, text: str) -> "QuadInterpreter":
+        return cls(parse_program(text))
+
+    @classmethod
+    def from_file(cls, filename: str) -> "QuadInterpreter":
+        with open(filename, "r") as f:
+            return cls.from_text(f.read())
+
+    def _slot(self, operand: str, real: bool = False) -> int:
+        slot = self._slots.get(operand)
+        if slot is None:
+            value = parse_constant(operand)
+            slot = self._slots[operand] = len(self._initial_memory)
+            self._initial_memory.append(0 if value is None else value)
+            if value is not None:
+                self._constants.add(slot)
+        if real and slot not in self._constants:
+            # Variables are zero initialized, with their declared type
+            self._initial_memory[slot] = 0.0
+        return slot
+
+    def _decode(self, quads: List[Quad]) -> None:
+        labels = {}
+        index = 0
+        for quad in quads:
+            if quad.op == LABEL:
+                labels[quad.args[0]] = index
+            else:
+                index += 1
+
+        for quad in quads:
+            if quad.op == LABEL:
+                continue
+            op = OPCODES.get(quad.op)
+            if op is None:
+                raise QuadError(f"Unknown instruction {quad.op}")
+
+            args = quad.args
+            if op in (JUMP, JMPZ):
+                if args[0] not in labels:
+                    raise QuadError(f"Undefined label {args[0]}")
+                operands = [labels[args[0]]] + [self._slot(arg) for arg in args[1:]]
+            else:
+                real = REAL_OPERANDS.get(quad.op, ())
+                operands = [self._slot(arg, i in real) for i, arg in enumerate(args)]
+            operands += [0] * (3 - len(operands))
+            self.code.append((op, *operands))
+
+        # Falling off the end of the program (or jumping to a trailing label) stops it
+        self.code.append((HALT, 0, 0, 0))
+
+    def variables(self) -> Dict[str, Union[int, float]]:
+        """
+        The values of all variables (and temporaries) after the last run.
+        """
+        return {
+            name: self.memory[slot]
+            for name, slot in self._slots.items()
+            if slot not in self._constants
+        }
+
+    def run(
+        self,
+        input_stream: TextIO = sys.stdin,
+        output_stream: TextIO = sys.stdout,
+        max_steps: Optional[int] = None,
+    ) -> int:
+        """
+        Runs the program from the start with fresh memory.
+
+        Args:
+            input_stream (TextIO): whitespace separated values for IINP/RINP
+            output_stream (TextIO): IPRT/RPRT write one value per line
+            max_steps (Optional[int]): stops runaway programs with a QuadError
+
+        Returns:
+            int: number of executed instructions
+        """
+        code = self.code
+        m = self.memory = list(self._initial_memory)
+        write = output_stream.write
+        inputs = (value for line in input_stream for value in line.split())
+        limit = max_steps if max_steps is not None else -1
+        pc = 0
+        steps = 0
+
+        try:
+            while steps != limit:
+                op, a, b, c = code[pc]
+                pc += 1
+                steps += 1
+                if op == ASN:
+                    m[a] = m[b]
+                elif op == ADD:
+                    m[a] = m[b] + m[c]
+                elif op == SUB:
+                    m[a] = m[b] - m[c]
+                elif op == MLT:
+                    m[a] = m[b] * m[c]
+                elif op == JMPZ:
+                    if m[b] == 0:
+                        pc = a
+                elif op == JUMP:
+                    pc = a
+                elif op == GRT:
+                    m[a] = 1 if m[b] > m[c] else 0
+                elif op == LSS:
+                    m[a] = 1 if m[b] < m[c] else 0
+                elif op == EQL:
+                    m[a] = 1 if m[b] == m[c] else 0
+                elif op == NQL:
+                    m[a] = 1 if m[b] != m[c] else 0
+                elif op == IDIV:
+                    m[a] = int_div(m[b], m[c])
+                elif op == RDIV:
+                    m[a] = m[b] / m[c]
+                elif op == ITOR:
+                    m[a] = float(m[b])
+                elif op == RTOI:
+                    m[a] = int(m[b])
+                elif op == IPRT:
+                    write(f"{m[a]}\n")
+                elif op == RPRT:
+                    write(f"{float(m[a])}\n")
+                elif op == IINP:
+                    m[a] = int(next(inputs))
+                elif op == RINP:
+                    m[a] = float(next(inputs))
+                elif op == HALT:
+                    self.steps = steps
+                    return steps
+            raise QuadError(f"Exceeded {max_steps} executed instructions")
+        except ZeroDivisionError:
+            raise QuadError(f"Division by zero in instruction {pc - 1}")
+        except StopIteration:
+            raise QuadError("Not enough input values")
+        except (ValueError, OverflowError) as e:
+            raise QuadError(f"Invalid value in instruction {pc - 1}: {e}")
+        finally:
+            self.steps = steps
+
+
+def main(filename: str):
+    try:
+        if filename.endswith(".qbc"):
+            # QuadBytecode builds on this module
+            from QuadBytecode import Bytecode
+
+            interpreter = Bytecode.from_file(filename).interpreter()
+        else:
+            interpreter = QuadInterpreter.from_file(filename)
+        interpreter.run(sys.stdin, sys.stdout)
+    except IOError:
+        sys.stderr.write(f"ERROR (Input File Does Not Exist): {filename} is not a valid path.")
+    except QuadError as e:
+        sys.stderr.write(f"ERROR: {e}\n")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or not sys.argv[1].endswith((".qud", ".qbc")):
+        sys.stderr.write(f"Usage: {sys.argv[0]} <filename.qud|filename.qbc>")
+        sys.exit(0)
+    # Run as the imported module, whose QuadError is the one QuadBytecode raises
+    import QuadInterpreter
+
+    QuadInterpreter.main(sys.argv[1])
@@ -0,0 +1,116 @@
+import heapq
+import re
+from typing import Dict, List, Optional, Tuple
+
+from CopyPropagation import result_type
+from Liveness import live_variables
+from Quad import Quad
+
+# Names handed out by CPLParser.generate_tmp_id
+TEMPORARY = re.compile(r"t\d+")
+
+
+def is_temporary(name: str) -> bool:
+    return TEMPORARY.fullmatch(name) is not None
+
+
+def count_temporaries(quads: List[Quad]) -> int:
+    """
+    Number of distinct temporaries the program uses.
+    """
+    return len({name for quad in quads for name in quad.args if is_temporary(name)})
+
+
+def peak_temporaries(quads: List[Quad]) -> int:
+    """
+    Largest number of temporaries live at the same time, counting the result of every
+    instruction even if it is never read. This is how many temporaries the program needs
+    at least, however they are allocated.
+    """
+    before, after = live_variables(quads)
+    peak = 0
+    for quad, live_before, live_after in zip(quads, before, after):
+        if quad.dest is not None:
+            live_after = live_after | {quad.dest}
+        for live in (live_before, live_after):
+            peak = max(peak, sum(map(is_temporary, live)))
+    return peak
+
+
+def live_intervals(quads: List[Quad]) -> Dict[str, Tuple[int, int]]:
+    """
+    The live range of every temporary as an interval over instruction positions.
+
+    Instruction i reads its operands at 2i and writes its result at 2i + 1, so a temporary
+    read for the last time by an instruction can hold that same instruction's result.
+    Temporaries which are live at the start of the program are left out, their (zero)
+    initial value is read and they can't share storage.
+    """
+    before, after = live_variables(quads)
+    entry = before[0] if before else set()
+    intervals: Dict[str, Tuple[int, int]] = {}
+
+    def extend(name, position):
+        if is_temporary(name) and name not in entry:
+            start, end = intervals.get(name, (position, position))
+            intervals[name] = (min(start, position), max(end, position))
+
+    for i, quad in enumerate(quads):
+        for name in before[i]:
+            extend(name, 2 * i)
+        for name in after[i]:
+            extend(name, 2 * i + 1)
+        if quad.dest is not None:
+            extend(quad.dest, 2 * i + 1)
+    return intervals
+
+
+def allocate_temporaries(
+    quads: List[Quad], symtab: Optional[Dict[str, str]] = None
+) -> List[Quad]:
+    """
+    Temporary reuse pass.
+
+    Every subexpression is generated into a fresh temporary, this pass renames temporaries
+    with linear scan allocation over their live intervals, so temporaries of the same type
+    (I/R) share a name once the earlier one's live range ended.
+
+    examples:
+    IADD t1 a b / IMLT t2 t1 c / IPRT t2 -> IADD t1 a b / IMLT t1 t1 c / IPRT t1
+
+    Args:
+        quads (List[Quad])
+        symtab (Optional[Dict[str, str]]): unused, types are known from the instructions
+
+    Returns:
+        List[Quad]
+    """
+    types = {}
+    for quad in quads:
+        if quad.dest is not None:
+            types.setdefault(quad.dest, result_type(quad))
+
+    # Temporaries only read on unreachable paths are never assigned, they keep their names
+    intervals = {
+        name: interval for name, interval in live_intervals(quads).items() if name in types
+    }
+    order = {name: i for i, name in enumerate(sorted(intervals, key=intervals.get))}
+
+    renamed: Dict[str, str] = {}
+    active: List[Tuple[int, str]] = []  # (end, name) heap
+    free: Dict[str, List[Tuple[int, str]]] = {"I": [], "R": []}  # (order, name) heaps
+    for name in sorted(intervals, key=order.get):
+        start, end = intervals[name]
+        while active and active[0][0] < start:
+            _, expired = heapq.heappop(active)
+            heapq.heappush(free[types[expired]], (order[expired], renamed[expired]))
+
+        pool = free[types[name]]
+        renamed[name] = heapq.heappop(pool)[1] if pool else name
+        heapq.heappush(active, (end, name))
+
+    result = []
+    for quad in quads:
+        args = tuple(renamed.get(arg, arg) for arg in quad.args)
+        result.append(Quad(quad.op, *args) if args != quad.args else quad)
+    return result
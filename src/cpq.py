@@ -1,19 +1,187 @@
+import os
 import sys
+from typing import TYPE_CHECKING, Optional
 
+import CompileClient
 import FileHelper
-from CPLCompiler import CPLCompiler
+from CompileCache import CompileCache
 
+# The compiler is imported where it's used, so compiling through a server skips importing it
+if TYPE_CHECKING:
+    from CPLLexer import CPLLexer
+    from CPLParser import CPLParser
+
+
+def main(
+    data: str,
+    outfile: str,
+    cache: Optional[CompileCache] = None,
+    cache_stats=False,
+    optimization: Optional[dict] = None,
+    stats: Optional[str] = None,
+    lexer: Optional["CPLLexer"] = None,
+    parser: Optional["CPLParser"] = None,
+    quiet: bool = False,
+    lexer_backend: str = "sly",
+    bytecode: bool = False,
+):
+    from CompileStats import write_stats
+    from CPLCompiler import CPLCompiler
+    from PassManager import compiler_options
 
-def main(data: str, outfile: str):
     sys.stderr.write("Signature Line - Liam Aslan, 215191347\n")
 
-    with CPLCompiler(data, outfile) as compiler:
-        print(compiler.program or "", end="")
+    optimization = dict(optimization or {})
+    time_passes = optimization.pop("time_passes", False)
+    with CPLCompiler(
+        data,
+        outfile,
+        lexer_backend=lexer_backend,
+        lexer=lexer,
+        parser=parser,
+        cache=cache,
+        collect_stats=stats is not None,
+        stream=True,
+        echo=None if quiet else sys.stdout,
+        bytecode_filename=FileHelper.bytecode_filename(outfile) if bytecode else None,
+        **compiler_options(**optimization),
+    ) as compiler:
+        pass
+
+    if stats is not None:
+        write_stats([{"output": outfile, **compiler.stats.to_dict()}], stats)
+
+    if time_passes and compiler.pass_manager and not compiler.cache_hit:
+        sys.stderr.write(f"\n{compiler.pass_manager.format_stats()}")
+    if cache and cache_stats:
+        sys.stderr.write(f"\n{cache.format_stats()}\n")
+
+
+def main_remote(
+    socket_path: str,
+    data: str,
+    outfile: str,
+    cache: Optional[CompileCache] = None,
+    cache_stats=False,
+    optimization: Optional[dict] = None,
+    stats: Optional[str] = None,
+    quiet: bool = False,
+    bytecode: bool = False,
+) -> bool:
+    """
+    Compiles through the compile server listening on `socket_path`, printing what `main`
+    would print. The paths are sent absolute, since the server has its own working directory.
+
+    Returns:
+        bool: False if no server is listening, nothing was compiled then
+    """
+    payload = {
+        "source": data,
+        "output": os.path.abspath(outfile),
+        "optimization": optimization,
+        "cache": cache and {"directory": cache.directory, "max_bytes": cache.max_bytes},
+        "cache_stats": cache_stats,
+        "stats": stats if stats in (None, "-") else os.path.abspath(stats),
+        "quiet": quiet,
+        "bytecode": bytecode,
+    }
+    try:
+        response = CompileClient.request(socket_path, payload)
+    except OSError:
+        return False
+
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    if response["exit_code"]:
+        sys.exit(response["exit_code"])
+    return True
+
+
+def main_batch(
+    inputs,
+    jobs,
+    cache: Optional[CompileCache] = None,
+    cache_stats=False,
+    optimization: Optional[dict] = None,
+    stats: Optional[str] = None,
+    bytecode: bool = False,
+    memory_map: bool = False,
+) -> int:
+    import BatchCompiler
+
+    sys.stderr.write("Signature Line - Liam Aslan, 215191347\n")
+
+    return BatchCompiler.run(
+        inputs, jobs, cache, cache_stats, optimization, stats, bytecode, memory_map
+    )
+
+
+def get_cache(args) -> Optional[CompileCache]:
+    if not (args.cache or args.cache_dir):
+        return None
+    return CompileCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+
+
+def get_optimization(args) -> dict:
+    """
+    The optimization options of the command line, see `PassManager.compiler_options`.
+    """
+    return {
+        "level": args.level,
+        "enable": args.enable,
+        "disable": args.disable,
+        "time_passes": args.time_passes,
+    }
 
 
 if __name__ == "__main__":
     try:
-        main(*FileHelper.get_args())
+        args = FileHelper.get_args()
+        if args.serve:
+            import CompileServer
+
+            sys.exit(CompileServer.serve(args.serve, args.jobs))
+        cache = get_cache(args)
+        optimization = get_optimization(args)
+        if FileHelper.is_batch(args.inputs):
+            sys.exit(
+                main_batch(
+                    args.inputs,
+                    args.jobs,
+                    cache,
+                    args.cache_stats,
+                    optimization,
+                    args.stats,
+                    args.bytecode,
+                    args.mmap,
+                )
+            )
+        data, outfile = FileHelper.read_input(args.inputs[0], args.prog, args.mmap)
+        # A memory-mapped program is compiled right here, rather than sent in a request
+        server = not args.mmap and (args.server or os.environ.get("CPQ_SERVER"))
+        compiled = server and main_remote(
+            server,
+            data,
+            outfile,
+            cache,
+            args.cache_stats,
+            optimization,
+            args.stats,
+            quiet=args.quiet,
+            bytecode=args.bytecode,
+        )
+        if not compiled:
+            main(
+                data,
+                outfile,
+                cache,
+                args.cache_stats,
+                optimization,
+                args.stats,
+                quiet=args.quiet,
+                lexer_backend="fast" if args.mmap else "sly",
+                bytecode=args.bytecode,
+            )
     except KeyboardInterrupt:
         sys.stderr.write("CTRL+C Pressed, exiting...")
     except Exception as e:
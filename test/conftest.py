@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The compiler modules import each other as top-level modules (e.g. `from CPLLexer import CPLLexer`)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
@@ -0,0 +1,78 @@
+import os
+
+from CompileCache import CompileCache
+from CPLCompiler import CPLCompiler
+
+PROGRAM = "a: int; { input(a); output(a + 1); }"
+
+
+def test_cache_hit_skips_compilation(tmp_path):
+    cache = CompileCache(str(tmp_path))
+
+    compiler = CPLCompiler(PROGRAM, "out.qud", cache=cache)
+    compiler.run()
+    assert compiler.cache_hit is False
+
+    cached = CPLCompiler(PROGRAM, "out.qud", cache=cache)
+    cached.run()
+    assert cached.cache_hit is True
+    assert cached.program == compiler.program
+    assert cached.quads == []
+    assert cache.stats == {"hits": 1, "misses": 1, "stores": 1, "evictions": 0}
+
+
+def test_cache_hit_reports_diagnostics(tmp_path, capsys):
+    cache = CompileCache(str(tmp_path))
+    program = "a: int;\n{ input(a_); output(a); }"
+
+    for cache_hit in (False, True):
+        compiler = CPLCompiler(program, "out.qud", cache=cache)
+        compiler.run()
+        assert compiler.cache_hit is cache_hit
+        assert capsys.readouterr().out == "Line 2: Bad character _\n"
+
+    diagnostics = []
+    compiler = CPLCompiler(program, "out.qud", cache=cache, diagnostics=diagnostics)
+    compiler.run()
+    assert compiler.cache_hit is True
+    assert diagnostics == ["Line 2: Bad character _"]
+    assert capsys.readouterr().out == ""
+
+
+def test_options_are_part_of_the_key(tmp_path):
+    cache = CompileCache(str(tmp_path))
+    assert cache.key(PROGRAM, {"lexer": "CPLLexer"}) != cache.key(
+        PROGRAM, {"lexer": "CPLFastLexer"}
+    )
+
+
+def test_lru_eviction(tmp_path):
+    cache = CompileCache(str(tmp_path), max_bytes=25)
+    keys = [cache.key(str(i)) for i in range(3)]
+
+    cache.put(keys[0], "0" * 10)
+    cache.put(keys[1], "1" * 10)
+    os.utime(cache._path(keys[0]), (0, 0))
+    os.utime(cache._path(keys[1]), (1, 1))
+    assert cache.get(keys[0]) is not None  # Refreshes the first entry
+
+    cache.put(keys[2], "2" * 10)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == "0" * 10
+    assert cache.get(keys[2]) == "2" * 10
+    assert cache.stats["evictions"] == 1
+
+
+def test_eviction_counts_bytes(tmp_path):
+    cache = CompileCache(str(tmp_path), max_bytes=25)
+    first, second = cache.key("first"), cache.key("second")
+
+    # 8 characters, but 16 bytes on disk
+    cache.put(first, "é" * 8)
+    os.utime(cache._path(first), (0, 0))
+    cache.put(second, "é" * 8)
+
+    assert cache.get(first) is None
+    assert cache.get(second) == "é" * 8
+    assert cache._size == os.path.getsize(cache._path(second))
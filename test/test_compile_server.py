@@ -0,0 +1,91 @@
+import io
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+
+import pytest
+from CompileClient import is_running, request
+from CompileServer import CompileServer
+from cpq import main
+
+SAMPLES = os.path.join(os.path.dirname(os.path.dirname(__file__)), "samples")
+SRC = os.path.join(os.path.dirname(os.path.dirname(__file__)), "src")
+
+
+@pytest.fixture
+def server(tmp_path):
+    socket_path = str(tmp_path / "cpq.sock")
+    server = CompileServer(socket_path, workers=2, log=io.StringIO())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def compile_locally(source, outfile, optimization):
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        main(source, outfile, optimization=optimization)
+    return stdout.getvalue(), stderr.getvalue()
+
+
+@pytest.mark.parametrize("sample", ["complex_test", "parsing_error"])
+def test_same_as_local_compile(server, tmp_path, sample):
+    with open(os.path.join(SAMPLES, f"{sample}.ou")) as f:
+        source = f.read()
+    optimization = {"level": 2, "enable": [], "disable": [], "time_passes": True}
+
+    remote = str(tmp_path / "remote.qud")
+    payload = {"source": source, "output": remote, "optimization": optimization}
+    response = request(server.socket_path, payload)
+    local = str(tmp_path / "local.qud")
+    stdout, stderr = compile_locally(source, local, optimization)
+
+    assert response["exit_code"] == 0
+    assert response["stdout"] == stdout
+    # The pass timings differ
+    assert response["stderr"].splitlines()[:2] == stderr.splitlines()[:2]
+    assert os.path.exists(remote) == os.path.exists(local)
+    if os.path.exists(local):
+        assert open(remote).read() == open(local).read()
+
+
+def test_concurrent_requests(server, tmp_path):
+    def compile_program(n):
+        output = str(tmp_path / f"out{n}.qud")
+        source = f"a: int; {{ input(a); output(a * {n}); }}"
+        return request(server.socket_path, {"source": source, "output": output})
+
+    with ThreadPoolExecutor(8) as executor:
+        responses = list(executor.map(compile_program, range(16)))
+
+    for n, response in enumerate(responses):
+        assert f"IMLT t1 a {n}" in response["stdout"]
+        assert response["latency"] >= response["seconds"]
+        assert open(tmp_path / f"out{n}.qud").read().startswith(response["stdout"])
+    assert len(server.log.getvalue().splitlines()) == 16
+
+
+def test_invalid_request_and_second_server(server):
+    response = request(server.socket_path, {"output": "missing source"})
+    assert "An unhandled exception occurred." in response["stderr"]
+
+    with pytest.raises(OSError):
+        CompileServer(server.socket_path)
+    assert is_running(server.socket_path)
+
+
+def test_client_imports():
+    # Parsing the command line imports neither the compiler nor its optimization passes
+    code = "import sys, cpq; sys.argv[1:] = ['a.ou', '-O2']; cpq.FileHelper.get_args(); "
+    code += "print(*sys.modules)"
+    modules = subprocess.run(
+        [sys.executable, "-c", code], cwd=SRC, capture_output=True, text=True, check=True
+    ).stdout.split()
+    assert "FileHelper" in modules
+    assert not {"CPLCompiler", "CPLParser", "PassManager", "sly"} & set(modules)
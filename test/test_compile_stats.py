@@ -0,0 +1,61 @@
+import json
+
+from CompileCache import CompileCache
+from CompileStats import write_stats
+from CPLCompiler import CPLCompiler
+from CPLLexer import CPLLexer
+from CPLParser import CPLParser
+from PassManager import compiler_options
+
+PROGRAM = "a, b: int; { input(a); while (a < 10) a = a + 1; b = a * 2 + 1; output(b); }"
+
+
+def test_stats_and_hooks(tmp_path):
+    events = []
+    parser = CPLParser()
+    compiler = CPLCompiler(
+        PROGRAM,
+        str(tmp_path / "out.qud"),
+        parser=parser,
+        hooks=[lambda event, stats: events.append(event)],
+        **compiler_options(1),
+    )
+    with compiler:
+        pass
+
+    assert events == ["lex", "parse", "optimize", "render", "finished", "write"]
+    stats = compiler.stats
+    assert set(stats.phases) == {"lex", "parse", "optimize", "render", "write"}
+    assert stats.tokens == len(list(CPLLexer().tokenize(PROGRAM)))
+    assert stats.reductions > stats.tokens // 2
+    assert (stats.temporaries, stats.labels) == (4, 2)
+    assert stats.symbols == len(compiler.symtab)
+    assert stats.instructions == len(compiler.program.splitlines()) - 2  # Labels
+    assert [p["name"] for p in stats.passes] == ["fold", "cfg", "copy"]
+
+    # Counters restart with every program a reused parser compiles
+    again = CPLCompiler(PROGRAM, "out.qud", parser=parser, collect_stats=True)
+    again.run()
+    assert again.stats.reductions == stats.reductions
+
+    write_stats([stats.to_dict()], str(tmp_path / "stats.jsonl"))
+    (record,) = [json.loads(line) for line in open(tmp_path / "stats.jsonl")]
+    assert record["tokens"] == stats.tokens
+    assert record["total_seconds"] == sum(record["phases"].values())
+
+
+def test_stats_of_cache_hit(tmp_path):
+    cache = CompileCache(str(tmp_path))
+    CPLCompiler(PROGRAM, "out.qud", cache=cache).run()
+
+    compiler = CPLCompiler(PROGRAM, "out.qud", cache=cache, collect_stats=True)
+    compiler.run()
+    assert compiler.stats.cache_hit is True
+    assert list(compiler.stats.phases) == ["cache"]
+    assert compiler.stats.tokens == 0
+
+
+def test_no_stats_by_default():
+    compiler = CPLCompiler(PROGRAM, "out.qud")
+    compiler.run()
+    assert compiler.stats is None
@@ -0,0 +1,218 @@
+import glob
+import io
+import marshal
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import ParseTableCache
+import pytest
+from BatchCompiler import compile_files
+from CompileCache import CompileCache
+from CompilerPool import CompilerPool
+from CPLCompiler import CPLCompiler, compile_source
+from CPLParser import CPLParser
+from FileHelper import map_input
+from Quad import LABEL, Quad, QuadCode, render, render_chunks
+from QuadBytecode import Bytecode
+
+SAMPLES = os.path.join(os.path.dirname(os.path.dirname(__file__)), "samples")
+SIGNATURE = "Signature Line - Liam Aslan, 215191347"
+
+
+def golden_samples():
+    return sorted(
+        f[: -len(".ou")]
+        for f in glob.glob(os.path.join(SAMPLES, "*.ou"))
+        if os.path.exists(f.replace(".ou", ".qud"))
+    )
+
+
+@pytest.mark.parametrize("lexer_backend", ["sly", "fast"])
+@pytest.mark.parametrize("sample", golden_samples(), ids=os.path.basename)
+def test_golden_samples(sample, lexer_backend):
+    with open(f"{sample}.ou") as f:
+        compiler = CPLCompiler(f.read(), f"{sample}.qud", lexer_backend=lexer_backend)
+    compiler.run()
+
+    with open(f"{sample}.qud") as f:
+        expected = f.read()
+
+    assert compiler.program + SIGNATURE == expected
+
+
+def test_quad_code_rope():
+    inner = QuadCode(Quad("IASN", "a", "1"))
+    code = QuadCode(Quad("JUMP", "L1"), inner, Quad(LABEL, "L1"))
+    inner.append(QuadCode(Quad("IPRT", "a")))
+    code.append(Quad("HALT"))
+
+    assert render(code) == "JUMP L1\nIASN a 1\nIPRT a\nL1:\nHALT\n"
+
+
+def test_streamed_output(tmp_path):
+    sample = os.path.join(SAMPLES, "complex_test")
+    with open(f"{sample}.ou") as f:
+        source = f.read()
+    with open(f"{sample}.qud") as f:
+        expected = f.read()
+
+    outfile = tmp_path / "out.qud"
+    echo = io.StringIO()
+    with CPLCompiler(source, str(outfile), stream=True, echo=echo) as compiler:
+        assert compiler.success
+    assert outfile.read_text() == expected
+    assert echo.getvalue() + SIGNATURE == expected
+    assert compiler.program + SIGNATURE == expected
+    assert "".join(render_chunks(compiler.quads, size=7)) == compiler.program
+    assert os.listdir(tmp_path) == ["out.qud"]
+
+
+def test_failed_write_keeps_previous_output(tmp_path):
+    class BrokenStream(io.StringIO):
+        def write(self, text):
+            raise OSError("disk full")
+
+    outfile = tmp_path / "out.qud"
+    outfile.write_text("previous")
+    compiler = CPLCompiler("a: int; { input(a); }", str(outfile), stream=True, echo=BrokenStream())
+    with pytest.raises(OSError):
+        compiler.run()
+        compiler.__exit__(None, None, None)
+    assert outfile.read_text() == "previous"
+    assert os.listdir(tmp_path) == ["out.qud"]
+
+
+def test_bytecode_output(tmp_path):
+    outfile, bytecode_file = tmp_path / "out.qud", tmp_path / "out.qbc"
+    source = "a: int; x: float; { input(a); x = a / 2.0; output(x); }"
+    with CPLCompiler(source, str(outfile), bytecode_filename=str(bytecode_file)) as compiler:
+        pass
+    bytecode = Bytecode.from_file(str(bytecode_file))
+    assert render(bytecode.to_quads()) == compiler.program
+    assert {"a": "I", "x": "R"}.items() <= bytecode.types.items()
+    assert sorted(os.listdir(tmp_path)) == ["out.qbc", "out.qud"]
+
+
+def test_cached_bytecode(tmp_path):
+    with open(os.path.join(SAMPLES, "complex_test.ou")) as f:
+        source = f.read()
+    cache = CompileCache(str(tmp_path / "cache"))
+
+    def compile_bytecode(cache):
+        bytecode_file = tmp_path / "out.qbc"
+        with CPLCompiler(
+            source, str(tmp_path / "out.qud"), cache=cache, bytecode_filename=str(bytecode_file)
+        ) as compiler:
+            pass
+        return compiler.cache_hit, bytecode_file.read_bytes()
+
+    _, expected = compile_bytecode(None)
+    # A program cached without its declared types isn't served to a bytecode compilation
+    CPLCompiler(source, str(tmp_path / "out.qud"), cache=cache).run()
+    assert compile_bytecode(cache) == (False, expected)
+    assert compile_bytecode(cache) == (True, expected)
+
+
+@pytest.mark.parametrize("lexer_backend", ["sly", "fast"])
+def test_memory_mapped_input(tmp_path, lexer_backend):
+    sample = os.path.join(SAMPLES, "complex_test")
+    outfile = tmp_path / "out.qud"
+    with CPLCompiler(map_input(f"{sample}.ou"), str(outfile), lexer_backend=lexer_backend):
+        pass
+    with open(f"{sample}.qud") as f:
+        assert outfile.read_text() == f.read()
+
+    empty = tmp_path / "empty.ou"
+    empty.write_text("")
+    assert map_input(str(empty)) == b""
+
+
+def test_memory_mapped_batch(tmp_path):
+    for name in ("complex_test", "nested_while"):
+        shutil.copy(os.path.join(SAMPLES, f"{name}.ou"), tmp_path)
+    (tmp_path / "empty.ou").write_text("")
+
+    filenames = sorted(str(path) for path in tmp_path.glob("*.ou"))
+    results = compile_files(filenames, 2, lexer_backend="fast", memory_map=True)
+    assert [result.success for result in results] == [True, False, True]
+    assert [result.lines for result in results] == [
+        open(filename).read().count("\n") + 1 for filename in filenames
+    ]
+    for name in ("complex_test", "nested_while"):
+        with open(os.path.join(SAMPLES, f"{name}.qud")) as f:
+            assert (tmp_path / f"{name}.qud").read_text() == f.read()
+
+
+def test_reused_parser():
+    parser = CPLParser()
+    for sample in golden_samples() * 2:
+        with open(f"{sample}.ou") as f:
+            compiler = CPLCompiler(f.read(), f"{sample}.qud", parser=parser)
+        compiler.run()
+
+        with open(f"{sample}.qud") as f:
+            assert compiler.program + SIGNATURE == f.read()
+
+
+def test_broken_parse_table_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(ParseTableCache, "CACHE_DIR", str(tmp_path))
+    grammar = CPLParser._grammar
+    path = ParseTableCache.table_path("CPLParser", ParseTableCache.grammar_fingerprint(grammar))
+
+    for broken in (b"", b"garbage", marshal.dumps((1, 2, 3)), marshal.dumps(("x", ()))):
+        with open(path, "wb") as f:
+            f.write(broken)
+        assert ParseTableCache.load_tables("CPLParser", grammar) is None
+
+    class Unsaveable:
+        lr_action = lr_goto = defaulted_states = object()
+        sr_conflicts = rr_conflicts = []
+
+    ParseTableCache.save_tables("CPLParser", grammar, Unsaveable())
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+
+    lrtable = CPLParser._lrtable
+    ParseTableCache.save_tables("CPLParser", grammar, lrtable)
+    assert ParseTableCache.load_tables("CPLParser", grammar).lr_action == lrtable.lr_action
+
+
+def test_compile_source(capsys):
+    parser = CPLParser()
+    with open(os.path.join(SAMPLES, "semantic_error.ou")) as f:
+        result = compile_source(f.read(), parser=parser)
+    assert not result.success and result.quads == []
+    assert result.diagnostics == [
+        "ERROR in line 5: Operands must be of same type.",
+        "ERROR in line 6: Operands must be of same type.",
+    ]
+
+    with open(os.path.join(SAMPLES, "parsing_error.ou")) as f:
+        result = compile_source(f.read(), parser=parser, lexer_backend="fast")
+    assert not result.success and len(result.diagnostics) == 1
+
+    # Nothing is left over from the failed programs
+    result = compile_source("a: int; { input(a); output(a); }", parser=parser, collect_stats=True)
+    assert result.success and result.diagnostics == []
+    assert result.program == "IINP a\nIPRT a\nHALT\n"
+    assert result.symtab == {"a": "I"}
+    assert result.stats.instructions == len(result.quads) == 3
+
+    assert capsys.readouterr() == ("", "")
+
+
+def test_compiler_pool():
+    samples = golden_samples() * 4
+    pool = CompilerPool(size=3)
+
+    def compile_sample(sample):
+        with open(f"{sample}.ou") as f:
+            return pool.compile(f.read())
+
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(compile_sample, samples))
+
+    for sample, result in zip(samples, results):
+        with open(f"{sample}.qud") as f:
+            assert result.program + SIGNATURE == f.read()
+    assert pool._idle.qsize() <= 3
@@ -0,0 +1,114 @@
+import glob
+import io
+import os
+
+import pytest
+from CPLCompiler import CPLCompiler
+from Quad import render
+from QuadBytecode import Bytecode, encode
+from QuadBytecode import main as convert
+from QuadInterpreter import QuadError, QuadInterpreter, parse_program
+
+SAMPLES = os.path.join(os.path.dirname(os.path.dirname(__file__)), "samples")
+
+
+def run(interpreter, inputs=""):
+    output = io.StringIO()
+    steps = interpreter.run(io.StringIO(inputs), output)
+    return output.getvalue().split(), steps
+
+
+def compile_program(program):
+    compiler = CPLCompiler(program, "out.qud")
+    compiler.run()
+    return compiler.quads
+
+
+def test_sample_file_with_signature():
+    interpreter = QuadInterpreter.from_file(os.path.join(SAMPLES, "nested_while.qud"))
+    assert run(interpreter, "7 5") == (["6", "5"], 37)
+
+
+def test_arithmetic_semantics():
+    quads = compile_program(
+        """a, b: int; x: float;
+        {
+            input(a); input(b); input(x);
+            output(a / b);
+            output(x / 2);
+            output(static_cast<int>(x));
+            output(static_cast<int>(x * a));
+            if (a >= b) output(1); else output(0);
+        }"""
+    )
+    outputs, _ = run(QuadInterpreter(quads), "-7 2 -2.5")
+    assert outputs == ["-3", "-1.25", "-2", "17", "0"]
+
+
+def test_loop_counts_executed_instructions():
+    quads = compile_program("i: int; { while (i < 10) i = i + 1; output(i); }")
+    interpreter = QuadInterpreter(quads)
+    outputs, steps = run(interpreter)
+    assert outputs == ["10"]
+    assert interpreter.variables()["i"] == 10
+    # JUMP, 11 condition checks (3 each), 10 iterations (2 each), IPRT, HALT
+    assert steps == 1 + 11 * 3 + 10 * 2 + 2
+
+
+def test_runtime_errors():
+    interpreter = QuadInterpreter(compile_program("a: int; { input(a); output(1 / a); }"))
+    with pytest.raises(QuadError):
+        run(interpreter, "0")
+    with pytest.raises(QuadError):
+        run(interpreter, "")
+
+    interpreter = QuadInterpreter(compile_program("a: int; { while (a == 0) a = 0; }"))
+    with pytest.raises(QuadError):
+        interpreter.run(io.StringIO(), io.StringIO(), max_steps=1000)
+
+
+@pytest.mark.parametrize("sample", sorted(glob.glob(os.path.join(SAMPLES, "*.qud"))))
+def test_bytecode_round_trip(sample):
+    with open(sample) as f:
+        quads = parse_program(f.read())
+    bytecode = Bytecode(encode(quads))
+    assert render(bytecode.to_quads()) == render(quads)
+
+
+def test_compiled_bytecode_round_trip(tmp_path):
+    compiled, text, restored = (tmp_path / name for name in ("a.qbc", "b.qud", "c.qbc"))
+    with open(os.path.join(SAMPLES, "complex_test.ou")) as f:
+        with CPLCompiler(f.read(), str(tmp_path / "a.qud"), bytecode_filename=str(compiled)):
+            pass
+
+    assert convert(str(compiled), str(text)) == 0
+    with open(os.path.join(SAMPLES, "complex_test.qud")) as f:
+        assert text.read_text() == f.read()
+    assert convert(str(text), str(restored), str(compiled)) == 0
+    assert restored.read_bytes() == compiled.read_bytes()
+
+    # Without the compiled bytecode the declared types are unknown
+    assert convert(str(text), str(restored)) == 0
+    assert Bytecode.from_file(str(restored)).types == {}
+    assert Bytecode.from_file(str(compiled)).types["c"] == "R"
+
+
+def test_bytecode_interpreter(tmp_path):
+    quads = compile_program(
+        """a, b: int; x: float;
+        {
+            input(a); input(b); input(x);
+            while (a > b) { a = a - 1; x = x * 2; }
+            output(a); output(x); output(static_cast<int>(x));
+        }"""
+    )
+    path = tmp_path / "program.qbc"
+    path.write_bytes(encode(quads))
+    bytecode = Bytecode.from_file(str(path))
+    assert len(bytecode) == len([quad for quad in quads if quad.op != "LABEL"])
+    assert run(bytecode.interpreter(), "9 5 1.5") == run(QuadInterpreter(quads), "9 5 1.5")
+
+    with pytest.raises(QuadError):
+        Bytecode(b"QUD\0" + path.read_bytes()[4:])
+    with pytest.raises(QuadError):
+        Bytecode(path.read_bytes()[:-4])
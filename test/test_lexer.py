@@ -1,10 +1,17 @@
+import os
+import re
+
 import pytest
+from src.CPLFastLexer import UNICODE_SPACES, CPLFastLexer
 from src.CPLLexer import CPLLexer
+from src.FileHelper import map_input
+
+SAMPLES = os.path.join(os.path.dirname(os.path.dirname(__file__)), "samples")
 
 
-@pytest.fixture
-def lexer():
-    return CPLLexer()
+@pytest.fixture(params=[CPLLexer, CPLFastLexer], ids=["sly", "fast"])
+def lexer(request):
+    return request.param()
 
 
 def test_tokens(lexer):
@@ -53,6 +60,19 @@ def test_ignore_newline(lexer):
     assert lexer.lineno == 4  # Start from 1, go down 3 lines
 
 
+def test_identifiers_starting_with_keywords(lexer):
+    tokens = [(t.type, t.value) for t in lexer.tokenize("ifx = 1; whilex integer int")]
+    assert tokens == [
+        ("ID", "ifx"),
+        ("ASSIGN", "="),
+        ("NUM", "1"),
+        ("SEMICOLON", ";"),
+        ("ID", "whilex"),
+        ("ID", "integer"),
+        ("INT", "int"),
+    ]
+
+
 def test_sample_program(lexer):
     sample = r"""a, b: float;
                 {
@@ -143,3 +163,56 @@ def test_sample_program(lexer):
         "SEMICOLON",
         "RCBRACE",
     ]
+
+
+def test_comment_lines(lexer):
+    input_text = "/* one\ntwo\n */ total"
+    token = next(lexer.tokenize(input_text))
+    assert (token.type, token.value, token.lineno) == ("ID", "total", 3)
+
+
+def test_bad_character(lexer, capsys):
+    input_text = "a\n_ b"
+    l = list(map(lambda x: x.value, lexer.tokenize(input_text)))
+    assert l == ["a", "b"]
+    assert capsys.readouterr().out == "Line 2: Bad character _\n"
+
+
+def test_fast_lexer_bytes(capsys):
+    sample = os.path.join(SAMPLES, "complex_test.ou")
+    with open(sample) as f:
+        text = f.read()
+    expected = [(t.type, t.value, t.lineno) for t in CPLFastLexer().tokenize(text)]
+
+    mapped = map_input(sample)
+    tokens = [(t.type, t.value, t.lineno) for t in CPLFastLexer().tokenize(mapped)]
+    assert tokens == expected
+    assert all(isinstance(value, str) for _, value, _ in tokens)
+
+    values = [t.value for t in CPLFastLexer().tokenize(b"a\n_ b")]
+    assert values == ["a", "b"]
+    assert capsys.readouterr().out == "Line 2: Bad character _\n"
+
+    # A non-ASCII character is reported once, as when lexing the decoded text
+    for source in ("a\né b", "a\né b".encode()):
+        values = [t.value for t in CPLFastLexer().tokenize(source)]
+        assert values == ["a", "b"]
+        assert capsys.readouterr().out == "Line 2: Bad character é\n"
+
+
+def test_unicode_whitespace(lexer, capsys):
+    source = "a\u00a0b\u3000\nc\x1cd"
+    tokens = [(t.value, t.lineno) for t in lexer.tokenize(source)]
+    assert tokens == [("a", 1), ("b", 1), ("c", 2), ("d", 2)]
+    if isinstance(lexer, CPLFastLexer):
+        assert [(t.value, t.lineno) for t in lexer.tokenize(source.encode())] == tokens
+    assert capsys.readouterr().out == ""
+
+
+def test_fast_lexer_bytes_whitespace():
+    # Every character \s matches in a str but not in bytes, all of them are in the BMP
+    assert UNICODE_SPACES == "".join(
+        c
+        for c in map(chr, range(0x10000))
+        if re.match(r"\s", c) and not re.match(rb"\s", c.encode("utf-8", "surrogatepass"))
+    )
@@ -0,0 +1,328 @@
+import glob
+import io
+import os
+import re
+from contextlib import redirect_stderr, redirect_stdout
+
+import pytest
+from AlgebraicSimplifier import simplify_algebra
+from CastMinimization import minimize_casts
+from CommonSubexpression import eliminate_common_subexpressions
+from ConstantFolding import fold_constants
+from ControlFlowGraph import ControlFlowGraph
+from ControlFlowSimplification import simplify_control_flow
+from CopyPropagation import propagate_copies
+from CPLCompiler import CPLCompiler
+from LoopInvariant import hoist_loop_invariants
+from OptimizationLevels import PASS_NAMES
+from PassManager import OPTIMIZATION_LEVELS, PIPELINE, PassManager, compiler_options, select_passes
+from Quad import LABEL, Quad, count_instructions
+from QuadInterpreter import QuadError, QuadInterpreter
+from TempAllocator import allocate_temporaries, count_temporaries, peak_temporaries
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+SAMPLES = os.path.join(ROOT, "samples")
+BENCHMARK_PROGRAMS = os.path.join(ROOT, "benchmarks", "programs")
+
+OPTIMIZATIONS = list(PIPELINE.values())
+
+PROGRAMS = [
+    """a, b: int; x, y: float;
+    {
+        input(a); input(b); input(x);
+        y = a * 3 * 2 + 3 * (33 + 2) * b * x + (x * (x + y));
+        output(y);
+        if (a > b && a > 5 || a > 20) output(a); else output(b);
+        if (a >= b) output(a / 2); else output(x / 2);
+        if (!(5 > 3)) output(1); else output(static_cast<int>(2.5 * 3));
+    }""",
+    """a, b, c, d, x: int;
+    {
+        input(a); input(c); input(d);
+        while (a < 100) {
+            b = 0;
+            while (b < c * d) { x = c * d + a; b = b + x / 7 + 1; }
+            if (c > 0) x = a / c; else x = 1;
+            a = a + c * 2 + 1 + x;
+        }
+        output(a); output(b); output(x);
+    }""",
+    """i, n, s: int; f: float;
+    {
+        input(n);
+        s = 0;
+        while (i < n) {
+            f = f + static_cast<float>(i) / 4;
+            if (i != 3) s = s + i * 2; else s = s - 1;
+            i = i + 1;
+        }
+        output(s); output(f);
+    }""",
+    """a, b, c: int;
+    {
+        c = 10;
+        input(a);
+        while (a < c) {
+            b = c * 2 + 4;
+            a = a + b / 8;
+        }
+        output(a); output(b); output(c - 1 + 1);
+    }""",
+]
+
+INPUTS = ["7 3 2", "-4 9 0", "12 12 5"]
+
+
+def compile_program(program, **options):
+    compiler = CPLCompiler(program, "out.qud", **options)
+    with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+        compiler.run()
+    return compiler
+
+
+def execute(quads, inputs):
+    output = io.StringIO()
+    try:
+        QuadInterpreter(quads).run(io.StringIO(inputs), output, max_steps=100_000)
+    except QuadError:
+        return output.getvalue() + "<runtime error>"
+    return output.getvalue()
+
+
+def sources():
+    for filename in sorted(glob.glob(os.path.join(SAMPLES, "*.ou"))):
+        with open(filename) as f:
+            yield os.path.basename(filename), f.read()
+    for i, program in enumerate(PROGRAMS):
+        yield f"program{i}", program
+
+
+@pytest.mark.parametrize("optimization", OPTIMIZATIONS, ids=lambda p: p.__name__)
+@pytest.mark.parametrize("name,program", list(sources()), ids=[n for n, _ in sources()])
+def test_same_behavior(optimization, name, program):
+    compiler = compile_program(program)
+    if not compiler.quads:
+        pytest.skip("does not compile")
+
+    optimized = optimization(compiler.quads, compiler.symtab)
+    assert count_instructions(optimized) <= count_instructions(compiler.quads)
+    for inputs in INPUTS:
+        assert execute(optimized, inputs) == execute(compiler.quads, inputs)
+
+
+CODEGEN_MODES = [
+    {"short_circuit": True},
+    {"compact_conditions": True},
+    {"short_circuit": True, "compact_conditions": True},
+]
+
+
+@pytest.mark.parametrize("options", CODEGEN_MODES, ids=lambda o: "+".join(o))
+@pytest.mark.parametrize("name,program", list(sources()), ids=[n for n, _ in sources()])
+def test_codegen_mode_same_behavior(options, name, program):
+    default = compile_program(program)
+    if not default.quads:
+        pytest.skip("does not compile")
+
+    compiled = compile_program(program, **options)
+    assert count_temporaries(compiled.quads) <= count_temporaries(default.quads)
+    assert count_instructions(compiled.quads) <= count_instructions(default.quads)
+    for inputs in INPUTS:
+        assert execute(compiled.quads, inputs) == execute(default.quads, inputs)
+
+
+def test_short_circuit():
+    program = "a: int; { input(a); if (a != 0 && 10 / a > 2 || !(a < 5)) output(1); else output(0); }"
+    assert execute(compile_program(program).quads, "0") == "<runtime error>"
+    jumping = compile_program(program, short_circuit=True)
+    assert not any(quad.op in ("IADD", "IMLT") for quad in jumping.quads)
+    assert [execute(jumping.quads, i) for i in ("0", "3", "4", "9")] == ["0\n", "1\n", "0\n", "1\n"]
+
+
+def test_compact_conditions():
+    program = "i, n: int; { input(n); while (i <= n) i = i + 1; if (!(i >= 2)) output(1); else output(i); }"
+    compact = compile_program(program, compact_conditions=True)
+    assert Quad("IGRT", "t3", "i", "1") in compact.quads  # i >= 2, with swapped branches
+    assert Quad("IGRT", "t1", "i", "n") in compact.quads  # the loop repeats while !(i > n)
+
+    default = compile_program(program)
+    for options in CODEGEN_MODES[1:]:
+        interpreter = QuadInterpreter(compile_program(program, **options).quads)
+        interpreter.run(io.StringIO("100"), io.StringIO())
+        baseline = QuadInterpreter(default.quads)
+        baseline.run(io.StringIO("100"), io.StringIO())
+        # Every iteration runs the body (2), the comparison and the jump
+        assert interpreter.steps < baseline.steps - 101 * 4
+        assert interpreter.steps <= 101 * 4 + 10
+
+
+def test_fold_constants():
+    compiler = compile_program("a: int; { a = 3 * (33 + 2); if (5 > 3) output(a); else output(1); }")
+    assert fold_constants(compiler.quads, {})[:2] == [
+        Quad("JMPZ", "L1", "1"),
+        Quad("IPRT", "105"),
+    ]
+
+
+def test_propagate_copies():
+    compiler = compile_program("a, b: int; { input(a); a = a - 1; b = a; output(b); }")
+    assert propagate_copies(compiler.quads, {}) == [
+        Quad("IINP", "a"),
+        Quad("ISUB", "a", "a", "1"),
+        Quad("IPRT", "a"),
+        Quad("HALT"),
+    ]
+
+
+def test_allocate_temporaries():
+    compiler = compile_program("a, b: int; { input(a); b = (a + 1) * (a + 2) - (a + 3) * (a + 4); output(b); }")
+    assert count_temporaries(compiler.quads) == 7
+    assert peak_temporaries(compiler.quads) == 3
+    allocated = allocate_temporaries(compiler.quads, {})
+    assert count_temporaries(allocated) == peak_temporaries(allocated) == 3
+    assert allocated[1] == Quad("IADD", "t1", "a", "1")
+    assert allocated[3] == Quad("IMLT", "t1", "t1", "t2")
+
+
+def test_control_flow_graph():
+    compiler = compile_program("a: int; { input(a); while (a < 3) a = a + 1; output(a); }")
+    cfg = ControlFlowGraph(compiler.quads)
+    assert [len(block) for block in cfg] == [2, 3, 4, 2]
+    entry, body, condition, exit = cfg.blocks
+    assert entry.successors == [condition]
+    assert body.label == "L1" and body.successors == [condition]
+    assert condition.successors == [body, exit] and condition.predecessors == [entry, body]
+    assert exit.terminator == Quad("HALT")
+    assert cfg.reverse_postorder() == [entry, condition, exit, body]
+
+
+def test_simplify_control_flow():
+    program = "a: int; { input(a); if (5 > 3) output(a); else output(1); while (a < 0) {} output(2); }"
+    simplified = simplify_control_flow(fold_constants(compile_program(program).quads, {}))
+    assert simplified == [
+        Quad("IINP", "a"),
+        Quad("IPRT", "a"),
+        Quad(LABEL, "L3"),
+        Quad("ILSS", "t2", "a", "0"),
+        Quad("ISUB", "t2", "1", "t2"),
+        Quad("JMPZ", "L3", "t2"),
+        Quad("IPRT", "2"),
+        Quad("HALT"),
+    ]
+
+
+def test_eliminate_common_subexpressions():
+    program = """a, b, x: int;
+    { input(a); input(b); x = (a + b) * (b + a); if (a > b && b < a) output(a); else input(a);
+      output(a + b); input(a); output(a + b); }"""
+    quads = eliminate_common_subexpressions(compile_program(program).quads, {})
+    assert quads[2:4] == [Quad("IADD", "t1", "a", "b"), Quad("IASN", "t2", "t1")]
+    assert Quad("IASN", "t5", "t4") in quads  # b < a is a > b
+    assert sum(q.op == "IADD" and q.args[1:] == ("a", "b") for q in quads) == 3  # new blocks, input
+
+
+def test_hoist_loop_invariants():
+    program = """a, b, c, d: int;
+    { input(a); input(c); input(d); while (a < 100) { b = a / d; a = a + c * d; } output(b); }"""
+    quads = hoist_loop_invariants(compile_program(program).quads, {})
+    # c * d moves in front of the loop, the division may fault and the loop may not run
+    assert quads[3:5] == [Quad("IMLT", "t3", "c", "d"), Quad("JUMP", "L2")]
+    assert quads.index(Quad("IDIV", "t2", "a", "d")) > quads.index(Quad(LABEL, "L1"))
+
+    cfg = ControlFlowGraph(quads)
+    (loop,) = cfg.natural_loops()
+    assert loop.header.label == "L2" and len(loop.blocks) == 2
+    assert loop.exits() == [cfg.blocks[-1]]
+
+
+def test_simplify_algebra():
+    program = """a, b: int; x, y: float;
+    { input(a); input(x); b = a * 3 * 2 + 1 - 4; output(b * 1 + 0); output(b / 1 - b);
+      y = x * 2.0 / 4.0 * 1.0 + 0.0; output(y); output(x * 0.0); output(x / 3.0); }"""
+    quads = simplify_algebra(compile_program(program).quads, {})
+    assert quads[2:4] == [Quad("IMLT", "t2", "a", "6"), Quad("ISUB", "t4", "t2", "3")]
+    assert not any(q.op in ("IMLT", "IADD") and q.args[2] in ("0", "1") for q in quads)
+    assert Quad("IASN", "t8", "0") in quads  # b / 1 - b
+    assert Quad("RADD", "t9", "x", "x") in quads and Quad("RMLT", "t10", "t9", "0.25") in quads
+    # Not exact for -0.0, NaN or an inexact reciprocal: kept
+    assert [q.op for q in quads if q.args[-1:] in [("0.0",), ("3.0",)]] == ["RADD", "RMLT", "RDIV"]
+
+
+def test_strength_reduction_limit():
+    program = "a: int; x: float; { input(a); input(x); output(a * 4); output(a * 3); output(x * 4.0); }"
+    quads = simplify_algebra(compile_program(program).quads, {})
+    # Additions replacing these would run more instructions than the multiplication: kept
+    assert [q for q in quads if q.op.endswith("MLT")] == [
+        Quad("IMLT", "t1", "a", "4"),
+        Quad("IMLT", "t2", "a", "3"),
+        Quad("RMLT", "t3", "x", "4.0"),
+    ]
+
+
+def test_minimize_casts():
+    program = """a: int; x, y: float;
+    { input(a); input(x); x = a * x; if (a > 0) y = x / a; else y = 1.0; output(y * 3 + a); }"""
+    quads = minimize_casts(compile_program(program).quads, {})
+    # a is converted once, on the path every later conversion is reached from
+    assert [q for q in quads if q.op == "ITOR"] == [Quad("ITOR", "t1", "a")]
+    assert Quad("RASN", "t4", "t1") in quads and Quad("RASN", "t8", "t1") in quads
+    assert Quad("RMLT", "t7", "y", "3.0") in quads
+
+
+def test_select_passes():
+    assert select_passes(0) == []
+    assert select_passes(1, enable=["cse"]) == ["fold", "cfg", "cse", "copy"]
+    assert select_passes(2, enable=["licm"], disable=["licm"]) == [
+        name for name in PIPELINE if name != "licm"
+    ]
+    with pytest.raises(ValueError):
+        select_passes(1, enable=["inline"])
+    assert list(PIPELINE) == PASS_NAMES
+
+
+@pytest.mark.parametrize("level", [1, 2])
+@pytest.mark.parametrize("name,program", list(sources()), ids=[n for n, _ in sources()])
+def test_optimization_level_same_behavior(level, name, program):
+    default = compile_program(program)
+    if not default.quads:
+        pytest.skip("does not compile")
+
+    optimized = compile_program(program, **compiler_options(level))
+    assert count_instructions(optimized.quads) <= count_instructions(default.quads)
+    for inputs in INPUTS:
+        assert execute(optimized.quads, inputs) == execute(default.quads, inputs)
+
+
+def test_pass_manager():
+    assert compiler_options(0)["pass_manager"] is None
+
+    compiler = compile_program(PROGRAMS[0])
+    manager = PassManager(["alloc", "fold", "copy"])
+    quads = manager.run(compiler.quads, compiler.symtab)
+    assert manager.passes == ["fold", "copy", "alloc"]
+
+    # The last round changes nothing, and the final pass only runs once
+    assert manager.rounds >= 2
+    assert manager.stats["fold"].runs == manager.rounds and manager.stats["alloc"].runs == 1
+    delta = sum(stats.delta for stats in manager.stats.values())
+    assert delta == count_instructions(quads) - count_instructions(compiler.quads)
+    assert manager.format_stats().splitlines()[0].split() == ["pass", "runs", "time", "(ms)", "delta"]
+
+
+@pytest.mark.parametrize(
+    "filename", sorted(glob.glob(os.path.join(BENCHMARK_PROGRAMS, "*.ou"))), ids=os.path.basename
+)
+def test_benchmark_programs_run_faster(filename):
+    with open(filename) as f:
+        program = f.read()
+    inputs = re.search(r"/\*\s*inputs:([^*]*)\*/", program).group(1)
+
+    results = []
+    for level in sorted(OPTIMIZATION_LEVELS):
+        output = io.StringIO()
+        interpreter = QuadInterpreter(compile_program(program, **compiler_options(level)).quads)
+        interpreter.run(io.StringIO(inputs), output, max_steps=1_000_000)
+        results.append((output.getvalue(), interpreter.steps))
+
+    assert all(output == results[0][0] for output, _ in results)
+    assert results[0][1] > results[1][1] >= results[2][1]